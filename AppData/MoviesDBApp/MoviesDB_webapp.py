@@ -4,11 +4,17 @@
 
 Attributes
 ----------
+root_folder : str
+    The main folder of the application (see :any:`paths.ROOT_FOLDER`).
+snapshot_path : str
+    Path to the binary snapshot of the catalog (see :any:`catalog_snapshot`).
 www_root : str
     The path to the folder that will be served by the web server.
 """
+import json
 import os
 import sys
+import threading
 
 from subprocess import call
 
@@ -23,6 +29,10 @@ except Exception:
 
 sys.path.insert(0, app_dir_path)
 
+import catalog_snapshot
+import facets
+import paths
+
 from python_utils.bottle_utils import WebApp
 from python_utils.bottle_utils import bottle
 from python_utils.bottle_utils import bottle_app
@@ -30,6 +40,142 @@ from python_utils.bottle_utils import bottle_app
 www_root = os.path.realpath(os.path.abspath(os.path.join(
     os.path.normpath(os.getcwd()))))
 
+root_folder = paths.ROOT_FOLDER
+snapshot_path = os.path.join(root_folder, "UserData", "catalog.snapshot")
+
+_app_utils = None
+_enricher = None
+_enricher_lock = threading.Lock()
+_facets = None
+_facets_lock = threading.Lock()
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_app_utils():
+    """Import the application utilities.
+
+    They are imported on first use so the web application can be used without the
+    dependencies needed to generate movies data.
+
+    Returns
+    -------
+    module
+        The :any:`app_utils` module.
+    """
+    global _app_utils
+
+    if _app_utils is None:
+        if root_folder not in sys.path:
+            sys.path.append(root_folder)
+
+        from AppData.MoviesDBApp import app_utils
+
+        _app_utils = app_utils
+
+    return _app_utils
+
+
+def get_enricher():
+    """Get the resolver of movie details.
+
+    It's created on first use.
+
+    Returns
+    -------
+    lazy_enrichment.LazyEnricher
+        The movie details resolver.
+    """
+    global _enricher
+
+    with _enricher_lock:
+        if _enricher is None:
+            from runpy import run_path
+
+            config = run_path(os.path.join(root_folder, "UserData", "config.py"))["data"]
+            _enricher = get_app_utils().get_lazy_enricher(config)
+
+    return _enricher
+
+
+def get_snapshot():
+    """Get the binary snapshot of the catalog.
+
+    It's opened on first use and reopened when a pipeline run replaces it. If it doesn't exist
+    yet or it was written by a previous version of the application, it's created from the
+    catalog.
+
+    Returns
+    -------
+    catalog_snapshot.Snapshot
+        The memory-mapped snapshot.
+    """
+    global _snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.is_stale():
+            try:
+                # The previous snapshot isn't closed, it could be in use by another request.
+                _snapshot = catalog_snapshot.Snapshot(snapshot_path)
+            except (OSError, ValueError):
+                app_utils = get_app_utils()
+                movies_catalog = app_utils.open_catalog()
+
+                try:
+                    app_utils.export_snapshot(movies_catalog)
+                finally:
+                    movies_catalog.close()
+
+                _snapshot = catalog_snapshot.Snapshot(snapshot_path)
+
+    return _snapshot
+
+
+def get_facets():
+    """Get the facet indexes of the catalog.
+
+    They are built on first use and rebuilt when the snapshot of the catalog is reopened.
+
+    Returns
+    -------
+    tuple
+        The :any:`catalog_snapshot.Snapshot` and its :any:`facets.FacetIndex`. Movies are
+        referred to by their snapshot record index.
+    """
+    global _facets
+
+    snapshot = get_snapshot()
+
+    with _facets_lock:
+        if _facets is None or _facets[0] is not snapshot:
+            _facets = (snapshot, facets.FacetIndex(
+                snapshot.movie(index) for index in range(len(snapshot))))
+
+    return _facets
+
+
+def json_response(data, status=200, headers={}):
+    """Create a JSON response.
+
+    Parameters
+    ----------
+    data : object, bytes
+        The data to serialize, or data already encoded as JSON.
+    status : int, optional
+        HTTP status code.
+    headers : dict, optional
+        Additional response headers.
+
+    Returns
+    -------
+    object
+        An instance of bottle.HTTPResponse.
+    """
+    body = data if isinstance(data, bytes) else json.dumps(data)
+
+    return bottle.HTTPResponse(body, status=status,
+                               headers=dict(headers, **{"Content-Type": "application/json"}))
+
 
 class MoviesDBWebapp(WebApp):
     """Web server.
@@ -77,6 +223,212 @@ class MoviesDBWebapp(WebApp):
 
         return file_data
 
+    @bottle_app.route("/api/movies")
+    def movies_list():
+        """Serve the list of movies.
+
+        Movies whose details weren't resolved yet are served with their base data only (no
+        ``details`` key), so a library can be browsed before its detailed data is generated.
+
+        The optional ``sort`` query parameter is one of the :any:`catalog_snapshot.SORT_KEYS`
+        (``file_name`` by default), ``order`` is ``asc`` (default) or ``desc``, and ``offset``
+        and ``limit`` select a page of the sorted list. The optional ``q`` query parameter only
+        lists the movies matching a query expression (see :any:`catalog_query`).
+
+        Pages of a limited size have an ``X-Next-Cursor`` header. Passing it as the ``after``
+        query parameter serves the next page, even if the catalog changed in the meantime (see
+        :any:`catalog_snapshot.Snapshot.cursor`).
+
+        Returns
+        -------
+        object
+            An instance of bottle.HTTPResponse.
+        """
+        query = bottle.request.query
+        sort = query.get("sort", "file_name")
+
+        if sort not in catalog_snapshot.SORT_KEYS:
+            return json_response({"error": "Invalid sort key."}, status=400)
+
+        try:
+            offset = max(0, int(query.get("offset", 0)))
+            limit = max(0, int(query["limit"])) if query.get("limit") else None
+        except ValueError:
+            return json_response({"error": "Invalid offset or limit."}, status=400)
+
+        snapshot = get_snapshot()
+        subset = None
+
+        if query.getunicode("q"):
+            try:
+                matches = get_app_utils().query_movies(query.getunicode("q"), with_details=False)
+            except ValueError as err:
+                return json_response({"error": str(err)}, status=400)
+
+            subset = {snapshot.find(movie["file_name"]) for movie in matches}
+
+        try:
+            indexes = snapshot.page(sort, offset, limit, reverse=query.get("order") == "desc",
+                                    subset=subset, after=query.get("after") or None)
+        except ValueError as err:
+            return json_response({"error": str(err)}, status=400)
+
+        # Movies resolved by the web application since the snapshot was written.
+        resolved = _enricher.details if _enricher is not None else {}
+        movies = []
+
+        for index in indexes:
+            movie = None if snapshot.has_details(index) else \
+                resolved.get(snapshot.file_name(index))
+            movies.append(json.dumps(movie).encode("utf-8") if movie else snapshot.raw(index))
+
+        headers = {"X-Next-Cursor": snapshot.cursor(sort, indexes[-1])} \
+            if limit and len(indexes) == limit else {}
+
+        return json_response(b"[" + b",".join(movies) + b"]", headers=headers)
+
+    @bottle_app.route("/api/movies/<file_name:path>")
+    def movie_details(file_name):
+        """Serve a movie data, resolving its details the first time they are requested.
+
+        The ``prefetch`` query parameter (it can be repeated) sets the file names of the movies
+        to resolve in the background (e.g. the neighbors of the movie in the current results
+        page), so they are already resolved when requested.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+
+        Returns
+        -------
+        object
+            An instance of bottle.HTTPResponse.
+        """
+        prefetch = [f for f in bottle.request.query.getall("prefetch") if f != file_name]
+
+        if prefetch:
+            get_enricher().prefetch(prefetch)
+
+        snapshot = get_snapshot()
+        index = snapshot.find(file_name)
+
+        if index is not None and snapshot.has_details(index):
+            return json_response(snapshot.raw(index))
+
+        enricher = get_enricher()
+
+        try:
+            movie = enricher.get(file_name)
+        except KeyError:
+            return json_response({"error": "Unknown movie."}, status=404)
+        except Exception as err:
+            # Quota exhaustion, lookup timeouts, etc. The lookup is retried on next request.
+            return json_response({"error": str(err)}, status=503)
+
+        if movie is None:
+            return json_response({"error": "Movie not found."}, status=404)
+
+        return json_response(movie)
+
+    @bottle_app.route("/api/search")
+    def search():
+        """Serve the result of a full-text search.
+
+        The ``q`` query parameter is the search query and the optional ``limit`` parameter
+        sets the maximum amount of results.
+
+        Returns
+        -------
+        object
+            An instance of bottle.HTTPResponse.
+        """
+        query = bottle.request.query.getunicode("q", default="")
+
+        try:
+            limit = int(bottle.request.query.get("limit", 20))
+        except ValueError:
+            return json_response({"error": "Invalid limit."}, status=400)
+
+        return json_response(get_app_utils().search_movies(query, limit))
+
+    @bottle_app.route("/api/facets")
+    def facets_counts():
+        """Serve the facet counts of the movies matching facet selections.
+
+        Each of the :any:`facets.FACETS` can be used as a query parameter (it can be repeated)
+        to select movies with any of its values (e.g. ``?genre=Drama&decade=1990``). The
+        optional ``limit`` query parameter sets the maximum amount of values per facet.
+
+        Returns
+        -------
+        object
+            An instance of bottle.HTTPResponse.
+        """
+        query = bottle.request.query.decode()
+
+        try:
+            limit = max(0, int(query.get("limit", facets.LIMIT)))
+            selections = {facet: [int(value) if facet in ("year", "decade") else value
+                                  for value in query.getall(facet)]
+                          for facet in facets.FACETS}
+        except ValueError:
+            return json_response({"error": "Invalid year, decade or limit."}, status=400)
+
+        return json_response(get_facets()[1].counts(selections, limit))
+
+    @bottle_app.route("/api/export/<export_format>")
+    def export(export_format):
+        """Serve the catalog exported as CSV, NDJSON or an M3U playlist.
+
+        The response is sent in chunks while the catalog is read. The ``filter`` query
+        parameter (it can be repeated) selects the exported movies (see :any:`catalog_query`).
+
+        Parameters
+        ----------
+        export_format : str
+            ``csv``, ``ndjson`` or ``m3u``.
+
+        Returns
+        -------
+        object
+            An instance of bottle.HTTPResponse.
+        """
+        app_utils = get_app_utils()
+
+        try:
+            chunks = app_utils.stream_movies(export_format,
+                                             bottle.request.query.decode().getall("filter"))
+        except ValueError as err:
+            return json_response({"error": str(err)}, status=400)
+
+        # Without Content-Length, the response is sent with chunked transfer encoding.
+        return bottle.HTTPResponse(chunks, headers={
+            "Content-Type": app_utils.exporters.CONTENT_TYPES[export_format],
+            "Content-Disposition": "attachment; filename=movies.%s" % export_format,
+        })
+
+    @bottle_app.route("/api/stats")
+    def stats():
+        """Serve the statistics of the catalog.
+
+        The optional ``top`` query parameter sets the amount of largest movie files reported
+        per resolution.
+
+        Returns
+        -------
+        object
+            An instance of bottle.HTTPResponse.
+        """
+        app_utils = get_app_utils()
+
+        try:
+            top = max(0, int(bottle.request.query.get("top", app_utils.stats.TOP)))
+        except ValueError:
+            return json_response({"error": "Invalid top."}, status=400)
+
+        return json_response(app_utils.movies_stats(top))
+
     # Non-existent location. It's used just to "catch" POST requests.
     @bottle_app.post("/local_videos")
     def handle_video_path():
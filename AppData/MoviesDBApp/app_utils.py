@@ -3,27 +3,79 @@
 
 Attributes
 ----------
+CATALOG_PATH : str
+    Path to the movies catalog (see :any:`catalog`).
+DISAMBIGUATION_PATH : str
+    Path to the queue of movies with ambiguous lookup results (see :any:`disambiguation`).
 EXT : tuple
     A list of video files extensions.
-movie_not_found : list
-    Description
+IMDB_ID_RE : re.Pattern
+    Matches an IMDb ID (e.g. tt1234567) in a file name or in the content of an NFO file.
+IMDB_INDEX_PATH : str
+    Path to the local index created from the IMDb datasets.
+TITLE_TRIGRAMS_PATH : str
+    Path to the snapshot of the trigram index of the titles from the local IMDb index, used to
+    fuzzy match titles.
 movies : list
     Description
 not_a_movie : list
     Description
+OMDB_LIMIT_ERROR : str
+    The error message returned by the OMDb API when the daily quota is spent.
+OMDB_NOT_FOUND_ERROR : str
+    The error message returned by the OMDb API when a movie isn't found.
 OMDB_URL : str
     Description
+OMDB_MAX_WORKERS : int
+    Maximum amount of concurrent requests performed against the OMDb API. The actual amount
+    is adjusted on the fly by an :any:`concurrency.AIMDController`.
+POSTERS_PATH : str
+    Path to the folder where movie posters are cached (see :any:`poster_cache`).
+SEARCH_INDEX_PATH : str
+    Path to the snapshot of the full-text index used when SQLite doesn't support FTS5.
+SNAPSHOT_PATH : str
+    Path to the binary snapshot of the catalog served by the web application (see
+    :any:`catalog_snapshot`).
 root_folder : str
-    The main folder containing the Knowledge Base. All commands must be executed
-    from this location without exceptions.
+    The main folder of the application (see :any:`paths.ROOT_FOLDER`).
 """
 
+import itertools
 import json
 import os
+import re
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from urllib.parse import urlencode
 
+from . import catalog
+from . import catalog_query
+from . import catalog_snapshot
+from . import concurrency
+from . import disambiguation
+from . import exporters
+from . import fuzzy_match
+from . import imdb_dataset
+from . import lazy_enrichment
+from . import lookup_planner
+from . import media_center_import
+from . import metadata_providers
+from . import ndjson
+from . import path_table
+from . import paths
+from . import poster_cache
+from . import progress_journal
+from . import quota_scheduler
+from . import response_cache
+from . import search_index
+from . import stats
 from .python_utils import exceptions
-from .python_utils import titlecase
-from .python_utils import tqdm
+from .python_utils import prompts
+from .python_utils.titlecase import titlecase
+from .python_utils.tqdm import tqdm
 
 try:
     import requests
@@ -36,11 +88,22 @@ except (SystemError, ImportError):
     raise exceptions.MissingDependencyModule("Module not installed: <guessit>2>")
 
 
-root_folder = os.path.realpath(os.path.abspath(os.path.join(
-    os.path.normpath(os.getcwd()))))
+root_folder = paths.ROOT_FOLDER
 
 
+IMDB_ID_RE = re.compile(r"(?<![a-z0-9])(tt\d{7,8})(?!\d)", re.IGNORECASE)
+IMDB_INDEX_PATH = os.path.join(root_folder, "UserData", "imdb_index.sqlite")
+TITLE_TRIGRAMS_PATH = os.path.join(root_folder, "UserData", "cache", "title_trigrams.pickle")
+CATALOG_PATH = os.path.join(root_folder, "UserData", "catalog.sqlite")
+DISAMBIGUATION_PATH = os.path.join(root_folder, "UserData", "disambiguation.json")
+POSTERS_PATH = os.path.join(root_folder, "UserData", "www", "assets", "posters")
+SEARCH_INDEX_PATH = os.path.join(root_folder, "UserData", "cache", "search_index.pickle")
+SNAPSHOT_PATH = os.path.join(root_folder, "UserData", "catalog.snapshot")
+
 OMDB_URL = 'http://www.omdbapi.com/?'
+OMDB_NOT_FOUND_ERROR = "Movie not found!"
+OMDB_LIMIT_ERROR = "Request limit reached!"
+OMDB_MAX_WORKERS = 16
 
 EXT = (".3g2", ".3gp", ".3gp2", ".3gpp", ".60d", ".ajp", ".asf", ".asx", ".avchd", ".avi", ".bik",
        ".bix", ".box", ".cam", ".dat", ".divx", ".dmf", ".dv", ".dvr-ms", ".evo", ".flc", ".fli",
@@ -53,28 +116,171 @@ EXT = (".3g2", ".3gp", ".3gp2", ".3gpp", ".60d", ".ajp", ".asf", ".asx", ".avchd
 
 movies = []
 not_a_movie = []
-movie_not_found = []
 
+_response_cache = None
+_single_flight = response_cache.SingleFlight()
+_quota_tracker = None
+_backoff = quota_scheduler.AdaptiveBackoff()
+_omdb_concurrency = concurrency.AIMDController(initial=4, max_limit=OMDB_MAX_WORKERS)
+_search_index = None
+_stats_columns = None
+# The trigram index OMDb responses are added to as they are cached (see get_title_matcher),
+# and the cache keys of the responses already added to it.
+_title_matcher = None
+_title_matcher_keys = set()
+_title_matcher_lock = threading.Lock()
+
+
+def find_imdb_id(file_name, nfo_path=None):
+    """Find the IMDb ID of a movie.
+
+    Parameters
+    ----------
+    file_name : str
+        The movie file name.
+    nfo_path : str, optional
+        Path to an NFO file describing the movie.
+
+    Returns
+    -------
+    str, None
+        The IMDb ID found in the file name or in the content of the NFO file.
+    """
+    match = IMDB_ID_RE.search(file_name)
+
+    if match is None and nfo_path:
+        with open(nfo_path, "r", encoding="utf-8", errors="replace") as file:
+            match = IMDB_ID_RE.search(file.read())
+
+    return match.group(1).lower() if match else None
+
+
+def open_catalog():
+    """Open the movies catalog.
+
+    A new catalog is populated from the JSON files generated by previous versions of the
+    application, if any.
+
+    Returns
+    -------
+    catalog.Catalog
+        The movies catalog.
+    """
+    movies_catalog = catalog.Catalog(CATALOG_PATH)
+
+    if movies_catalog.is_empty():
+        _import_legacy_data(movies_catalog)
+
+    return movies_catalog
+
+
+def _read_data_file(name, path_key):
+    """Read the records of a data file generated by a pipeline stage.
+
+    Parameters
+    ----------
+    name : str
+        The data file name without extension (e.g. ``1_data_from_files``).
+    path_key : str
+        The record field with the movie file path. Paths are stored prefix-compressed (see
+        :any:`path_table`).
+
+    Returns
+    -------
+    iterable
+        The records. Files generated by previous versions of the application (a single JSON
+        document) are also read.
+    """
+    base_path = os.path.join(root_folder, "UserData", name)
+
+    if ndjson.find(base_path + ".ndjson"):
+        decoder = path_table.FrontDecoder()
+
+        return (decoder.decode_record(record, path_key)
+                for record in ndjson.read(base_path + ".ndjson"))
+
+    if not os.path.isfile(base_path + ".json"):
+        return []
+
+    with open(base_path + ".json", "r") as file:
+        data = json.loads(file.read())
+
+    if isinstance(data, dict):
+        # Data generated before IMDb IDs were extracted only stored the path.
+        data = [dict(file_data, file_name=file_name) if isinstance(file_data, dict) else
+                {"file_name": file_name, "path": file_data, "imdb_id": find_imdb_id(file_name)}
+                for file_name, file_data in data.items()]
+
+    return data
+
+
+def _import_legacy_data(movies_catalog):
+    """Import the data files generated by each stage into the catalog.
+
+    Parameters
+    ----------
+    movies_catalog : catalog.Catalog
+        The movies catalog.
+    """
+    for record in _read_data_file("1_data_from_files", "path"):
+        movies_catalog.upsert_file(record["file_name"], record["path"], record["imdb_id"])
 
-def scan_directories(movies_paths, debug, logger):
+    for movie in _read_data_file("2_movies_names", "path_to_movie"):
+        movies_catalog.set_parse_result(movie["file_name"], movie["title"], movie["year"],
+                                        movie)
+
+    for movie in _read_data_file("3_movies_detailed_data", "path_to_movie"):
+        movies_catalog.set_metadata(movie["file_name"], movie["details"])
+
+    movies_catalog.commit()
+
+
+def scan_directories(movies_paths, debug, logger, compression="none"):
     """Scan directories.
 
+    The IMDb ID of every movie is extracted from its file name or from an NFO file stored
+    next to it (with the same name as the movie file or named ``movie.nfo``, see
+    :any:`metadata_providers.find_nfo_file`).
+
+    Found files are upserted into the catalog and files no longer found are removed from it.
+    Files are only removed from directories that exist, were scanned without errors and aren't
+    empty, so the files of an unmounted drive aren't removed.
+    The ``1_data_from_files.ndjson`` file is still generated for compatibility.
+
     Parameters
     ----------
     movies_paths : TYPE
         Description
-    debug : TYPE
-        Description
+    debug : bool
+        Whether to store the generated data uncompressed, for readability.
     logger : TYPE
         Description
+    compression : str, optional
+        Compression of the generated data file. See :any:`ndjson.COMPRESSIONS`.
     """
-    data_from_files = {}
+    movies_catalog = open_catalog()
+    scan_id = time.time()
+    scanned_roots = []
     errors = []
 
     # The following progress bars are kind of pointless.
     # All the directories are scanned in a fraction of a second.
     for mp in tqdm(movies_paths):
-        for root, dirs, files in tqdm(os.walk(mp)):
+        if not os.path.isdir(mp):
+            logger.warning("Directory not found: %s" % mp)
+            continue
+
+        walk_errors = []
+        files_count = 0
+
+        for root, dirs, files in tqdm(os.walk(mp, onerror=walk_errors.append)):
+            files_count += len(files)
+            nfo_files = {f.lower(): f for f in files if f.lower().endswith(".nfo")}
+
+            # A movie.nfo file only describes the movie of a folder with a single movie.
+            if not metadata_providers.is_single_movie_folder(files, EXT):
+                nfo_files.pop("movie.nfo", None)
+
             for filename in files:
                 p = os.path.abspath(os.path.join(root, filename))
 
@@ -83,94 +289,98 @@ def scan_directories(movies_paths, debug, logger):
                         f_name, f_ext = os.path.splitext(filename)
 
                         if f_ext in EXT:
-                            data_from_files[f_name] = p
+                            nfo_file = nfo_files.get(f_name.lower() + ".nfo",
+                                                     nfo_files.get("movie.nfo"))
+                            nfo_path = os.path.abspath(os.path.join(root, nfo_file)) \
+                                if nfo_file else None
+                            movies_catalog.upsert_file(
+                                f_name, p,
+                                imdb_id=find_imdb_id(f_name, nfo_path),
+                                scan_id=scan_id,
+                                sidecars={nfo_path: "nfo"} if nfo_path else {}
+                            )
                     except Exception as err:
                         errors.append(err)
                         continue  # This is kind of pointless.
 
+        if walk_errors:
+            errors.extend(walk_errors)
+        elif files_count:
+            scanned_roots.append(os.path.abspath(mp))
+        else:
+            logger.warning("Directory is empty: %s" % mp)
+
+    removed = movies_catalog.remove_missing(scan_id, scanned_roots)
+    movies_catalog.commit()
+
+    if removed:
+        logger.info("Files no longer found: %d" % removed)
+
     if errors:
         logger.error("Errors found while scaning directories.")
-        logger.error("\n".join(errors), term=False, date=True)
+        logger.error("\n".join(map(str, errors)), term=False, date=True)
 
-    json_file = os.path.join(root_folder, "UserData", "1_data_from_files.json")
+    coder = path_table.FrontCoder()
+    ndjson.write(os.path.join(root_folder, "UserData", "1_data_from_files.ndjson"),
+                 (coder.encode_record({"file_name": file_name, "path": path, "imdb_id": imdb_id},
+                                      "path")
+                  for file_name, path, imdb_id in movies_catalog.files()),
+                 "none" if debug else compression)
+    export_snapshot(movies_catalog)
+    movies_catalog.close()
 
-    with open(json_file, "w") as out:
-        if debug:
-            json.dump(data_from_files, out, indent=4)
-        else:
-            json.dump(data_from_files, out)
 
+def generate_movies_base_data_from_file_names(debug, logger, compression="none"):
+    """Guess the movies data from their file names.
 
-def generate_movies_base_data_from_file_names(debug, logger):
-    """Summary
+    Only the files added to the catalog since the last run are parsed. The
+    ``2_movies_names.ndjson`` file is still generated for compatibility.
 
     Parameters
     ----------
-    debug : TYPE
-        Description
+    debug : bool
+        Whether to store the generated data uncompressed, for readability.
     logger : TYPE
         Description
-
-    Raises
-    ------
-    RuntimeError
-        Description
+    compression : str, optional
+        Compression of the generated data file. See :any:`ndjson.COMPRESSIONS`.
     """
-    data_from_files = os.path.join(root_folder, "UserData", "1_data_from_files.json")
-    movies_base_info = []
-    movies_without_info = []
-    json_data_from_file = None
+    movies_catalog = open_catalog()
     errors = []
 
-    with open(data_from_files, "r") as file:
-        json_data_from_file = json.loads(file.read())
-
-    if json_data_from_file is None:
-        raise RuntimeError("json_data_from_file is None")
-
-    for movie_file_name in tqdm(json_data_from_file):
-        movie_info_raw = dict(guessit(movie_file_name, options={
-            "verbose": False,
-            "type": "movie",
-            "json": True,
-            "name_only": True,
-        }))
-
-        movie_title = movie_info_raw.get("title", 0)
-        # The dictionary returned by guessit contains keys impossible to directly encode to JSON.
-        # Create a custom dict with only the data that I want/need and move on.
-        movie_base_info = {
-            "path_to_movie": json_data_from_file[movie_file_name],
-            "file_name": movie_file_name,
-            "title": titlecase(movie_title) if movie_title else movie_title,
-            "year": movie_info_raw.get("year", 0),
-            "cd": movie_info_raw.get("cd", 0),
-            "format": movie_info_raw.get("format", 0),
-            "screen_size": movie_info_raw.get("screen_size", 0),
-            "video_codec": movie_info_raw.get("video_codec", 0),
-            "release_group": movie_info_raw.get("release_group", 0),
-            "type": movie_info_raw.get("type", 0),
-        }
-
+    # Parse results only depend on the file names, so only new files are parsed.
+    for movie_file_name in tqdm(movies_catalog.unparsed()):
         try:
-            if movie_base_info.get("title"):
-                movies_base_info.append(movie_base_info)
-            else:
-                movies_without_info.append(movie_base_info)
+            movie_info_raw = dict(guessit(movie_file_name, options={
+                "verbose": False,
+                "type": "movie",
+                "json": True,
+                "name_only": True,
+            }))
         except Exception as err:
-            errors.append(err)
+            errors.append("%s: %s" % (movie_file_name, err))
+            continue
+
+        movie_title = movie_info_raw.get("title")
+        movies_catalog.set_parse_result(movie_file_name,
+                                        titlecase(movie_title) if movie_title else None,
+                                        movie_info_raw.get("year"),
+                                        movie_info_raw)
+
+    movies_catalog.commit()
 
     if errors:
         logger.error("Errors found while generating data from file names.")
         logger.error("\n".join(errors), term=False, date=True)
 
-    movie_names = os.path.join(root_folder, "UserData", "2_movies_names.json")
-
-    with open(movie_names, "w") as out:
-        if debug:
-            json.dump(movies_base_info, out, indent=4)
-        else:
-            json.dump(movies_base_info, out)
+    # Movies with an IMDb ID can be looked up even if their title couldn't be guessed.
+    coder = path_table.FrontCoder()
+    ndjson.write(os.path.join(root_folder, "UserData", "2_movies_names.ndjson"),
+                 (coder.encode_record(movie, "path_to_movie")
+                  for movie in movies_catalog.movies()),
+                 "none" if debug else compression)
+    export_snapshot(movies_catalog)
+    movies_catalog.close()
 
 
 def get_movie_info(name):
@@ -196,31 +406,1176 @@ def get_movie_info(name):
         not_a_movie.append(name)
 
 
-def omdb(title, year):
+def import_imdb_dataset(basics_path, ratings_path, logger):
+    """Import the IMDb datasets into the local index stored at :any:`IMDB_INDEX_PATH`.
+
+    Parameters
+    ----------
+    basics_path : str
+        Path to the ``title.basics.tsv.gz`` file.
+    ratings_path : str
+        Path to the ``title.ratings.tsv.gz`` file.
+    logger : LogSystem
+        The logger.
+    """
+    for path in (basics_path, ratings_path):
+        if not os.path.isfile(path):
+            raise exceptions.MissingRequiredFile("File not found: %s" % path)
+
+    total = imdb_dataset.import_dataset(basics_path, ratings_path, IMDB_INDEX_PATH, logger)
+    logger.success("Imported titles: %d" % total)
+
+
+def import_media_center(source_type, source, path_map, overwrite, logger):
+    """Import the movie details of a media center library into the catalog.
+
+    Parameters
+    ----------
+    source_type : str
+        One of the :any:`media_center_import.SOURCES`.
+    source : str
+        Path to the Kodi or Jellyfin database, or to the folder with the NFO files.
+    path_map : list
+        ``from=to`` path prefix mappings from the library paths to the local paths (see
+        :any:`media_center_import.map_path`).
+    overwrite : bool
+        Replace the details of movies already resolved.
+    logger : LogSystem
+        The logger.
+
+    Raises
+    ------
+    exceptions.MissingRequiredFile
+        If the source doesn't exist.
+    exceptions.WrongValueForOption
+        If a path mapping is malformed.
+    """
+    if not os.path.exists(source):
+        raise exceptions.MissingRequiredFile("File not found: %s" % source)
+
+    if not all("=" in mapping for mapping in path_map):
+        raise exceptions.WrongValueForOption("Path mappings must be in the from=to format.")
+
+    if source_type == "kodi":
+        entries = media_center_import.read_kodi(source)
+    elif source_type == "jellyfin":
+        entries = media_center_import.read_jellyfin(source)
+    else:
+        entries = media_center_import.read_nfo_tree(source, EXT)
+
+    movies_catalog = open_catalog()
+
+    try:
+        summary = media_center_import.import_entries(
+            movies_catalog, entries, source_type,
+            [tuple(mapping.split("=", 1)) for mapping in path_map], overwrite)
+        export_snapshot(movies_catalog)
+    finally:
+        movies_catalog.close()
+
+    logger.success("Matched by path: %d" % summary["path"])
+    logger.success("Matched by fingerprint: %d" % summary["fingerprint"])
+    logger.info("Already resolved (%s): %d" % ("replaced" if overwrite else "kept",
+                                               summary["resolved"]))
+    logger.info("Unmatched: %d" % summary["unmatched"])
+
+
+def get_title_matcher(imdb_index=None, logger=None):
+    """Get the trigram index used to fuzzy match titles.
+
+    The index contains the titles from the local IMDb index and from the cached OMDb
+    responses. The titles from the IMDb index are loaded from a snapshot stored at
+    :any:`TITLE_TRIGRAMS_PATH` unless the IMDb index changed since the snapshot was created.
+    The titles of the cached responses are added after loading it, and the responses cached
+    afterwards are added as they are stored, so caching responses doesn't invalidate the
+    snapshot.
+
+    Parameters
+    ----------
+    imdb_index : imdb_dataset.IMDbIndex, optional
+        The local IMDb index.
+    logger : LogSystem, optional
+        The logger.
+
+    Returns
+    -------
+    fuzzy_match.TrigramIndex
+        The trigram index. Item identifiers are ``(source, id)`` tuples, where ``source`` is
+        either ``imdb`` (``id`` is an IMDb ID) or ``omdb`` (``id`` is a responses cache key).
+    """
+    global _title_matcher, _title_matcher_keys
+
+    matcher = None
+
+    if imdb_index is not None:
+        signature = os.path.getmtime(imdb_index.db_path)
+        matcher = fuzzy_match.TrigramIndex.load(TITLE_TRIGRAMS_PATH, signature)
+
+        if matcher is None:
+            if logger:
+                logger.info("Building titles trigram index...")
+
+            matcher = fuzzy_match.TrigramIndex()
+
+            for tconst, title, year in imdb_index.iter_titles():
+                matcher.add(("imdb", tconst), title, year)
+
+            matcher.save(TITLE_TRIGRAMS_PATH, signature)
+
+    with _title_matcher_lock:
+        _title_matcher = matcher or fuzzy_match.TrigramIndex()
+        _title_matcher_keys = set()
+
+    for key, data in get_response_cache().iter_found():
+        _add_omdb_title(key, data)
+
+    return _title_matcher
+
+
+def _add_omdb_title(key, data):
+    """Add the title of an OMDb response to the trigram index used to fuzzy match titles.
+
+    Parameters
+    ----------
+    key : str
+        The responses cache key of the response.
+    data : dict
+        The response.
+    """
+    with _title_matcher_lock:
+        if _title_matcher is None or key in _title_matcher_keys:
+            return
+
+        # Searches aren't locked. Titles are stored before their trigrams are indexed, so
+        # they only find complete items.
+        year = data.get("Year", "")[:4]
+        _title_matcher.add(("omdb", key), data.get("Title", ""),
+                           year if year.isdigit() else None)
+        _title_matcher_keys.add(key)
+
+
+class OMDbProvider(metadata_providers.MetadataProvider):
+    """Resolve movies through the OMDb API (see :any:`omdb`).
+
+    Attributes
+    ----------
+    api_key : str
+        OMDb API key.
+    matcher : fuzzy_match.TrigramIndex
+        Trigram index used to fuzzy match titles. Only items whose identifier is an
+        ``("omdb", key)`` tuple are considered.
+    url : str
+        The API URL.
+    """
+    name = "omdb"
+
+    def __init__(self, api_key=None, matcher=None, url=OMDB_URL):
+        """Initialization.
+
+        Parameters
+        ----------
+        api_key : str, optional
+            OMDb API key.
+        matcher : fuzzy_match.TrigramIndex, optional
+            Trigram index used to fuzzy match titles.
+        url : str, optional
+            The API URL.
+        """
+        self.api_key = api_key
+        self.matcher = matcher
+        self.url = url
+
+    def lookup(self, movie):
+        """See :any:`metadata_providers.MetadataProvider.lookup`.
+
+        Movies with an IMDb ID are fetched by ID. Otherwise, the lookups generated by
+        :any:`lookup_planner.plan` are tried in order against the cache, then the title is
+        fuzzy matched against the cached responses and, finally, only the most likely lookups
+        are tried against the API. Responses whose year is too far from the movie year (see
+        :any:`lookup_planner.is_confident`) are ignored.
+
+        Parameters
+        ----------
+        movie : dict
+            See :any:`metadata_providers.MetadataProvider.lookup`.
+
+        Returns
+        -------
+        dict, None
+            See :any:`metadata_providers.MetadataProvider.lookup`.
+
+        Raises
+        ------
+        metadata_providers.AmbiguousMatch
+            See :any:`metadata_providers.pick_fuzzy_match`.
+        """
+        title, year = movie.get("title"), movie.get("year")
+
+        if movie.get("imdb_id"):
+            data = omdb(None, None, self.api_key, imdb_id=movie["imdb_id"], url=self.url)
+
+            if data.get("Response") == "True":
+                return data
+
+        if not title:
+            return None
+
+        lookups = lookup_planner.plan(title, year)
+
+        for lookup_title, lookup_year in lookups:
+            data = omdb(lookup_title, lookup_year, self.api_key, offline=True, url=self.url)
+
+            if data is not None and data.get("Response") == "True" and \
+                    lookup_planner.is_confident(year, data.get("Year")):
+                return data
+
+        if self.matcher is not None:
+            data = metadata_providers.pick_fuzzy_match(self.matcher.search(title, year),
+                                                       self._resolve_match)
+
+            if data is not None:
+                return data
+
+        for lookup_title, lookup_year in lookups[:lookup_planner.MAX_REMOTE_LOOKUPS]:
+            data = omdb(lookup_title, lookup_year, self.api_key, url=self.url)
+
+            if data.get("Response") == "True" and \
+                    lookup_planner.is_confident(year, data.get("Year")):
+                return data
+
+        return None
+
+    def _resolve_match(self, item_id):
+        """Get the details of a fuzzy match.
+
+        Parameters
+        ----------
+        item_id : tuple
+            The match identifier.
+
+        Returns
+        -------
+        dict, None
+            The match details, or None if it isn't a cached OMDb response.
+        """
+        source, key = item_id
+
+        if source == "omdb":
+            status, data = get_response_cache().get(key)
+
+            if status == response_cache.CACHE_HIT:
+                return data
+
+        return None
+
+
+def get_provider_chain(config, logger=None):
+    """Build the chain of metadata providers used to resolve movies.
+
+    Parameters
+    ----------
+    config : dict
+        The user configuration. The following keys are used:
+
+        - ``omdb_api_key``: OMDb API key.
+        - ``metadata_providers``: Names of the providers to use, in order of preference. \
+        Available providers are ``imported``, ``nfo``, ``imdb`` (only used if the local IMDb \
+        index exists), ``omdb`` and the ones defined in ``json_http_providers``. \
+        Default: ``["imported", "nfo", "imdb", "omdb"]``. The ``imported`` provider (see \
+        :any:`import_media_center`) is only used if it's listed.
+        - ``metadata_providers_mode``: ``ordered`` or ``race``. \
+        See :any:`metadata_providers.ProviderChain`.
+        - ``metadata_lookup_budget``: Maximum time in seconds to resolve a single movie.
+        - ``json_http_providers``: List of dictionaries with ``name``, ``url`` and ``fields`` \
+        keys. See :any:`metadata_providers.JSONHTTPProvider`.
+    logger : LogSystem, optional
+        The logger.
+
+    Returns
+    -------
+    metadata_providers.ProviderChain
+        The chain of metadata providers.
+    """
+    imdb_index = imdb_dataset.IMDbIndex(IMDB_INDEX_PATH) \
+        if os.path.isfile(IMDB_INDEX_PATH) else None
+    matcher = get_title_matcher(imdb_index, logger)
+    available = {
+        "imported": lambda: metadata_providers.ImportedProvider(open_catalog()),
+        "nfo": lambda: metadata_providers.NFOProvider(EXT),
+        "imdb": lambda: metadata_providers.IMDbIndexProvider(imdb_index, matcher)
+        if imdb_index is not None else None,
+        "omdb": lambda: OMDbProvider(config.get("omdb_api_key"), matcher),
+    }
+
+    for definition in config.get("json_http_providers", []):
+        available[definition["name"]] = (
+            lambda d=definition: metadata_providers.JSONHTTPProvider(d["name"], d["url"],
+                                                                     d["fields"]))
+
+    providers = []
+
+    # Imported details cost no API quota, so they are looked up first by default. A configured
+    # list of providers is used as is.
+    names = config.get("metadata_providers", ["imported", "nfo", "imdb", "omdb"])
+
+    for name in names:
+        provider = available[name]() if name in available else None
+
+        if provider is not None:
+            providers.append(provider)
+        elif logger and name != "imdb":
+            logger.warning("Unknown metadata provider: %s" % name)
+
+    if imdb_index is not None and not any(p.name == "imdb" for p in providers):
+        imdb_index.close()
+
+    return metadata_providers.ProviderChain(
+        providers,
+        mode=config.get("metadata_providers_mode", "ordered"),
+        budget=config.get("metadata_lookup_budget", metadata_providers.DEFAULT_BUDGET))
+
+
+def get_response_cache():
+    """Get the OMDb responses cache.
+
+    Returns
+    -------
+    response_cache.ResponseCache
+        The cache instance shared by all the OMDb lookups.
+    """
+    global _response_cache
+
+    if _response_cache is None:
+        _response_cache = response_cache.ResponseCache(
+            os.path.join(root_folder, "UserData", "cache", "omdb_responses.sqlite"))
+
+    return _response_cache
+
+
+def get_quota_tracker(daily_limit=quota_scheduler.DEFAULT_DAILY_LIMIT):
+    """Get the OMDb requests quota tracker.
+
+    Parameters
+    ----------
+    daily_limit : int, optional
+        Amount of requests allowed per day. Only used the first time this function is called.
+
+    Returns
+    -------
+    quota_scheduler.QuotaTracker
+        The quota tracker shared by all the OMDb lookups.
+    """
+    global _quota_tracker
+
+    if _quota_tracker is None:
+        _quota_tracker = quota_scheduler.QuotaTracker(
+            os.path.join(root_folder, "UserData", "cache", "omdb_quota.json"),
+            daily_limit=daily_limit)
+
+    return _quota_tracker
+
+
+def omdb(title, year, api_key=None, imdb_id=None, offline=False, url=OMDB_URL):
     """Fetch data from OMDB API.
 
+    Responses are served from :any:`get_response_cache` when possible and identical lookups
+    performed concurrently are coalesced into a single request.
+
     Parameters
     ----------
     title : TYPE
         Description
     year : TYPE
         Description
+    api_key : str, optional
+        OMDb API key.
+    imdb_id : str, optional
+        The movie IMDb ID. If passed, the movie is fetched by ID and ``title`` and ``year``
+        are ignored.
+    offline : bool, optional
+        Only look up the cache. None is returned if the response isn't cached.
+    url : str, optional
+        The API URL.
 
     Returns
     -------
     TYPE
         Description
     """
-    params = {'t': title.encode('ascii', 'ignore'),
-              'plot': 'full',
+    params = {'plot': 'full',
               'type': 'movie',
               'tomatoes': 'true'}
 
+    if imdb_id:
+        title, year = "", None
+        params['i'] = imdb_id
+    else:
+        params['t'] = title.encode('ascii', 'ignore')
+
     if year:
         params['y'] = year
 
-    url = OMDB_URL + urlencode(params)
-    return json.loads(requests.get(url).text)
+    # Responses from other servers (e.g. a local stand-in server) are cached separately.
+    key = response_cache.make_key(title, year, params if url == OMDB_URL else dict(params, url=url))
+
+    return _single_flight.do((key, offline), _omdb_cached, key, params, api_key, offline, url)
+
+
+def _omdb_cached(key, params, api_key, offline=False, url=OMDB_URL):
+    """Fetch data from OMDB API through the responses cache.
+
+    Parameters
+    ----------
+    key : str
+        See :any:`response_cache.make_key`.
+    params : dict
+        The request parameters.
+    api_key : str
+        OMDb API key.
+    offline : bool, optional
+        See :any:`omdb`.
+    url : str, optional
+        See :any:`omdb`.
+
+    Returns
+    -------
+    dict, None
+        The (possibly cached) response.
+    """
+    cache = get_response_cache()
+    status, data = cache.get(key)
+
+    if status == response_cache.CACHE_HIT:
+        return data
+
+    if status == response_cache.CACHE_NOT_FOUND:
+        return {"Response": "False", "Error": OMDB_NOT_FOUND_ERROR}
+
+    if offline:
+        return None
+
+    data = _omdb_request(params, api_key, url)
+
+    if data.get("Response") == "True":
+        cache.set(key, data)
+        _add_omdb_title(key, data)
+    elif data.get("Error") == OMDB_NOT_FOUND_ERROR:
+        cache.set_not_found(key)
+
+    return data
+
+
+def _omdb_request(params, api_key, url=OMDB_URL):
+    """Perform a request to the OMDb API.
+
+    Every request spends one unit of the daily quota. Throttled responses are retried with
+    an adaptive backoff.
+
+    Parameters
+    ----------
+    params : dict
+        The request parameters.
+    api_key : str
+        OMDb API key.
+    url : str, optional
+        See :any:`omdb`.
+
+    Returns
+    -------
+    dict
+        The response.
+
+    Raises
+    ------
+    quota_scheduler.QuotaExhausted
+        If the daily quota is spent.
+    RuntimeError
+        If the request is still throttled after the maximum amount of attempts.
+    """
+    if api_key:
+        params = dict(params, apikey=api_key)
+
+    url = url + urlencode(params)
+    tracker = get_quota_tracker()
+
+    for attempt in range(_backoff.max_attempts):
+        _backoff.wait()
+        tracker.acquire()
+
+        with _omdb_concurrency.slot() as slot:
+            response = requests.get(url, timeout=30)
+
+            if response.status_code >= 500 or \
+                    response.status_code in quota_scheduler.THROTTLE_STATUS_CODES:
+                slot.fail()
+
+        if response.status_code not in quota_scheduler.THROTTLE_STATUS_CODES:
+            _backoff.success()
+            return json.loads(response.text)
+
+        try:
+            error = response.json().get("Error", "")
+        except ValueError:
+            error = ""
+
+        if error == OMDB_LIMIT_ERROR:
+            tracker.mark_exhausted()
+            raise quota_scheduler.QuotaExhausted(error)
+
+        if error == "Invalid API key!":
+            raise RuntimeError(error)
+
+        retry_after = response.headers.get("Retry-After", "")
+        _backoff.failure(float(retry_after) if retry_after.isdigit() else None)
+
+    raise RuntimeError("Request throttled (HTTP %d) after %d attempts." %
+                       (response.status_code, _backoff.max_attempts))
+
+
+def generate_movies_detailed_data(config, debug, logger, compression="none", refresh=False):
+    """Generate detailed movies data.
+
+    Movies are resolved by the metadata providers configured by the user (see
+    :any:`get_provider_chain`). Movies never looked up before and movies with a known year are
+    looked up first. Once the OMDb daily quota is spent, the remaining lookups are deferred to
+    the next run.
+
+    Movies matching several plausible candidates are queued to be resolved by the user later
+    (see :any:`resolve_ambiguous_movies`).
+
+    Movies already resolved aren't looked up again unless ``refresh`` is set. A lookup that
+    doesn't find a movie never discards the details already stored for it.
+
+    Every completed lookup is appended to a journal. An interrupted run (Ctrl + C, crash or
+    quota exhaustion) is resumed from it by the next run. The journal is stored into the
+    catalog, and the ``3_movies_detailed_data.ndjson`` file is written from the resolved
+    movies of the catalog.
+
+    Parameters
+    ----------
+    config : dict
+        The user configuration. See :any:`get_provider_chain`. The ``omdb_daily_limit`` key
+        sets the amount of requests allowed per day by the OMDb API key.
+    debug : bool
+        Whether to store the generated data uncompressed, for readability.
+    logger : LogSystem
+        The logger.
+    compression : str, optional
+        Compression of the generated data file. See :any:`ndjson.COMPRESSIONS`.
+    refresh : bool, optional
+        Look up the movies already resolved too.
+
+    Raises
+    ------
+    exceptions.KeyboardInterruption
+        Halt execution on Ctrl + C press.
+    """
+    movies_detailed_data = os.path.join(root_folder, "UserData",
+                                        "3_movies_detailed_data.ndjson")
+    journal = progress_journal.ProgressJournal(movies_detailed_data + ".journal")
+    movies_catalog = open_catalog()
+    movies_not_found = []
+    movies_deferred = []
+    movies_ambiguous = []
+    fast_path_count = 0
+    errors = []
+    tracker = get_quota_tracker(config.get("omdb_daily_limit",
+                                           quota_scheduler.DEFAULT_DAILY_LIMIT))
+    providers = get_provider_chain(config, logger)
+    queue = disambiguation.DisambiguationQueue(DISAMBIGUATION_PATH)
+    completed = journal.load("file_name")
+
+    if completed:
+        logger.info("Resuming previous run. Completed lookups: %d" % len(completed))
+
+    resolved = movies_catalog.resolved()
+
+    # Movies resolved by other means (e.g. imported or chosen by the user) are forgotten too.
+    for file_name in tracker.attempted & resolved:
+        tracker.mark_resolved(file_name)
+
+    if not refresh:
+        completed |= resolved
+
+    movies_base_info = quota_scheduler.prioritize(
+        [queue.apply(m) for m in movies_catalog.movies() if m["file_name"] not in completed],
+        tracker.attempted)
+
+    # Cached lookups don't hit the network, so threads are cheap. The amount of concurrent
+    # requests is limited by _omdb_concurrency.
+    executor = ThreadPoolExecutor(max_workers=OMDB_MAX_WORKERS)
+
+    try:
+        futures = {executor.submit(providers.lookup, movie): movie for movie in movies_base_info}
+
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            movie = futures[future]
+
+            try:
+                data = future.result()
+            except quota_scheduler.QuotaExhausted:
+                movies_deferred.append(movie["file_name"])
+                continue
+            except metadata_providers.AmbiguousMatch as err:
+                if queue.is_dismissed(movie):
+                    data = metadata_providers.NOT_FOUND
+                else:
+                    queue.push(movie, err.candidates)
+                    movies_ambiguous.append(movie["file_name"])
+                    continue
+            except Exception as err:
+                errors.append("%s: %s" % (movie["file_name"], err))
+                continue
+
+            if data.get("Response") == "True":
+                tracker.mark_resolved(movie["file_name"])
+                queue.discard(movie["file_name"])
+                journal.append({"file_name": movie["file_name"],
+                                "movie": dict(movie, details=data)})
+
+                if movie.get("imdb_id") and data.get("imdbID") == movie["imdb_id"]:
+                    fast_path_count += 1
+            else:
+                tracker.mark_attempted(movie["file_name"])
+                journal.append({"file_name": movie["file_name"], "movie": None})
+                movies_not_found.append(movie["file_name"])
+    except KeyboardInterrupt:
+        journal.close()
+        tracker.save()
+        queue.save()
+        raise exceptions.KeyboardInterruption(
+            "Operation aborted. Completed lookups were stored and will be resumed.")
+    finally:
+        # Every lookup is done unless the loop was interrupted, and then the pending ones are
+        # cancelled instead of waited for.
+        executor.shutdown(wait=False, cancel_futures=True)
+        providers.close()
+
+    tracker.save()
+    queue.save()
+
+    logger.info("Resolved by IMDb ID (file name or NFO): %d of %d (%.1f%%)" % (
+        fast_path_count, len(movies_base_info),
+        100 * fast_path_count / len(movies_base_info) if movies_base_info else 0))
+    logger.info("OMDb requests spent today: %d (%d left)" % (tracker.used, tracker.remaining))
+    logger.info("OMDb %s" % _omdb_concurrency.summary())
+
+    if movies_deferred:
+        logger.warning("Daily quota exhausted. Lookups deferred to the next run: %d" %
+                       len(movies_deferred))
+
+    if movies_ambiguous:
+        logger.warning("Movies with ambiguous matches: %d" % len(movies_ambiguous))
+        logger.warning("Run `app.py movies resolve` to choose the right ones.")
+
+    evicted = get_response_cache().evict()
+
+    if evicted:
+        logger.info("Evicted %d entries from the responses cache." % evicted)
+
+    if movies_not_found:
+        logger.warning("Movies not found: %d" % len(movies_not_found))
+        logger.warning("\n".join(movies_not_found), term=False, date=True)
+
+    if errors:
+        logger.error("Errors found while generating detailed data.")
+        logger.error("\n".join(errors), term=False, date=True)
+
+    journal.close()
+
+    for record in journal:
+        movie = record["movie"]
+        movies_catalog.set_metadata(record["file_name"], movie["details"] if movie else None)
+
+    movies_catalog.commit()
+
+    # Keep the journal if there are pending lookups so the next run resumes from it.
+    if not movies_deferred and not errors and os.path.isfile(journal.path):
+        os.remove(journal.path)
+
+    coder = path_table.FrontCoder()
+    ndjson.write(movies_detailed_data,
+                 (coder.encode_record(movie, "path_to_movie")
+                  for movie in movies_catalog.details().values() if movie),
+                 "none" if debug else compression)
+    export_snapshot(movies_catalog)
+    movies_catalog.close()
+
+
+def resolve_ambiguous_movies(debug, logger, compression="none"):
+    """Let the user choose the right candidate for the movies with ambiguous lookup results.
+
+    Queued movies are presented in batches. The answers of each batch are stored at once into
+    the detailed data and remembered, so movies with the same guessed title and year are
+    resolved automatically by the next runs (see :any:`disambiguation`).
+
+    Parameters
+    ----------
+    debug : bool
+        Whether to store the generated data uncompressed, for readability.
+    logger : LogSystem
+        The logger.
+    compression : str, optional
+        Compression of the generated data file. See :any:`ndjson.COMPRESSIONS`.
+    """
+    from .python_utils.multi_select import MultiSelect
+
+    queue = disambiguation.DisambiguationQueue(DISAMBIGUATION_PATH)
+    items = queue.items()
+
+    if not items:
+        logger.info("No movies with ambiguous matches.")
+        return
+
+    for start in range(0, len(items), disambiguation.BATCH_SIZE):
+        batch = {item["movie"]["file_name"]: item
+                 for item in items[start:start + disambiguation.BATCH_SIZE]}
+        selected = MultiSelect(
+            list(batch),
+            title="Select the movies to resolve (%d-%d of %d)" % (
+                start + 1, start + len(batch), len(items))
+        ).getSelected()
+
+        if selected is False:
+            break
+
+        answers = {}
+
+        for file_name in selected:
+            candidates = batch[file_name]["candidates"]
+            choice = {}
+
+            logger.info("**%s**" % file_name, date=False, to_file=False)
+
+            for i, candidate in enumerate(candidates, start=1):
+                logger.info("%d. %s (%s) %s" % (i, candidate.get("Title"), candidate.get("Year"),
+                                                candidate.get("imdbID")),
+                            date=False, to_file=False)
+
+            prompts.do_prompt(choice, "number", "Candidate number (0 if none is right)",
+                              validator=lambda x, n=len(candidates): _validate_choice(x, n))
+            answers[file_name] = candidates[choice["number"] - 1] if choice["number"] else None
+
+        if answers and prompts.confirm("Store %d answers?" % len(answers), response=True):
+            _store_resolved_movies([dict(batch[file_name]["movie"], imdb_id=candidate["imdbID"],
+                                         details=candidate)
+                                    for file_name, candidate in answers.items() if candidate],
+                                   "none" if debug else compression)
+            queue.answer(answers)
+            queue.save()
+            logger.success("Stored answers: %d" % len(answers))
+
+    logger.info("Movies left to resolve: %d" % len(queue))
+
+
+def _validate_choice(value, count):
+    """Validate the candidate number entered by the user.
+
+    Parameters
+    ----------
+    value : str
+        The entered value.
+    count : int
+        Amount of candidates.
+
+    Returns
+    -------
+    int
+        The candidate number.
+
+    Raises
+    ------
+    exceptions.ValidationError
+        If the value isn't a number between 0 and the amount of candidates.
+    """
+    if not value.isdigit() or int(value) > count:
+        raise exceptions.ValidationError("Please enter a number from 0 to %d." % count)
+
+    return int(value)
+
+
+def _store_resolved_movies(resolved, compression="none"):
+    """Store movies resolved outside of :any:`generate_movies_detailed_data`.
+
+    Movies are stored into the catalog. They are also appended to the journal of an
+    unfinished run (or of a run that never happened), so they are part of the detailed data
+    once it's generated. Otherwise, they are merged into the detailed data file.
+
+    Parameters
+    ----------
+    resolved : list
+        The movies data, including their details.
+    compression : str, optional
+        Compression of the detailed data file. See :any:`ndjson.COMPRESSIONS`.
+    """
+    movies_detailed_data = os.path.join(root_folder, "UserData",
+                                        "3_movies_detailed_data.ndjson")
+    journal = progress_journal.ProgressJournal(movies_detailed_data + ".journal")
+    movies_catalog = open_catalog()
+
+    for movie in resolved:
+        movies_catalog.set_metadata(movie["file_name"], movie["details"])
+
+    export_snapshot(movies_catalog)
+    movies_catalog.close()
+
+    if os.path.isfile(journal.path) or ndjson.find(movies_detailed_data) is None:
+        for movie in resolved:
+            journal.append({"file_name": movie["file_name"], "movie": movie})
+
+        journal.close()
+        return
+
+    resolved = {movie["file_name"]: movie for movie in resolved}
+    decoder = path_table.FrontDecoder()
+    coder = path_table.FrontCoder()
+    # The stored movies are streamed from the current file into the new one. Paths are decoded
+    # even for skipped movies, since they can define directories used by the following ones.
+    stored = (m for m in (decoder.decode_record(m, "path_to_movie")
+                          for m in ndjson.read(movies_detailed_data))
+              if m["file_name"] not in resolved)
+    ndjson.write(movies_detailed_data,
+                 (coder.encode_record(m, "path_to_movie")
+                  for m in itertools.chain(stored, resolved.values())),
+                 compression)
+
+
+def export_snapshot(movies_catalog):
+    """Write the binary snapshot of the catalog served by the web application.
+
+    Parameters
+    ----------
+    movies_catalog : catalog.Catalog
+        The movies catalog.
+    """
+    movies_catalog.commit()
+    catalog_snapshot.write(SNAPSHOT_PATH, movies_catalog.movies(with_details=True),
+                           movies_catalog.sort_data())
+
+
+def get_lazy_enricher(config):
+    """Build the resolver of movie details used by the web application.
+
+    Movies already stored in the catalog aren't looked up again, and resolved movies are
+    stored into it. The requests quota and the disambiguation queue are shared with
+    :any:`generate_movies_detailed_data`, which can run at the same time.
+
+    Parameters
+    ----------
+    config : dict
+        The user configuration. See :any:`get_provider_chain`.
+
+    Returns
+    -------
+    lazy_enrichment.LazyEnricher
+        The movie details resolver.
+    """
+    movies_catalog = open_catalog()
+    tracker = get_quota_tracker(config.get("omdb_daily_limit",
+                                           quota_scheduler.DEFAULT_DAILY_LIMIT))
+    providers = get_provider_chain(config)
+    queue = disambiguation.DisambiguationQueue(DISAMBIGUATION_PATH)
+
+    def lookup(movie):
+        try:
+            data = providers.lookup(queue.apply(movie))
+
+            if data.get("Response") == "True":
+                tracker.mark_resolved(movie["file_name"])
+            else:
+                tracker.mark_attempted(movie["file_name"])
+        except metadata_providers.AmbiguousMatch as err:
+            if not queue.is_dismissed(movie):
+                queue.push(movie, err.candidates)
+                queue.save()
+                raise
+
+            data = metadata_providers.NOT_FOUND
+        finally:
+            tracker.save()
+
+        return data
+
+    return lazy_enrichment.LazyEnricher(movies_catalog, lookup)
+
+
+def get_search_index(movies_catalog):
+    """Get the full-text index used when SQLite doesn't support FTS5.
+
+    The index is loaded from a snapshot stored at :any:`SEARCH_INDEX_PATH` unless the movie
+    details changed since the snapshot was created.
+
+    Parameters
+    ----------
+    movies_catalog : catalog.Catalog
+        The movies catalog.
+
+    Returns
+    -------
+    search_index.InvertedIndex
+        The full-text index. Document identifiers are file names.
+    """
+    global _search_index
+
+    signature = movies_catalog.metadata_signature()
+
+    if _search_index is not None and _search_index[0] == signature:
+        return _search_index[1]
+
+    index = search_index.InvertedIndex.load(SEARCH_INDEX_PATH, signature)
+
+    if index is None:
+        index = search_index.InvertedIndex()
+
+        for file_name, movie in movies_catalog.details().items():
+            if movie is not None:
+                index.add(file_name, search_index.document(movie))
+
+        index.save(SEARCH_INDEX_PATH, signature)
+
+    _search_index = (signature, index)
+
+    return index
+
+
+def search_movies(query, limit=20):
+    """Full-text search of the resolved movies.
+
+    Titles, alternative titles, plots, actors and directors are searched (see
+    :any:`search_index`).
+
+    Parameters
+    ----------
+    query : str
+        The query. All its words must match, the last one as a prefix.
+    limit : int, optional
+        Maximum amount of results.
+
+    Returns
+    -------
+    list
+        The movies data sorted by relevance. Each movie has a ``score`` key.
+    """
+    movies_catalog = open_catalog()
+
+    try:
+        if movies_catalog.fts5:
+            results = movies_catalog.search(query, limit)
+        else:
+            results = get_search_index(movies_catalog).search(query, limit)
+
+        details = movies_catalog.details([file_name for score, file_name in results])
+    finally:
+        movies_catalog.close()
+
+    return [dict(details[file_name], score=round(score, 4))
+            for score, file_name in results if details.get(file_name)]
+
+
+def query_movies(expression, limit=None, with_details=True):
+    """Find the movies matching a query expression.
+
+    Parameters
+    ----------
+    expression : str
+        The expression (see :any:`catalog_query`).
+    limit : int, None, optional
+        Maximum amount of movies.
+    with_details : bool, optional
+        See :any:`catalog.Catalog.movies`.
+
+    Returns
+    -------
+    list
+        The matching movies.
+
+    Raises
+    ------
+    ValueError
+        If the expression is malformed.
+    """
+    where, params = catalog_query.to_sql(expression)
+    movies_catalog = open_catalog()
+
+    try:
+        return list(movies_catalog.select(where, params, with_details, limit))
+    finally:
+        movies_catalog.close()
+
+
+def _filter_condition(filters):
+    """Compile export filters into an SQL condition.
+
+    Parameters
+    ----------
+    filters : list
+        Query expressions the exported movies must match (see :any:`catalog_query`).
+
+    Returns
+    -------
+    tuple, None
+        The condition and its parameters (see :any:`catalog_query.to_sql`), or None if no
+        expression was passed.
+
+    Raises
+    ------
+    ValueError
+        If an expression is malformed.
+    """
+    conditions = [catalog_query.to_sql(expression) for expression in filters]
+
+    if not conditions:
+        return None
+
+    return " AND ".join(where for where, params in conditions), \
+        tuple(param for where, params in conditions for param in params)
+
+
+def _exported_movies(movies_catalog, condition):
+    """Get the exported movies.
+
+    Parameters
+    ----------
+    movies_catalog : catalog.Catalog
+        The movies catalog.
+    condition : tuple, None
+        See :any:`_filter_condition`.
+
+    Returns
+    -------
+    generator
+        The exported rows (see :any:`exporters.to_rows`).
+    """
+    if condition is None:
+        movies = movies_catalog.movies(only_identifiable=False, with_details=True)
+    else:
+        movies = movies_catalog.select(*condition, with_details=True)
+
+    return exporters.to_rows(movies)
+
+
+def export_movies(output_path, export_format, filters=()):
+    """Export the catalog into a file.
+
+    Parameters
+    ----------
+    output_path : str
+        Path to the exported file.
+    export_format : str
+        One of the :any:`exporters.FORMATS`.
+    filters : list, optional
+        Query expressions the exported movies must match (see :any:`catalog_query`).
+
+    Returns
+    -------
+    int
+        The amount of exported movies.
+
+    Raises
+    ------
+    ValueError
+        If a filter expression is malformed.
+    """
+    condition = _filter_condition(filters)
+    movies_catalog = open_catalog()
+
+    try:
+        return exporters.write(output_path, _exported_movies(movies_catalog, condition),
+                               export_format)
+    finally:
+        movies_catalog.close()
+
+
+def stream_movies(export_format, filters=()):
+    """Export the catalog as a stream of bytes.
+
+    Parameters
+    ----------
+    export_format : str
+        One of the :any:`exporters.CONTENT_TYPES` formats.
+    filters : list, optional
+        Query expressions the exported movies must match (see :any:`catalog_query`).
+
+    Returns
+    -------
+    generator
+        The chunks of the exported movies. The catalog is closed once they are consumed.
+
+    Raises
+    ------
+    ValueError
+        If the format can't be streamed or a filter expression is invalid. It's raised before
+        the catalog is opened.
+    """
+    if export_format not in exporters.CONTENT_TYPES:
+        raise ValueError("Unsupported streaming format: %s" % export_format)
+
+    # Validate the filters before the response starts.
+    condition = _filter_condition(filters)
+
+    def generator():
+        movies_catalog = open_catalog()
+
+        try:
+            yield from exporters.stream(_exported_movies(movies_catalog, condition),
+                                        export_format)
+        finally:
+            movies_catalog.close()
+
+    return generator()
+
+
+def movies_stats(top=stats.TOP):
+    """Compute the statistics of the catalog.
+
+    The catalog is loaded into typed columns (see :any:`stats.Columns`) once and they are
+    reused until the catalog changes.
+
+    Parameters
+    ----------
+    top : int, optional
+        Amount of largest movie files reported per resolution.
+
+    Returns
+    -------
+    dict
+        The report (see :any:`stats.report`).
+    """
+    global _stats_columns
+
+    movies_catalog = open_catalog()
+
+    try:
+        signature = movies_catalog.signature()
+
+        if _stats_columns is None or _stats_columns[0] != signature:
+            _stats_columns = (signature, stats.Columns(movies_catalog.stats_rows()))
+    finally:
+        movies_catalog.close()
+
+    return stats.report(_stats_columns[1], top)
+
+
+def download_posters(logger):
+    """Download the posters of the movies found by :any:`generate_movies_detailed_data`.
+
+    Posters already cached are skipped and stale ones are revalidated (see
+    :any:`poster_cache.PosterCache`).
+
+    Parameters
+    ----------
+    logger : LogSystem
+        The logger.
+    """
+    movies_catalog = open_catalog()
+    details = [m["details"] for m in movies_catalog.details().values() if m]
+    movies_catalog.close()
+
+    posters = {d["imdbID"]: d["Poster"] for d in details
+               if d.get("imdbID", "N/A") != "N/A" and
+               d.get("Poster", "N/A").startswith(("http://", "https://"))}
+
+    poster_cache.PosterCache(POSTERS_PATH).update(posters, logger)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,907 @@
+# -*- coding: utf-8 -*-
+"""SQLite catalog storing the state of the movies data pipeline.
+
+The catalog replaces the JSON files that were loaded whole and rewritten on every run. Each
+pipeline stage updates only the rows it changes, and the database is used in WAL mode, so the
+web server can read it while a scan is writing to it.
+
+Tables:
+
+- ``directories``: Directories of the movie files, stored as a tree so the folders shared by \
+many directories (e.g. the library root) are only stored once. Every row is a path component \
+(including its trailing separator) and the ID of its parent directory (0 for the top level).
+- ``files``: Movie files found by :any:`app_utils.scan_directories`. Their paths are stored as \
+a directory ID and a base name.
+- ``sidecars``: Files describing a movie file (e.g. NFO files).
+- ``parse_results``: Data guessed from the movie file names by \
+:any:`app_utils.generate_movies_base_data_from_file_names`, and the indexed key of the guessed \
+title (see :any:`title_keys`).
+- ``metadata``: Movie details resolved by :any:`app_utils.generate_movies_detailed_data`.
+- ``imported_metadata``: Movie details imported from media center libraries (see \
+:any:`media_center_import`). They are used by :any:`metadata_providers.ImportedProvider`.
+
+The parse results and details of a removed file are kept, so they are restored when the file is
+found again (e.g. when the drive storing it is mounted again).
+- ``search``: FTS5 full-text index of the resolved movies (see :any:`search_index`). It's only \
+created if the SQLite library supports FTS5. Its rows are identified by the ``id`` column of the \
+``search_rows`` table.
+
+Attributes
+----------
+BATCH_SIZE : int
+    Amount of rows read at once by the methods that iterate over all the movies, so the
+    catalog can be iterated while it's being updated without holding every row in memory.
+DIRECTORY_CACHE_SIZE : int
+    Maximum amount of directory paths kept in memory to avoid walking the directories tree.
+PARSE_FIELDS : tuple
+    Fields guessed from a file name other than the title and year. They are stored as a JSON
+    object in the ``info`` column of the ``parse_results`` table.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from . import catalog_query
+from . import path_table
+from . import records
+from . import search_index
+from . import title_keys
+
+BATCH_SIZE = 1000
+DIRECTORY_CACHE_SIZE = 10000
+PARSE_FIELDS = ("cd", "format", "screen_size", "video_codec", "release_group", "type")
+
+_schema = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA foreign_keys = ON;
+CREATE TABLE IF NOT EXISTS directories (
+    id INTEGER PRIMARY KEY,
+    parent_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (parent_id, name)
+);
+CREATE TABLE IF NOT EXISTS files (
+    file_name TEXT PRIMARY KEY,
+    directory_id INTEGER NOT NULL REFERENCES directories (id),
+    basename TEXT NOT NULL,
+    imdb_id TEXT,
+    size INTEGER,
+    mtime REAL,
+    scan_id REAL,
+    UNIQUE (directory_id, basename)
+);
+CREATE TABLE IF NOT EXISTS sidecars (
+    path TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL REFERENCES files (file_name) ON DELETE CASCADE,
+    kind TEXT NOT NULL
+) WITHOUT ROWID;
+-- Parse results and details aren't removed with their files, so a library that is mounted again
+-- gets them back without parsing nor looking up its movies again.
+CREATE TABLE IF NOT EXISTS parse_results (
+    file_name TEXT PRIMARY KEY,
+    title TEXT,
+    norm_title TEXT,
+    year INTEGER,
+    info TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS metadata (
+    file_name TEXT PRIMARY KEY,
+    imdb_id TEXT,
+    details TEXT,
+    updated_at REAL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS imported_metadata (
+    file_name TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    details TEXT NOT NULL,
+    imported_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_imdb_id ON files (imdb_id);
+CREATE INDEX IF NOT EXISTS files_size ON files (size);
+CREATE INDEX IF NOT EXISTS sidecars_file_name ON sidecars (file_name);
+CREATE INDEX IF NOT EXISTS parse_results_title_year ON parse_results (norm_title, year);
+CREATE INDEX IF NOT EXISTS parse_results_year ON parse_results (year);
+CREATE INDEX IF NOT EXISTS metadata_imdb_id ON metadata (imdb_id);
+CREATE INDEX IF NOT EXISTS metadata_rating ON metadata (%s);
+CREATE INDEX IF NOT EXISTS metadata_runtime ON metadata (%s);
+""" % (catalog_query.RATING_SQL.replace("m.", ""), catalog_query.RUNTIME_SQL.replace("m.", ""))
+
+_search_schema = """
+CREATE VIRTUAL TABLE search USING fts5 (
+    %s, tokenize = "unicode61 remove_diacritics 2"
+);
+CREATE TABLE search_rows (
+    id INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL UNIQUE
+);
+""" % ", ".join(search_index.FIELDS)
+
+_movies_query = """
+SELECT f.directory_id, f.basename, f.file_name, p.title, p.year, p.info, f.imdb_id, %s, f.rowid
+FROM files f JOIN parse_results p ON p.file_name = f.file_name %s
+"""
+
+
+def _fold(text):
+    """Implementation of the ``fold`` SQL function.
+
+    Parameters
+    ----------
+    text : str, None
+        A text.
+
+    Returns
+    -------
+    str, None
+        The text folded (see :any:`title_keys.fold`).
+    """
+    return title_keys.fold(text) if isinstance(text, str) else text
+
+
+def _title_key(title, strip_articles):
+    """Implementation of the ``title_key`` SQL function.
+
+    Parameters
+    ----------
+    title : str, None
+        A movie title.
+    strip_articles : int
+        See :any:`title_keys.title_key`.
+
+    Returns
+    -------
+    str, None
+        The key of the title.
+    """
+    return title_keys.title_key(title, bool(strip_articles)) if title is not None else None
+
+
+class Catalog():
+    """Movies catalog.
+
+    Missing values are stored as NULL. Movies are returned as :any:`records.MovieRecord`
+    instances, with None as missing value.
+
+    Attributes
+    ----------
+    db_path : str
+        Path to the SQLite database file.
+    fts5 : bool
+        Whether the SQLite library supports FTS5. If it doesn't, :any:`Catalog.search` can't be
+        used.
+    """
+
+    def __init__(self, db_path):
+        """Initialization.
+
+        Parameters
+        ----------
+        db_path : str
+            Path to the SQLite database file.
+        """
+        self.db_path = db_path
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        # SQLite's lower() only folds ASCII letters. See catalog_query.to_sql.
+        self._conn.create_function("fold", 1, _fold, deterministic=True)
+        self._conn.create_function("title_key", 2, _title_key, deterministic=True)
+        self._directory_ids = {}
+        self._directory_paths = {0: ""}
+
+        self._conn.executescript(_schema)
+        self.fts5 = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'search'").fetchone() is not None
+
+        if not self.fts5:
+            try:
+                self._conn.executescript(_search_schema)
+            except sqlite3.OperationalError:
+                pass
+            else:
+                self.fts5 = True
+                self._rebuild_search()
+
+    def is_empty(self):
+        """Check whether the catalog has no files.
+
+        Returns
+        -------
+        bool
+            Whether the catalog has no files.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def _cache_directory(self, directory_id, directory):
+        """Remember the ID and path of a directory.
+
+        Parameters
+        ----------
+        directory_id : int
+            The directory ID.
+        directory : str
+            The directory path, including the trailing separator.
+        """
+        if len(self._directory_paths) > DIRECTORY_CACHE_SIZE:
+            self._directory_ids.clear()
+            self._directory_paths = {0: ""}
+
+        self._directory_ids[directory] = directory_id
+        self._directory_paths[directory_id] = directory
+
+    def _directory_id(self, directory, create=True):
+        """Get the ID of a directory.
+
+        Parameters
+        ----------
+        directory : str
+            The directory, including the trailing separator.
+        create : bool, optional
+            Add the directory (and its missing parents) to the catalog if it isn't part of it.
+
+        Returns
+        -------
+        int, None
+            The directory ID, or None if the directory isn't part of the catalog and it
+            wasn't created.
+        """
+        directory_id = self._directory_ids.get(directory)
+
+        if directory_id is not None:
+            return directory_id
+
+        directory_id = 0
+        path = ""
+
+        with self._lock:
+            for name in path_table.components(directory):
+                path += name
+                parent_id = directory_id
+                directory_id = self._directory_ids.get(path)
+
+                if directory_id is not None:
+                    continue
+
+                row = self._conn.execute(
+                    "SELECT id FROM directories WHERE parent_id = ? AND name = ?",
+                    (parent_id, name)).fetchone()
+
+                if row is None:
+                    if not create:
+                        return None
+
+                    row = [self._conn.execute(
+                        "INSERT INTO directories (parent_id, name) VALUES (?, ?)",
+                        (parent_id, name)).lastrowid]
+
+                directory_id = row[0]
+                self._cache_directory(directory_id, path)
+
+        return directory_id
+
+    def _directory_path(self, directory_id):
+        """Get the path of a directory.
+
+        Parameters
+        ----------
+        directory_id : int
+            The directory ID.
+
+        Returns
+        -------
+        str
+            The directory path, including the trailing separator.
+        """
+        path = self._directory_paths.get(directory_id)
+
+        if path is not None:
+            return path
+
+        with self._lock:
+            parent_id, name = self._conn.execute(
+                "SELECT parent_id, name FROM directories WHERE id = ?",
+                (directory_id,)).fetchone()
+
+        # Parents are cached too, so sibling directories only query their own row.
+        path = self._directory_path(parent_id) + name
+        self._cache_directory(directory_id, path)
+
+        return path
+
+    def upsert_file(self, file_name, path, imdb_id=None, scan_id=None, sidecars={}):
+        """Insert or update a movie file.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name without extension. It identifies the movie in the catalog.
+        path : str
+            Absolute path to the movie file.
+        imdb_id : str, None, optional
+            The IMDb ID found in the file name or in a sidecar file.
+        scan_id : float, None, optional
+            Identifier of the scan that found the file. See :any:`Catalog.remove_missing`.
+        sidecars : dict, optional
+            Maps paths of files describing the movie file to their kind (e.g. ``nfo``).
+        """
+        try:
+            stat = os.stat(path)
+            size, mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            size, mtime = None, None
+
+        directory, basename = path_table.split(path)
+
+        with self._lock:
+            directory_id = self._directory_id(directory)
+            restored = self.fts5 and self._conn.execute(
+                "SELECT 1 FROM files WHERE file_name = ?", (file_name,)).fetchone() is None
+            # Upserting by file name keeps the parse results and metadata of moved files. A stale
+            # row of another file name can't keep the path.
+            self._conn.execute(
+                "DELETE FROM files WHERE directory_id = ? AND basename = ? AND file_name != ?",
+                (directory_id, basename, file_name))
+            self._conn.execute(
+                "INSERT INTO files (file_name, directory_id, basename, imdb_id, size, mtime, "
+                "scan_id) VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (file_name) DO UPDATE SET "
+                "directory_id = excluded.directory_id, basename = excluded.basename, "
+                "imdb_id = excluded.imdb_id, size = excluded.size, mtime = excluded.mtime, "
+                "scan_id = excluded.scan_id",
+                (file_name, directory_id, basename, imdb_id or None, size, mtime, scan_id))
+            self._conn.execute("DELETE FROM sidecars WHERE file_name = ?", (file_name,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sidecars (path, file_name, kind) VALUES (?, ?, ?)",
+                [(p, file_name, kind) for p, kind in sidecars.items()])
+
+            # The FTS5 index only has the movies whose file is in the catalog.
+            if restored:
+                row = self._conn.execute(
+                    "SELECT p.title, m.details FROM metadata m LEFT JOIN parse_results p "
+                    "ON p.file_name = m.file_name WHERE m.file_name = ? AND m.details IS NOT NULL",
+                    (file_name,)).fetchone()
+
+                if row is not None:
+                    self._index_movie(file_name, {"title": row[0], "details": json.loads(row[1])})
+
+    def remove_missing(self, scan_id, roots):
+        """Remove the files not found by a scan.
+
+        Only the files stored under the scanned directories are removed, so the files of a
+        library that isn't mounted are kept. Their parse results and details are kept even if
+        they are removed.
+
+        Parameters
+        ----------
+        scan_id : float
+            Identifier of the scan.
+        roots : list
+            Absolute paths to the directories completely scanned.
+
+        Returns
+        -------
+        int
+            The amount of removed files.
+        """
+        roots = tuple(os.path.join(root, "") for root in roots)
+
+        if not roots:
+            return 0
+
+        with self._lock:
+            missing = [(file_name,) for directory_id, file_name in self._conn.execute(
+                "SELECT directory_id, file_name FROM files WHERE scan_id IS NULL OR scan_id != ?",
+                (scan_id,)).fetchall() if self._directory_path(directory_id).startswith(roots)]
+            removed = self._conn.executemany(
+                "DELETE FROM files WHERE file_name = ?", missing).rowcount
+
+            # Remove the directories left empty, from the deepest ones up.
+            while removed and self._conn.execute(
+                    "DELETE FROM directories WHERE id NOT IN (SELECT directory_id FROM files) "
+                    "AND id NOT IN (SELECT parent_id FROM directories)").rowcount:
+                pass
+
+            self._directory_ids.clear()
+            self._directory_paths = {0: ""}
+
+            # Virtual tables aren't affected by foreign keys.
+            if removed and self.fts5:
+                self._conn.execute(
+                    "DELETE FROM search WHERE rowid IN (SELECT id FROM search_rows "
+                    "WHERE file_name NOT IN (SELECT file_name FROM files))")
+                self._conn.execute(
+                    "DELETE FROM search_rows WHERE file_name NOT IN (SELECT file_name FROM files)")
+
+            return removed
+
+    def _iterate(self, query, where=None):
+        """Run a query over the ``files`` table (aliased as ``f``) in batches.
+
+        Parameters
+        ----------
+        query : str
+            The query. The last selected column must be ``f.rowid``.
+        where : str, optional
+            Condition the rows must fulfill.
+
+        Yields
+        ------
+        tuple
+            A row.
+        """
+        query += " WHERE f.rowid > ?%s ORDER BY f.rowid LIMIT %d" % (
+            " AND (%s)" % where if where else "", BATCH_SIZE)
+        last = 0
+
+        while True:
+            with self._lock:
+                rows = self._conn.execute(query, (last,)).fetchall()
+
+            yield from rows
+
+            if len(rows) < BATCH_SIZE:
+                return
+
+            last = rows[-1][-1]
+
+    def fingerprints(self):
+        """Get the data used to match movie files from other libraries.
+
+        Yields
+        ------
+        tuple
+            A ``(file_name, path, size)`` tuple. The size is None if it's unknown.
+        """
+        for row in self._iterate("SELECT f.file_name, f.directory_id, f.basename, f.size, "
+                                 "f.rowid FROM files f"):
+            yield row[0], self._directory_path(row[1]) + row[2], row[3]
+
+    def files(self):
+        """Get the movie files.
+
+        Yields
+        ------
+        tuple
+            A ``(file_name, path, imdb_id)`` tuple.
+        """
+        for row in self._iterate("SELECT f.file_name, f.directory_id, f.basename, f.imdb_id, "
+                                 "f.rowid FROM files f"):
+            yield row[0], self._directory_path(row[1]) + row[2], row[3]
+
+    def unparsed(self):
+        """Get the file names that weren't parsed yet.
+
+        Returns
+        -------
+        list
+            The file names.
+        """
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT f.file_name FROM files f LEFT JOIN parse_results p "
+                "ON p.file_name = f.file_name WHERE p.file_name IS NULL ORDER BY f.rowid")]
+
+    def set_parse_result(self, file_name, title, year, info):
+        """Store the data guessed from a file name.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+        title : str, None
+            The movie title.
+        year : int, None
+            The movie release year.
+        info : dict
+            The rest of the guessed data (see :any:`PARSE_FIELDS`).
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parse_results (file_name, title, norm_title, year, info) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (file_name, title or None, title_keys.title_key(title) if title else None,
+                 year or None,
+                 json.dumps({k: info[k] for k in PARSE_FIELDS if info.get(k)}, default=str)))
+
+    def sort_data(self):
+        """Get the data of the movie files the snapshot of the catalog is sorted by.
+
+        Returns
+        -------
+        dict
+            Maps file names to their size (None if it's unknown) and their rowid. Rowids are
+            kept when the files are updated or moved, so they sort the files by the time they
+            were added to the catalog.
+        """
+        return {row[0]: row[1:] for row in self._iterate(
+            "SELECT f.file_name, f.size, f.rowid FROM files f")}
+
+    def movies(self, only_identifiable=True, with_details=False):
+        """Get the movies base data.
+
+        Parameters
+        ----------
+        only_identifiable : bool, optional
+            Skip the movies without title nor IMDb ID.
+        with_details : bool, optional
+            Yield dictionaries (e.g. to serialize them) with a ``details`` key for the resolved
+            movies.
+
+        Yields
+        ------
+        records.MovieRecord, dict
+            A movie base data.
+        """
+        if with_details:
+            query = _movies_query % (
+                "m.details", "LEFT JOIN metadata m ON m.file_name = f.file_name")
+        else:
+            query = _movies_query % ("NULL", "")
+
+        for row in self._iterate(query, "p.title IS NOT NULL OR f.imdb_id IS NOT NULL"
+                                 if only_identifiable else None):
+            movie = self._to_movie(row)
+
+            if with_details:
+                movie = dict(movie, details=json.loads(row[7])) if row[7] else movie.to_dict()
+
+            yield movie
+
+    def select(self, where, params=(), with_details=False, limit=None):
+        """Get the movies matching a condition.
+
+        The matching movies are found with a single query, so SQLite can use the indexes of the
+        condition, and they are read in batches.
+
+        Parameters
+        ----------
+        where : str
+            The condition (see :any:`catalog_query.to_sql`). It can refer to the ``files``,
+            ``parse_results`` and ``metadata`` tables as ``f``, ``p`` and ``m``.
+        params : tuple, optional
+            The parameters of the condition.
+        with_details : bool, optional
+            See :any:`Catalog.movies`.
+        limit : int, None, optional
+            Maximum amount of movies.
+
+        Yields
+        ------
+        records.MovieRecord, dict
+            A movie base data.
+        """
+        with self._lock:
+            rowids = [row[0] for row in self._conn.execute(
+                "SELECT f.rowid FROM files f JOIN parse_results p ON p.file_name = f.file_name "
+                "LEFT JOIN metadata m ON m.file_name = f.file_name WHERE %s%s"
+                % (where, " LIMIT %d" % limit if limit is not None else ""), params)]
+
+        # Sorting in SQL would make SQLite scan the files table instead of using the indexes.
+        rowids.sort()
+
+        query = _movies_query % ("m.details" if with_details else "NULL",
+                                 "LEFT JOIN metadata m ON m.file_name = f.file_name")
+
+        for start in range(0, len(rowids), BATCH_SIZE):
+            batch = rowids[start:start + BATCH_SIZE]
+
+            with self._lock:
+                rows = self._conn.execute(query + "WHERE f.rowid IN (%s) ORDER BY f.rowid" %
+                                          ", ".join("?" * len(batch)), batch).fetchall()
+
+            for row in rows:
+                movie = self._to_movie(row)
+
+                if with_details:
+                    movie = dict(movie, details=json.loads(row[7])) if row[7] else \
+                        movie.to_dict()
+
+                yield movie
+
+    def find(self, path=None, imdb_id=None, title=None, year=None):
+        """Find movies.
+
+        All lookups are served by indexes.
+
+        Parameters
+        ----------
+        path : str, optional
+            Absolute path to the movie file.
+        imdb_id : str, optional
+            The movie IMDb ID.
+        title : str, optional
+            The movie title. It's compared by its key (see :any:`title_keys.title_key`).
+        year : int, optional
+            The movie release year.
+
+        Returns
+        -------
+        list
+            The base data of the movies matching all the passed criteria.
+        """
+        conditions = []
+        params = []
+        directory, basename = path_table.split(path) if path else (None, None)
+        directory_id = self._directory_id(directory, create=False) if path else None
+
+        if path and directory_id is None:
+            return []
+
+        for column, value in (("f.directory_id", directory_id), ("f.basename", basename),
+                              ("f.imdb_id", imdb_id),
+                              ("p.norm_title", title_keys.title_key(title) if title else None),
+                              ("p.year", year)):
+            if value:
+                conditions.append("%s = ?" % column)
+                params.append(value)
+
+        query = _movies_query % ("NULL", "") + \
+            (" WHERE " + " AND ".join(conditions) if conditions else "")
+
+        with self._lock:
+            return [self._to_movie(row) for row in self._conn.execute(query, params)]
+
+    def set_metadata(self, file_name, details):
+        """Store the details of a movie.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+        details : dict, None
+            The movie details in the format of an OMDb API response, or None if the movie
+            wasn't found. None doesn't replace the details already stored.
+        """
+        with self._lock:
+            stored = self._conn.execute(
+                "INSERT INTO metadata (file_name, imdb_id, details, updated_at) "
+                "SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM files WHERE file_name = ?) "
+                "ON CONFLICT (file_name) DO UPDATE SET imdb_id = excluded.imdb_id, "
+                "details = excluded.details, updated_at = excluded.updated_at "
+                "WHERE excluded.details IS NOT NULL OR metadata.details IS NULL",
+                (file_name, details.get("imdbID") if details else None,
+                 json.dumps(details) if details else None, time.time(), file_name)).rowcount
+
+            if stored and self.fts5:
+                row = self._conn.execute(
+                    "SELECT id FROM search_rows WHERE file_name = ?", (file_name,)).fetchone()
+
+                # With a subquery instead of a value, FTS5 would scan the whole table.
+                if row is not None:
+                    self._conn.execute("DELETE FROM search WHERE rowid = ?", row)
+
+                if details:
+                    row = self._conn.execute(
+                        "SELECT title FROM parse_results WHERE file_name = ?",
+                        (file_name,)).fetchone()
+                    self._index_movie(file_name, {"title": row[0] if row else None,
+                                                  "details": details})
+
+    def resolved(self):
+        """Get the file names of the resolved movies.
+
+        Returns
+        -------
+        set
+            The file names.
+        """
+        with self._lock:
+            return {row[0] for row in self._conn.execute(
+                "SELECT file_name FROM metadata WHERE details IS NOT NULL")}
+
+    def set_imported_details(self, file_name, source, details):
+        """Store the details of a movie imported from a media center library.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+        source : str
+            The kind of library (e.g. ``kodi``).
+        details : dict
+            The movie details in the format of an OMDb API response.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO imported_metadata (file_name, source, details, "
+                "imported_at) VALUES (?, ?, ?, ?)",
+                (file_name, source, json.dumps(details), time.time()))
+
+    def imported_details(self, file_name):
+        """Get the details of a movie imported from a media center library.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+
+        Returns
+        -------
+        dict, None
+            The movie details, or None if they weren't imported.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT details FROM imported_metadata WHERE file_name = ?",
+                                     (file_name,)).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def stats_rows(self):
+        """Get the fields of the movies used by :any:`stats`.
+
+        Values are extracted from the JSON columns by SQLite, so they aren't parsed whole.
+
+        Yields
+        ------
+        tuple
+            A ``(file_name, title, year, size, runtime, rating, resolution, codec)`` tuple.
+            Unknown values are None or 0. Resolutions and codecs guessed as lists are tuples.
+        """
+        query = "SELECT f.file_name, coalesce(json_extract(m.details, '$.Title'), p.title), " \
+            "coalesce(nullif(CAST(json_extract(m.details, '$.Year') AS INTEGER), 0), p.year), " \
+            "f.size, CAST(json_extract(m.details, '$.Runtime') AS INTEGER), " \
+            "CAST(json_extract(m.details, '$.imdbRating') AS REAL), " \
+            "json_extract(p.info, '$.screen_size'), json_extract(p.info, '$.video_codec'), " \
+            "f.rowid FROM files f LEFT JOIN parse_results p ON p.file_name = f.file_name " \
+            "LEFT JOIN metadata m ON m.file_name = f.file_name"
+
+        for row in self._iterate(query):
+            # json_extract returns JSON arrays as text.
+            yield row[:6] + tuple(tuple(json.loads(value)) if value and value[0] == "[" else value
+                                  for value in row[6:8])
+
+    def signature(self):
+        """Get a value that changes whenever the catalog changes.
+
+        Returns
+        -------
+        tuple
+            The amount of files and parse results, the last scan and the
+            :any:`Catalog.metadata_signature`.
+        """
+        with self._lock:
+            return tuple(self._conn.execute(
+                "SELECT count(*), max(scan_id), (SELECT count(*) FROM parse_results) "
+                "FROM files").fetchone()) + self.metadata_signature()
+
+    def metadata_signature(self):
+        """Get a value that changes whenever movie details change.
+
+        Returns
+        -------
+        tuple
+            The amount of stored details and the time of the last change.
+        """
+        with self._lock:
+            return tuple(self._conn.execute(
+                "SELECT count(*), max(updated_at) FROM metadata").fetchone())
+
+    def search(self, query, limit=20):
+        """Find resolved movies through the FTS5 index.
+
+        Parameters
+        ----------
+        query : str
+            The query. See :any:`search_index.fts_query`.
+        limit : int, optional
+            Maximum amount of results.
+
+        Returns
+        -------
+        list
+            A list of ``(score, file_name)`` tuples sorted by relevance.
+        """
+        match = search_index.fts_query(query)
+
+        if match is None:
+            return []
+
+        with self._lock:
+            return [(-rank, file_name) for file_name, rank in self._conn.execute(
+                "SELECT r.file_name, s.rank FROM (SELECT rowid, bm25(search, %s) AS rank "
+                "FROM search WHERE search MATCH ? ORDER BY rank LIMIT ?) s "
+                "JOIN search_rows r ON r.id = s.rowid ORDER BY s.rank" %
+                ", ".join(map(str, search_index.WEIGHTS)), (match, limit))]
+
+    def _index_movie(self, file_name, movie):
+        """Add a movie to the FTS5 index.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+        movie : dict
+            The movie data. See :any:`search_index.document`.
+        """
+        self._conn.execute(
+            "INSERT OR IGNORE INTO search_rows (file_name) VALUES (?)", (file_name,))
+        self._conn.execute(
+            "INSERT INTO search (rowid, %s) SELECT id%s FROM search_rows WHERE file_name = ?" % (
+                ", ".join(search_index.FIELDS), ", ?" * len(search_index.FIELDS)),
+            search_index.document(movie) + (file_name,))
+
+    def _rebuild_search(self):
+        """Populate the FTS5 index from the stored details.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM search")
+            self._conn.execute("DELETE FROM search_rows")
+
+            for file_name, movie in self.details().items():
+                if movie is not None:
+                    self._index_movie(file_name, movie)
+
+            self._conn.commit()
+
+    def details(self, file_names=None):
+        """Get the resolved movies.
+
+        Parameters
+        ----------
+        file_names : list, optional
+            The file names of the movies to get. All movies are returned if not passed.
+
+        Returns
+        -------
+        dict
+            Maps file names to the movie base data plus a ``details`` key, or to None for
+            movies that weren't found.
+        """
+        query = "SELECT f.directory_id, f.basename, f.file_name, p.title, p.year, p.info, " \
+            "f.imdb_id, m.details FROM metadata m JOIN files f ON f.file_name = m.file_name " \
+            "JOIN parse_results p ON p.file_name = m.file_name"
+        params = []
+
+        if file_names is not None:
+            query += " WHERE m.file_name IN (%s)" % ", ".join("?" * len(file_names))
+            params = list(file_names)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        return {row[2]: dict(self._to_movie(row), details=json.loads(row[7]))
+                if row[7] else None for row in rows}
+
+    def commit(self):
+        """Commit the pending changes.
+        """
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        """Commit the pending changes and close the database.
+        """
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def _to_movie(self, row):
+        """Convert a row into a movie base data.
+
+        Parameters
+        ----------
+        row : tuple
+            The ``directory_id``, ``basename``, ``file_name``, ``title``, ``year``, ``info`` and
+            ``imdb_id`` columns.
+
+        Returns
+        -------
+        records.MovieRecord
+            The movie base data.
+        """
+        directory_id, basename, file_name, title, year, info, imdb_id = row[:7]
+        info = json.loads(info) if info else {}
+
+        return records.MovieRecord(path_to_movie=self._directory_path(directory_id) + basename,
+                                   file_name=file_name, title=title,
+                                   year=year, imdb_id=imdb_id,
+                                   **{k: info.get(k) for k in PARSE_FIELDS})
+
+
+if __name__ == "__main__":
+    pass
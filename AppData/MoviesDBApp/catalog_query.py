@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+"""Query language of the movies catalog.
+
+Expressions are parsed once and compiled into an SQL condition over the catalog tables (see
+:any:`catalog.Catalog.select`), so SQLite evaluates them with its indexes instead of every
+movie being loaded and tested in Python. E.g.::
+
+    year>=2000 and codec:hevc and size>10G and title~"alien"
+
+An expression is made of comparisons combined with ``and``, ``or``, ``not`` and parentheses.
+Adjacent comparisons are combined with ``and``. A comparison is a field (see :any:`FIELDS`), an
+operator and a value. Values with spaces or operator characters must be quoted. Operators:
+
+- ``=`` and ``!=``: Equal and not equal. Text is compared regardless of letter case and
+  diacritics (e.g. ``director=almodovar`` matches ``Pedro Almodóvar``). For fields with several
+  values (e.g. codecs or genres), whether any value is equal.
+- ``:``: Same as ``=``. Codecs also match their aliases (e.g. ``codec:hevc`` matches ``H.265``
+  and ``x265``).
+- ``<``, ``<=``, ``>`` and ``>=``: Numeric comparison. Only for numeric fields. Sizes can have a
+  ``K``, ``M``, ``G`` or ``T`` suffix (powers of 1024).
+- ``~``: Substring, regardless of letter case and diacritics.
+
+Titles are compared by their keys (see :any:`title_keys.title_key`), so punctuation doesn't
+matter either, and leading articles don't matter for ``=`` (e.g. ``title=matrix`` matches
+``The Matrix`` and ``title~"amelie"`` matches ``Amélie``). ``title=`` and ``imdb_id=`` are
+compared with indexed columns: the key of the title guessed from the file name, and the IMDb
+IDs of the file name (or NFO file) and of the details. The other comparisons of text are
+evaluated movie by movie.
+
+Attributes
+----------
+FIELDS : tuple
+    Fields that can be queried. ``codec`` and ``resolution`` are aliases of ``video_codec``
+    and ``screen_size``. ``size`` is the file size in bytes and ``year`` is the year guessed
+    from the file name. The movie details provide the values of ``rating``, ``runtime``,
+    ``genre``, ``director`` and ``actors``, and the title and IMDb ID of resolved movies.
+RATING_SQL : str
+    SQL expression of the IMDb rating of a movie. It's indexed by the catalog.
+RUNTIME_SQL : str
+    SQL expression of the runtime in minutes of a movie. It's indexed by the catalog.
+"""
+import re
+
+from . import title_keys
+
+RATING_SQL = "CAST(json_extract(m.details, '$.imdbRating') AS REAL)"
+RUNTIME_SQL = "CAST(json_extract(m.details, '$.Runtime') AS INTEGER)"
+
+# Field kinds:
+# - number: Numeric column.
+# - text: Text column.
+# - title: Title column, compared by title key. Equality is checked with the indexed key of
+#   the title guessed from the file name.
+# - id: IMDb ID. Equality is checked with the indexed columns.
+# - info: Value guessed from the file name. A JSON scalar or list in parse_results.info.
+# - names: Comma-separated names in the movie details.
+_fields = {
+    "file_name": ("f.file_name", "text"),
+    "title": ("coalesce(json_extract(m.details, '$.Title'), p.title)", "title"),
+    "year": ("p.year", "number"),
+    "imdb_id": ("coalesce(m.imdb_id, f.imdb_id)", "id"),
+    "size": ("f.size", "number"),
+    "cd": ("CAST(json_extract(p.info, '$.cd') AS INTEGER)", "number"),
+    "format": ("$.format", "info"),
+    "screen_size": ("$.screen_size", "info"),
+    "video_codec": ("$.video_codec", "info"),
+    "release_group": ("$.release_group", "info"),
+    "type": ("$.type", "info"),
+    "rating": (RATING_SQL, "number"),
+    "runtime": (RUNTIME_SQL, "number"),
+    "genre": ("json_extract(m.details, '$.Genre')", "names"),
+    "director": ("json_extract(m.details, '$.Director')", "names"),
+    "actors": ("json_extract(m.details, '$.Actors')", "names"),
+}
+_fields["codec"] = _fields["video_codec"]
+_fields["resolution"] = _fields["screen_size"]
+FIELDS = tuple(_fields)
+
+_codec_aliases = (
+    ("hevc", "h265", "h.265", "x265"),
+    ("avc", "h264", "h.264", "x264"),
+    ("mpeg2", "mpeg-2", "h262", "h.262"),
+)
+_comparisons = ("<", "<=", ">", ">=")
+_size = re.compile(r"^(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?$", re.IGNORECASE)
+_size_units = "kmgt"
+_token = re.compile(r"""\s*(?:(\(|\))|"((?:[^"\\]|\\.)*)"|'([^']*)'|(!=|<=|>=|=|<|>|~|:)|"""
+                    r"""([^\s()"'!=<>~:]+))""")
+
+
+def _tokenize(expression):
+    """Split an expression into tokens.
+
+    Parameters
+    ----------
+    expression : str
+        The expression.
+
+    Returns
+    -------
+    list
+        ``(kind, value)`` tuples. Kinds are ``paren``, ``string`` (quoted values), ``op`` and
+        ``word``.
+
+    Raises
+    ------
+    ValueError
+        If the expression has unbalanced quotes.
+    """
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+
+    while position < len(expression):
+        match = _token.match(expression, position)
+
+        if match is None:
+            raise ValueError("Unexpected character at position %d: %s" % (
+                position, expression[position:]))
+
+        paren, double_quoted, single_quoted, op, word = match.groups()
+
+        if paren:
+            tokens.append(("paren", paren))
+        elif double_quoted is not None:
+            tokens.append(("string", re.sub(r"\\(.)", r"\1", double_quoted)))
+        elif single_quoted is not None:
+            tokens.append(("string", single_quoted))
+        elif op:
+            tokens.append(("op", op))
+        else:
+            tokens.append(("word", word))
+
+        position = match.end()
+
+    return tokens
+
+
+def _number(field, value):
+    """Convert a value into a number.
+
+    Parameters
+    ----------
+    field : str
+        The compared field.
+    value : str
+        The value.
+
+    Returns
+    -------
+    int, float
+        The number.
+
+    Raises
+    ------
+    ValueError
+        If the value isn't a number (or a size for the ``size`` field).
+    """
+    match = _size.match(value) if field == "size" else None
+
+    if match is not None:
+        number, unit = match.groups()
+
+        return int(float(number) * 1024 ** (_size_units.find(unit.lower()) + 1)) if unit \
+            else int(float(number))
+
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError("Number expected for %s: %s" % (field, value))
+
+
+def _comparison(field, op, value):
+    """Compile a comparison into an SQL condition.
+
+    Parameters
+    ----------
+    field : str
+        One of the :any:`FIELDS`.
+    op : str
+        The operator.
+    value : str
+        The value.
+
+    Returns
+    -------
+    tuple
+        The condition and its parameters.
+
+    Raises
+    ------
+    ValueError
+        If the field is unknown or the operator or the value aren't valid for the field.
+    """
+    if field not in _fields:
+        raise ValueError("Unknown field: %s. Fields: %s" % (field, ", ".join(FIELDS)))
+
+    sql, kind = _fields[field]
+    op = "=" if op == ":" else op
+
+    if kind == "number":
+        if op == "~":
+            raise ValueError("Operator ~ not supported by numeric field: %s" % field)
+
+        # Unknown values don't match comparisons (e.g. unrated movies aren't rated < 5).
+        condition = "%s %s ?" % (sql, "=" if op == "!=" else op)
+        params = [_number(field, value)]
+
+        if field in ("rating", "runtime"):
+            # The details store unknown values as N/A, which is converted into 0. Checking the
+            # details first lets SQLite turn the LEFT JOIN of the metadata table into a JOIN,
+            # so the indexes of the expressions are used.
+            condition = "m.details IS NOT NULL AND %s AND %s > 0" % (condition, sql)
+    elif op in _comparisons:
+        raise ValueError("Operator %s only supported by numeric fields: %s" % (op, field))
+    elif kind == "title":
+        if op == "~":
+            condition = "instr(title_key(%s, 0), ?) > 0" % sql
+            params = [title_keys.title_key(value, strip_articles=False)]
+        else:
+            condition = "p.norm_title = ?"
+            params = [title_keys.title_key(value)]
+    elif kind == "id" and op != "~":
+        # A subquery per table, since SQLite can't use the indexes of two joined tables for
+        # a single OR condition.
+        condition = "f.file_name IN (SELECT file_name FROM metadata WHERE imdb_id = ? " \
+            "UNION ALL SELECT file_name FROM files WHERE imdb_id = ?)"
+        params = [value.strip().lower()] * 2
+    elif kind in ("text", "id"):
+        condition = "instr(fold(%s), ?) > 0" % sql if op == "~" else "fold(%s) = ?" % sql
+        params = [title_keys.fold(value)]
+    elif kind == "names":
+        if op == "~":
+            condition = "instr(fold(%s), ?) > 0" % sql
+            params = [title_keys.fold(value)]
+        else:
+            condition = "instr(', ' || fold(%s) || ', ', ?) > 0" % sql
+            params = [", %s, " % title_keys.fold(value)]
+    else:
+        # json_each yields a single row for scalars, so lists and scalars are handled alike.
+        if op == "~":
+            test = "instr(fold(j.value), ?) > 0"
+            params = [title_keys.fold(value)]
+        else:
+            params = next((list(group) for group in _codec_aliases
+                           if field in ("codec", "video_codec") and value.lower() in group),
+                          [title_keys.fold(value)])
+            test = "fold(j.value) IN (%s)" % ", ".join("?" * len(params))
+
+        condition = "EXISTS (SELECT 1 FROM json_each(p.info, '%s') j WHERE %s)" % (sql, test)
+
+    if op == "!=":
+        condition = "NOT coalesce(%s, 0)" % condition
+
+    return "(%s)" % condition, params
+
+
+class _Parser():
+    """Recursive descent parser of query expressions.
+
+    Each method compiles a rule of the grammar into an SQL condition and its parameters::
+
+        expression := term ("or" term)*
+        term := factor (["and"] factor)*
+        factor := "not" factor | "(" expression ")" | field operator value
+    """
+
+    def __init__(self, expression):
+        """Initialization.
+
+        Parameters
+        ----------
+        expression : str
+            The expression.
+        """
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def peek(self):
+        """Get the next token without consuming it.
+
+        Returns
+        -------
+        tuple
+            The token, or ``(None, None)`` at the end of the expression.
+        """
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def keyword(self, name):
+        """Consume the next token if it's a keyword.
+
+        Parameters
+        ----------
+        name : str
+            The keyword (case-insensitive).
+
+        Returns
+        -------
+        bool
+            Whether the token was consumed.
+        """
+        kind, value = self.peek()
+
+        if kind == "word" and value.lower() == name:
+            self.position += 1
+
+            return True
+
+        return False
+
+    def expect(self, kinds, description):
+        """Consume the next token.
+
+        Parameters
+        ----------
+        kinds : tuple
+            The expected token kinds.
+        description : str
+            Description of the expected token used in the error message.
+
+        Returns
+        -------
+        str
+            The token value.
+
+        Raises
+        ------
+        ValueError
+            If the token isn't of one of the expected kinds.
+        """
+        kind, value = self.peek()
+
+        if kind not in kinds:
+            raise ValueError("%s expected, found: %s" % (description, value or "end"))
+
+        self.position += 1
+
+        return value
+
+    def expression(self):
+        """See :any:`_Parser`.
+
+        Returns
+        -------
+        tuple
+            The condition and its parameters.
+        """
+        condition, params = self.term()
+
+        while self.keyword("or"):
+            other, other_params = self.term()
+            condition, params = "(%s OR %s)" % (condition, other), params + other_params
+
+        return condition, params
+
+    def term(self):
+        """See :any:`_Parser`.
+
+        Returns
+        -------
+        tuple
+            The condition and its parameters.
+        """
+        condition, params = self.factor()
+
+        while True:
+            if not self.keyword("and"):
+                kind, value = self.peek()
+
+                if kind is None or value == ")" or (kind == "word" and value.lower() == "or"):
+                    return condition, params
+
+            other, other_params = self.factor()
+            condition, params = "(%s AND %s)" % (condition, other), params + other_params
+
+    def factor(self):
+        """See :any:`_Parser`.
+
+        Returns
+        -------
+        tuple
+            The condition and its parameters.
+        """
+        if self.keyword("not"):
+            condition, params = self.factor()
+
+            return "(NOT coalesce(%s, 0))" % condition, params
+
+        if self.peek() == ("paren", "("):
+            self.position += 1
+            condition = self.expression()
+
+            if self.peek() != ("paren", ")"):
+                raise ValueError("Closing parenthesis expected, found: %s" % (
+                    self.peek()[1] or "end"))
+
+            self.position += 1
+
+            return condition
+
+        field = self.expect(("word",), "Field")
+        op = self.expect(("op",), "Operator after %s" % field)
+        value = self.expect(("word", "string"), "Value after %s%s" % (field, op))
+
+        return _comparison(field.lower(), op, value)
+
+
+def to_sql(expression):
+    """Compile a query expression into an SQL condition.
+
+    Parameters
+    ----------
+    expression : str
+        The expression.
+
+    Returns
+    -------
+    tuple
+        The condition and its parameters. The condition refers to the ``files``,
+        ``parse_results`` and ``metadata`` tables as ``f``, ``p`` and ``m``, and uses the
+        ``fold`` and ``title_key`` SQL functions registered by :any:`catalog.Catalog`.
+
+    Raises
+    ------
+    ValueError
+        If the expression is malformed.
+    """
+    parser = _Parser(expression)
+
+    if not parser.tokens:
+        raise ValueError("Empty query.")
+
+    condition, params = parser.expression()
+
+    if parser.position < len(parser.tokens):
+        raise ValueError("Unexpected token: %s" % parser.peek()[1])
+
+    return condition, tuple(params)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,567 @@
+# -*- coding: utf-8 -*-
+"""Read-only binary snapshot of the movies catalog.
+
+The snapshot is written at the end of every pipeline stage and opened by the web application
+through :py:mod:`mmap`, so the server starts without parsing JSON nor creating Python objects
+for every movie. Pages of the mapped file are loaded on demand and shared by every process that
+opens the same snapshot.
+
+This module only depends on the standard library (and on :any:`title_keys`, which does too), so
+the web application can use it without the dependencies needed to generate movies data.
+
+File layout (little-endian):
+
+- Header: see ``_header``.
+- String heap: UTF-8 encoded file names, titles, IMDb IDs, JSON data and title sort keys (see \
+:any:`title_keys.sort_key`) of each movie.
+- Record table: one fixed-width record per movie (see ``_record``). Strings are stored as \
+offset and length pairs into the heap.
+- Sort permutations: for each of the :any:`SORT_KEYS`, the record indexes sorted by that key \
+as unsigned 32 bits integers. Ties are sorted by file name.
+
+Sorted listings are served by slicing the permutations. Besides offsets, pages can start after a
+cursor (see :any:`Snapshot.cursor`), which stores the sort value and file name of the last movie
+of the previous page instead of its position, so paging stays stable when the catalog changes
+and the snapshot is replaced between requests.
+
+Attributes
+----------
+MAGIC : bytes
+    Identifies snapshot files.
+SORT_KEYS : tuple
+    Keys the records can be sorted by. ``title`` is sorted by :any:`title_keys.sort_key`, ``size``
+    is the file size and ``added`` is the order in which the files were added to the catalog.
+    ``file_name`` is also used to find records by file name.
+VERSION : int
+    Version of the snapshot format. Snapshots with a different version can't be opened.
+"""
+import base64
+import binascii
+import itertools
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+
+from array import array
+
+try:
+    from . import title_keys
+except ImportError:
+    # Imported by the web application as a top-level module.
+    import title_keys
+
+MAGIC = b"MOVIESDB"
+SORT_KEYS = ("file_name", "title", "year", "rating", "runtime", "size", "added")
+VERSION = 2
+
+# Magic, version, amount of records, heap offset, records offset and permutations offset.
+_header = struct.Struct("<8sIIQQQ")
+# File name, title, IMDb ID, JSON data and title sort key (offset and length of each),
+# year, rating (times 10), runtime in minutes, flags, file size and insertion order.
+_record = struct.Struct("<QIQIQIQIQIHHHBQQ")
+# Position in the record of the value of each sort key other than file name and title.
+_fields = {"year": 10, "rating": 11, "runtime": 12, "size": 14, "added": 15}
+_has_details = 1
+_number = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _to_number(value, scale=1):
+    """Extract a number from a movie detail (e.g. ``136 min`` or ``N/A``).
+
+    Parameters
+    ----------
+    value : object
+        The detail value.
+    scale : int, optional
+        Factor applied to the number before truncating it.
+
+    Returns
+    -------
+    int
+        The number, or 0 if the value doesn't contain a number.
+    """
+    match = _number.search(str(value or ""))
+
+    return min(int(float(match.group()) * scale), 65535) if match else 0
+
+
+def write(path, movies, files={}):
+    """Write a snapshot.
+
+    Parameters
+    ----------
+    path : str
+        Path to the snapshot file. It's replaced atomically, so web servers keep reading the
+        snapshot they opened until they reopen it.
+    movies : iterable
+        The movies base data. Resolved movies have a ``details`` key.
+    files : dict, optional
+        Maps file names to their size in bytes and a number that increases with the time the
+        file was added to the catalog (see :any:`catalog.Catalog.sort_data`). Unknown values
+        are sorted first.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    records = []
+    sort_values = []
+
+    with open(tmp_path, "wb") as out:
+        out.write(b"\0" * _header.size)
+        heap_offset = offset = _header.size
+
+        for movie in movies:
+            details = movie.get("details") or {}
+            title = details.get("Title") or str(movie.get("title") or "") or movie["file_name"]
+            year = _to_number(details.get("Year")) or _to_number(movie.get("year"))
+            rating = _to_number(details.get("imdbRating"), 10)
+            runtime = _to_number(details.get("Runtime"))
+            title_key = title_keys.sort_key(title)
+            size, added = files.get(movie["file_name"]) or (None, None)
+            record = []
+
+            for value in (movie["file_name"], title, details.get("imdbID") or
+                          str(movie.get("imdb_id") or ""),
+                          json.dumps(movie, separators=(",", ":")), title_key):
+                data = value.encode("utf-8")
+                out.write(data)
+                record.extend((offset, len(data)))
+                offset += len(data)
+
+            record.extend((year, rating, runtime, _has_details if details else 0, size or 0,
+                           added or 0))
+            records.append(record)
+            # Keys are compared as UTF-8, like the cursors of the pages.
+            sort_values.append((movie["file_name"].encode("utf-8"), title_key.encode("utf-8")))
+
+        records_offset = offset
+
+        for record in records:
+            out.write(_record.pack(*record))
+
+        permutations_offset = records_offset + len(records) * _record.size
+        by_name = sorted(range(len(records)), key=lambda i: sort_values[i][0])
+        # Sorting is stable, so ties are sorted by file name.
+        orders = {
+            "file_name": by_name,
+            "title": sorted(by_name, key=lambda i: sort_values[i][1]),
+        }
+
+        for key, field in _fields.items():
+            orders[key] = sorted(by_name, key=lambda i: records[i][field])
+
+        for key in SORT_KEYS:
+            permutation = array("I", orders[key])
+
+            if sys.byteorder == "big":
+                permutation.byteswap()
+
+            out.write(permutation.tobytes())
+
+        out.seek(0)
+        out.write(_header.pack(MAGIC, VERSION, len(records), heap_offset, records_offset,
+                               permutations_offset))
+
+    os.replace(tmp_path, path)
+
+
+class Snapshot():
+    """Memory-mapped snapshot.
+
+    Records are referred to by their index in the record table.
+
+    Attributes
+    ----------
+    path : str
+        Path to the snapshot file.
+    """
+
+    def __init__(self, path):
+        """Initialization.
+
+        Parameters
+        ----------
+        path : str
+            Path to the snapshot file.
+
+        Raises
+        ------
+        ValueError
+            If the file isn't a snapshot or it has a different version.
+        """
+        self.path = path
+
+        with open(path, "rb") as file:
+            self._stat = os.fstat(file.fileno())
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self._count, heap_offset, self._records_offset, \
+            permutations_offset = _header.unpack_from(self._mm)
+
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError("Not a movies catalog snapshot (version %d): %s" % (VERSION, path))
+
+        self._view = memoryview(self._mm)
+        size = self._count * 4
+        self._permutations = {}
+
+        for pos, key in enumerate(SORT_KEYS):
+            start = permutations_offset + pos * size
+            permutation = self._view[start:start + size]
+
+            if sys.byteorder == "little":
+                # Zero-copy view of the mapped permutation.
+                self._permutations[key] = permutation.cast("I")
+            else:
+                self._permutations[key] = array("I", permutation.tobytes())
+                self._permutations[key].byteswap()
+
+    def __len__(self):
+        """Amount of movies.
+
+        Returns
+        -------
+        int
+            Amount of movies.
+        """
+        return self._count
+
+    def _record(self, index):
+        """Read a record.
+
+        Parameters
+        ----------
+        index : int
+            The record index.
+
+        Returns
+        -------
+        tuple
+            The record fields.
+        """
+        return _record.unpack_from(self._mm, self._records_offset + index * _record.size)
+
+    def _bytes(self, index, field):
+        """Read a string of a record without decoding it.
+
+        Parameters
+        ----------
+        index : int
+            The record index.
+        field : int
+            The position of the string in the record (0 is the file name, 1 is the title, 2 is
+            the IMDb ID, 3 is the JSON data and 4 is the title sort key).
+
+        Returns
+        -------
+        bytes
+            The encoded string.
+        """
+        offset, length = struct.unpack_from(
+            "<QI", self._mm, self._records_offset + index * _record.size + field * 12)
+
+        return self._mm[offset:offset + length]
+
+    def file_name(self, index):
+        """Get the file name of a movie.
+
+        Parameters
+        ----------
+        index : int
+            The record index.
+
+        Returns
+        -------
+        str
+            The movie file name.
+        """
+        return self._bytes(index, 0).decode("utf-8")
+
+    def find(self, file_name):
+        """Find a movie by its file name.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+
+        Returns
+        -------
+        int, None
+            The record index, or None if the movie isn't part of the snapshot.
+        """
+        target = file_name.encode("utf-8")
+        permutation = self._permutations["file_name"]
+        low, high = 0, self._count
+
+        while low < high:
+            mid = (low + high) // 2
+
+            if self._bytes(permutation[mid], 0) < target:
+                low = mid + 1
+            else:
+                high = mid
+
+        if low < self._count and self._bytes(permutation[low], 0) == target:
+            return permutation[low]
+
+        return None
+
+    def has_details(self, index):
+        """Check whether a movie was resolved.
+
+        Parameters
+        ----------
+        index : int
+            The record index.
+
+        Returns
+        -------
+        bool
+            Whether the movie data has a ``details`` key.
+        """
+        return bool(self._record(index)[13] & _has_details)
+
+    def raw(self, index):
+        """Get the data of a movie as JSON.
+
+        Parameters
+        ----------
+        index : int
+            The record index.
+
+        Returns
+        -------
+        bytes
+            The movie data encoded as JSON. It can be served as it is.
+        """
+        return self._bytes(index, 3)
+
+    def movie(self, index):
+        """Get the data of a movie.
+
+        Parameters
+        ----------
+        index : int
+            The record index.
+
+        Returns
+        -------
+        dict
+            The movie base data, plus a ``details`` key if the movie was resolved.
+        """
+        return json.loads(self.raw(index))
+
+    def summary(self, index):
+        """Get the fields of a movie stored in its fixed-width record.
+
+        Parameters
+        ----------
+        index : int
+            The record index.
+
+        Returns
+        -------
+        dict
+            The ``file_name``, ``title``, ``imdb_id``, ``year``, ``rating`` and ``runtime`` of
+            the movie. Unknown numbers are None.
+        """
+        year, rating, runtime = self._record(index)[10:13]
+
+        return {
+            "file_name": self.file_name(index),
+            "title": self._bytes(index, 1).decode("utf-8"),
+            "imdb_id": self._bytes(index, 2).decode("utf-8") or None,
+            "year": year or None,
+            "rating": rating / 10 if rating else None,
+            "runtime": runtime or None,
+        }
+
+    def _sort_value(self, key, index):
+        """Get the value a movie is sorted by.
+
+        Parameters
+        ----------
+        key : str
+            One of the :any:`SORT_KEYS`.
+        index : int
+            The record index.
+
+        Returns
+        -------
+        tuple
+            The value of the key and the file name, both encoded as UTF-8 if they are text.
+        """
+        file_name = self._bytes(index, 0)
+
+        if key == "file_name":
+            return file_name, file_name
+
+        if key == "title":
+            return self._bytes(index, 4), file_name
+
+        return self._record(index)[_fields[key]], file_name
+
+    def cursor(self, key, index):
+        """Get the cursor of the page that starts after a movie.
+
+        Parameters
+        ----------
+        key : str
+            One of the :any:`SORT_KEYS`.
+        index : int
+            The record index of the last movie of a page.
+
+        Returns
+        -------
+        str
+            The cursor. It can be used in URLs.
+        """
+        value, file_name = self._sort_value(key, index)
+        data = [key, value.decode("utf-8") if isinstance(value, bytes) else value,
+                file_name.decode("utf-8")]
+
+        return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii")
+
+    def _position(self, key, cursor, reverse):
+        """Find the position in a permutation where the page after a cursor starts.
+
+        Parameters
+        ----------
+        key : str
+            One of the :any:`SORT_KEYS`.
+        cursor : str
+            See :any:`Snapshot.cursor`.
+        reverse : bool
+            Whether the page is sorted in descending order.
+
+        Returns
+        -------
+        int
+            In ascending order, the position of the first movie after the cursor. In descending
+            order, the position after the last movie before the cursor.
+
+        Raises
+        ------
+        ValueError
+            If the cursor is malformed or it was created for another key.
+        """
+        try:
+            cursor_key, value, file_name = json.loads(base64.urlsafe_b64decode(cursor))
+        except (binascii.Error, TypeError, ValueError):
+            raise ValueError("Invalid cursor.")
+
+        if cursor_key != key:
+            raise ValueError("The cursor wasn't created for the %s key." % key)
+
+        target = (value.encode("utf-8") if isinstance(value, str) else value,
+                  file_name.encode("utf-8"))
+        permutation = self._permutations[key]
+        low, high = 0, self._count
+
+        try:
+            while low < high:
+                mid = (low + high) // 2
+                sort_value = self._sort_value(key, permutation[mid])
+
+                if sort_value < target or (not reverse and sort_value == target):
+                    low = mid + 1
+                else:
+                    high = mid
+        except TypeError:
+            raise ValueError("Invalid cursor.")
+
+        return low
+
+    def page(self, key="file_name", offset=0, limit=None, reverse=False, subset=None,
+             after=None):
+        """Get a page of movies sorted by one of the :any:`SORT_KEYS`.
+
+        Parameters
+        ----------
+        key : str, optional
+            The sort key.
+        offset : int, optional
+            Amount of movies skipped.
+        limit : int, None, optional
+            Maximum amount of movies. All the remaining movies are returned if not passed.
+        reverse : bool, optional
+            Sort in descending order.
+        subset : set, None, optional
+            Record indexes of the movies to include (e.g. the result of a query). All the movies
+            are included if not passed.
+        after : str, None, optional
+            Start the page after the movie of a cursor (see :any:`Snapshot.cursor`), which
+            doesn't need to be part of the snapshot. The offset is counted from there.
+
+        Returns
+        -------
+        list
+            The record indexes.
+
+        Raises
+        ------
+        KeyError
+            If the key isn't one of the :any:`SORT_KEYS`.
+        ValueError
+            If the cursor is invalid.
+        """
+        permutation = self._permutations[key]
+        start, end = 0, self._count
+
+        if after is not None:
+            if reverse:
+                end = self._position(key, after, reverse)
+            else:
+                start = self._position(key, after, reverse)
+
+        if subset is not None:
+            # The sorted indexes are filtered, so the subset doesn't need to be sorted.
+            indexes = permutation[start:end]
+            matches = (i for i in (reversed(indexes) if reverse else indexes) if i in subset)
+
+            return list(itertools.islice(matches, offset,
+                                         None if limit is None else offset + limit))
+
+        if reverse:
+            stop = end - offset
+            first = start if limit is None else max(start, stop - limit)
+
+            return permutation[first:stop].tolist()[::-1] if stop > first else []
+
+        first = start + offset
+        stop = end if limit is None else min(end, first + limit)
+
+        return permutation[first:stop].tolist() if stop > first else []
+
+    def is_stale(self):
+        """Check whether the snapshot file was replaced since it was opened.
+
+        Returns
+        -------
+        bool
+            Whether the snapshot should be reopened.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+
+        return (stat.st_ino, stat.st_mtime_ns) != (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    def close(self):
+        """Unmap the snapshot.
+        """
+        for permutation in self._permutations.values():
+            if isinstance(permutation, memoryview):
+                permutation.release()
+
+        self._view.release()
+        self._mm.close()
+
+
+if __name__ == "__main__":
+    pass
@@ -6,23 +6,25 @@ Attributes
 docopt_doc : str
     Used to store/define the docstring that will be passed to docopt as the "doc" argument.
 root_folder : str
-    The main folder containing the application. All commands must be executed from this location
-    without exceptions.
+    The main folder of the application (see :any:`paths.ROOT_FOLDER`).
 """
 
 import os
 import sys
 
 from . import app_utils
+from . import exporters
+from . import ndjson
+from . import paths
 from .__init__ import __appdescription__
 from .__init__ import __appname__
 from .__init__ import __status__
 from .__init__ import __version__
 from .python_utils import bottle_utils
 from .python_utils import cli_utils
+from .python_utils import exceptions
 
-root_folder = os.path.realpath(os.path.abspath(os.path.join(
-    os.path.normpath(os.getcwd()))))
+root_folder = paths.ROOT_FOLDER
 
 docopt_doc = """{appname} {version} ({status})
 
@@ -30,7 +32,16 @@ docopt_doc = """{appname} {version} ({status})
 
 Usage:
     app.py (-h | --help | --manual | --version)
-    app.py movies (scan | base_data | detailed_data) [--debug]
+    app.py movies (scan | base_data | resolve) [--debug] [--compress=<format>]
+    app.py movies detailed_data [--overwrite] [--debug] [--compress=<format>]
+    app.py movies import-imdb <basics_file> <ratings_file>
+    app.py movies import-library (kodi | jellyfin | nfo) <source>
+                  [--path-map=<mapping>...] [--overwrite]
+    app.py movies posters
+    app.py movies search <query> [--limit=<limit>]
+    app.py movies query <expression> [--limit=<limit>]
+    app.py movies stats
+    app.py movies export <output> [--format=<format>] [--filter=<filter>...]
     app.py server (start | stop | restart)
                   [--host=<host>]
                   [--port=<port>]
@@ -56,10 +67,53 @@ Options:
 --debug
     Debug.
 
+--compress=<format>
+    Compression of the generated data files: none, gzip or lzma. Ignored
+    with --debug. [Default: none]
+
+--limit=<limit>
+    Maximum amount of results. [Default: 20]
+
+--path-map=<mapping>
+    Translate the paths of the imported library into local paths, in the
+    from=to format. E.g. smb://nas/movies/=/mnt/movies/. It can be repeated.
+
+--overwrite
+    Replace the details of movies already resolved. With detailed_data, they
+    are looked up again.
+
+--format=<format>
+    Export format: csv, ndjson, m3u or sqlite. By default, it's guessed from
+    the extension of the output file.
+
+--filter=<filter>
+    Export only the movies matching a query expression, as accepted by the
+    `movies query` sub-command. E.g. year>=2000, resolution:1080p or
+    "genre~drama and rating>7". It can be repeated.
+
 Sub-commands for the `movies` command:
     scan                                Scan directories for movies.
     base_data                           Generate base movies data.
     detailed_data                       Generate detailed movies data.
+    resolve                             Choose the right matches for the movies with
+                                        ambiguous lookup results.
+    import-imdb                         Import the IMDb datasets (title.basics.tsv.gz and
+                                        title.ratings.tsv.gz files) into a local index
+                                        used by detailed_data.
+    import-library                      Import the movies details of a Kodi database, a
+                                        Jellyfin database or a tree of NFO files, so
+                                        detailed_data doesn't look them up.
+    posters                             Download the posters of the movies found by
+                                        detailed_data.
+    search                              Search the movies found by detailed_data by
+                                        title, plot, actors and directors.
+    query                               Find the movies matching an expression. E.g.
+                                        'year>=2000 and codec:hevc and size>10G and
+                                        title~"alien"'.
+    stats                               Show statistics of the catalog (movies and bytes
+                                        by decade, codecs, ratings and resolutions).
+    export                              Export the catalog into a CSV, NDJSON, M3U
+                                        playlist or SQLite file.
 
 Sub-commands for the `server` command:
     start                               Start server.
@@ -121,6 +175,10 @@ class CommandLineInterface(cli_utils.CommandLineInterfaceSuper):
                 self.logger.info("restart")
                 self.action = self.http_server_restart
         elif self.a["movies"]:
+            if self.a["--compress"] not in ndjson.COMPRESSIONS:
+                raise exceptions.WrongValueForOption(
+                    "--compress must be one of: %s" % ", ".join(ndjson.COMPRESSIONS))
+
             if self.a["scan"]:
                 self.logger.info("**Scanning directories...**")
                 self.action = self.scan_directories
@@ -128,7 +186,29 @@ class CommandLineInterface(cli_utils.CommandLineInterfaceSuper):
                 self.logger.info("**Guessing movie names...**")
                 self.action = self.generate_movies_base_data_from_file_names
             elif self.a["detailed_data"]:
-                pass
+                self.logger.info("**Fetching detailed movies data...**")
+                self.action = self.generate_movies_detailed_data
+            elif self.a["resolve"]:
+                self.logger.info("**Resolving ambiguous matches...**")
+                self.action = self.resolve_ambiguous_movies
+            elif self.a["import-imdb"]:
+                self.logger.info("**Importing IMDb datasets...**")
+                self.action = self.import_imdb_dataset
+            elif self.a["import-library"]:
+                self.logger.info("**Importing media center library...**")
+                self.action = self.import_media_center
+            elif self.a["search"]:
+                self.action = self.search_movies
+            elif self.a["query"]:
+                self.action = self.query_movies
+            elif self.a["stats"]:
+                self.action = self.movies_stats
+            elif self.a["export"]:
+                self.logger.info("**Exporting movies...**")
+                self.action = self.export_movies
+            elif self.a["posters"]:
+                self.logger.info("**Downloading movie posters...**")
+                self.action = self.download_posters
         elif self.a["generate"]:
             if self.a["system_executable"]:
                 self.logger.info("**System executable generation...**")
@@ -147,12 +227,128 @@ class CommandLineInterface(cli_utils.CommandLineInterfaceSuper):
         from runpy import run_path
 
         paths = run_path(os.path.join(root_folder, "UserData", "config.py"))["data"]["movies_paths"]
-        app_utils.scan_directories(paths, self.a["--debug"], self.logger)
+        app_utils.scan_directories(paths, self.a["--debug"], self.logger,
+                                   self.a["--compress"])
 
     def generate_movies_base_data_from_file_names(self):
         """Summary
         """
-        app_utils.generate_movies_base_data_from_file_names(self.a["--debug"], self.logger)
+        app_utils.generate_movies_base_data_from_file_names(self.a["--debug"], self.logger,
+                                                            self.a["--compress"])
+
+    def generate_movies_detailed_data(self):
+        """Summary
+        """
+        from runpy import run_path
+
+        config = run_path(os.path.join(root_folder, "UserData", "config.py"))["data"]
+        app_utils.generate_movies_detailed_data(config, self.a["--debug"], self.logger,
+                                                self.a["--compress"], self.a["--overwrite"])
+
+    def resolve_ambiguous_movies(self):
+        """Summary
+        """
+        app_utils.resolve_ambiguous_movies(self.a["--debug"], self.logger,
+                                           self.a["--compress"])
+
+    def import_imdb_dataset(self):
+        """Summary
+        """
+        app_utils.import_imdb_dataset(self.a["<basics_file>"], self.a["<ratings_file>"],
+                                      self.logger)
+
+    def import_media_center(self):
+        """Summary
+        """
+        source_type = next(s for s in ("kodi", "jellyfin", "nfo") if self.a[s])
+        app_utils.import_media_center(source_type, self.a["<source>"], self.a["--path-map"],
+                                      self.a["--overwrite"], self.logger)
+
+    def search_movies(self):
+        """Summary
+        """
+        for movie in app_utils.search_movies(self.a["<query>"], int(self.a["--limit"])):
+            self.logger.info("**%s** (%s) %s" % (movie["details"].get("Title"),
+                                                 movie["details"].get("Year"),
+                                                 movie["path_to_movie"]),
+                             date=False, to_file=False)
+
+    def query_movies(self):
+        """Summary
+        """
+        try:
+            movies = app_utils.query_movies(self.a["<expression>"], int(self.a["--limit"]))
+        except ValueError as err:
+            raise exceptions.InvalidArgument(str(err))
+
+        for movie in movies:
+            details = movie.get("details") or {}
+            self.logger.info("**%s** (%s) %s" % (details.get("Title", movie["title"]),
+                                                 details.get("Year", movie["year"]),
+                                                 movie["path_to_movie"]),
+                             date=False, to_file=False)
+
+    def movies_stats(self):
+        """Summary
+        """
+        report = app_utils.movies_stats()
+
+        def log(text):
+            self.logger.info(text, date=False, to_file=False)
+
+        def size(value):
+            return "%.1f GB" % (value / 1024 ** 3)
+
+        log("**Movies:** %d (%s, %d hours)" % (
+            report["count"], size(report["bytes"]), report["minutes"] // 60))
+        log("**By decade:**")
+
+        for item in report["decades"]:
+            log("%s: %d (%s)" % ("%ds" % item["decade"] if item["decade"] else "Unknown",
+                                 item["count"], size(item["bytes"])))
+
+        log("**By codec:**")
+
+        for item in report["codecs"]:
+            log("%s: %d (%s)" % (item["codec"] or "Unknown", item["count"], size(item["bytes"])))
+
+        log("**By rating:**")
+
+        for item in report["ratings"]:
+            log("%.0f-%.0f: %d" % (item["from"], item["to"], item["count"]))
+
+        log("Unrated: %d" % report["unrated"])
+        log("**By resolution:**")
+
+        for item in report["resolutions"]:
+            log("%s: %d (%s)" % (item["resolution"] or "Unknown", item["count"],
+                                 size(item["bytes"])))
+
+            for movie in item["largest"]:
+                log("    %s (%s)" % (movie["title"], size(movie["bytes"])))
+
+    def export_movies(self):
+        """Summary
+        """
+        output = self.a["<output>"]
+        export_format = self.a["--format"] or exporters.EXTENSIONS.get(
+            os.path.splitext(output)[1].lower())
+
+        if export_format not in exporters.FORMATS:
+            raise exceptions.WrongValueForOption(
+                "--format must be one of: %s" % ", ".join(exporters.FORMATS))
+
+        try:
+            count = app_utils.export_movies(output, export_format, self.a["--filter"])
+        except ValueError as err:
+            raise exceptions.WrongValueForOption(str(err))
+
+        self.logger.info("Exported movies: %d" % count)
+
+    def download_posters(self):
+        """Summary
+        """
+        app_utils.download_posters(self.logger)
 
     def system_executable_generation(self):
         """See :any:`cli_utils.CommandLineInterfaceSuper._system_executable_generation`.
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""Adaptive concurrency control for network-bound tasks.
+"""
+import threading
+import time
+
+from collections import deque
+from contextlib import contextmanager
+
+
+class _Slot():
+    """A request slot handed out by :any:`AIMDController.slot`.
+
+    Attributes
+    ----------
+    ok : bool
+        Whether the request succeeded.
+    """
+
+    def __init__(self):
+        """Initialization.
+        """
+        self.ok = True
+
+    def fail(self):
+        """Mark the request as failed (e.g. a throttled response).
+        """
+        self.ok = False
+
+
+class AIMDController():
+    """Additive increase/multiplicative decrease concurrency limiter.
+
+    Works as a semaphore whose size changes with the observed responses. Every successful
+    request grows the limit so it increases by ``increase`` after a full window of requests.
+    A failed request or a request noticeably slower than the baseline latency shrinks the
+    limit by ``decrease``. The baseline slowly follows the observed latency, so gradual
+    upstream changes (e.g. by time of day) aren't treated as congestion.
+
+    Attributes
+    ----------
+    decrease : float
+        Factor the limit is multiplied by on congestion.
+    increase : float
+        Amount the limit grows after a full window of successful requests.
+    latency_tolerance : float
+        A request slower than the baseline latency multiplied by this value is considered a
+        congestion signal.
+    limit : float
+        Current concurrency limit.
+    max_limit : int
+        Maximum concurrency limit.
+    min_limit : int
+        Minimum concurrency limit.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=16, increase=1.0, decrease=0.5,
+                 latency_tolerance=2.0, samples=1000):
+        """Initialization.
+
+        Parameters
+        ----------
+        initial : int, optional
+            Initial concurrency limit.
+        min_limit : int, optional
+            Minimum concurrency limit.
+        max_limit : int, optional
+            Maximum concurrency limit.
+        increase : float, optional
+            Amount the limit grows after a full window of successful requests.
+        decrease : float, optional
+            Factor the limit is multiplied by on congestion.
+        latency_tolerance : float, optional
+            See :any:`AIMDController.latency_tolerance`.
+        samples : int, optional
+            Amount of latency samples kept to compute percentiles.
+        """
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._in_flight = 0
+        self._baseline = None
+        self._last_decrease = 0.0
+        self._latencies = deque(maxlen=samples)
+        self._requests = 0
+        self._failures = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Wait until a request can be performed without exceeding the limit.
+        """
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+
+            self._in_flight += 1
+
+    def release(self, latency, ok=True):
+        """Register a finished request and adjust the limit.
+
+        Parameters
+        ----------
+        latency : float
+            The request duration in seconds.
+        ok : bool, optional
+            Whether the request succeeded.
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._in_flight -= 1
+            self._requests += 1
+            self._latencies.append(latency)
+
+            if self._baseline is None:
+                self._baseline = latency
+
+            congested = not ok or latency > self._baseline * self.latency_tolerance
+
+            if not ok:
+                self._failures += 1
+
+            if congested:
+                # Decrease at most once per baseline latency so a burst of failures from
+                # requests that were already in flight doesn't collapse the limit.
+                if now - self._last_decrease > self._baseline:
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+            if ok:
+                self._baseline += (latency - self._baseline) * 0.05
+
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Perform a request within the limit.
+
+        Exceptions raised inside the context mark the request as failed.
+
+        Yields
+        ------
+        _Slot
+            Call its ``fail`` method to mark the request as failed without raising.
+        """
+        self.acquire()
+        slot = _Slot()
+        start = time.monotonic()
+
+        try:
+            yield slot
+        except Exception:
+            slot.fail()
+            raise
+        finally:
+            self.release(time.monotonic() - start, slot.ok)
+
+    def percentile(self, pct):
+        """Get a latency percentile.
+
+        Parameters
+        ----------
+        pct : float
+            The percentile (0 to 100).
+
+        Returns
+        -------
+        float
+            The latency percentile in seconds, or 0.0 if no request was performed.
+        """
+        with self._cond:
+            latencies = sorted(self._latencies)
+
+        if not latencies:
+            return 0.0
+
+        return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))]
+
+    def summary(self):
+        """Get a human readable summary.
+
+        Returns
+        -------
+        str
+            The current limit, the amount of requests and failures and latency percentiles.
+        """
+        return "concurrency limit: %d, requests: %d, failures: %d, " \
+            "latency p50/p90/p99: %.2fs/%.2fs/%.2fs" % (
+                int(self.limit), self._requests, self._failures,
+                self.percentile(50), self.percentile(90), self.percentile(99))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""Persistent queue of movies with ambiguous lookup results.
+
+Movies matching several plausible candidates are queued instead of guessed, so unattended
+runs keep going. The queued movies are resolved later by the user (``app.py movies resolve``)
+and the answers are remembered, so movies whose file names produce the same title and year are
+resolved automatically from then on.
+
+Attributes
+----------
+BATCH_SIZE : int
+    Amount of queued movies presented to the user at once.
+"""
+import json
+import os
+import threading
+
+from . import file_lock
+from . import title_keys
+
+BATCH_SIZE = 10
+
+
+def pattern_key(movie):
+    """Generate the key used to remember the answer for a movie.
+
+    Parameters
+    ----------
+    movie : dict
+        The movie base data.
+
+    Returns
+    -------
+    str
+        The normalized title and year guessed from the movie file name.
+    """
+    return "%s|%s" % (title_keys.title_key(movie.get("title") or ""), movie.get("year") or "")
+
+
+class DisambiguationQueue():
+    """Queue of movies waiting to be disambiguated and remembered answers.
+
+    Several processes (e.g. a detailed data generation and the web application) can share the
+    same file: the changes of each one are applied to the stored state when it's saved.
+
+    Attributes
+    ----------
+    path : str
+        Path to the file where the queue and the answers are stored.
+    """
+
+    def __init__(self, path):
+        """Initialization.
+
+        Parameters
+        ----------
+        path : str
+            Path to the file where the queue and the answers are stored.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # Changes since the state was last saved: queued movies, removed movies and answers.
+        self._pushed = {}
+        self._removed = set()
+        self._answered = {}
+        self._state = self._read()
+
+    def _read(self):
+        """Read the stored state.
+
+        Returns
+        -------
+        dict
+            The queue and the answers.
+        """
+        state = {"queue": {}, "answers": {}}
+
+        if os.path.isfile(self.path):
+            with open(self.path, "r") as file:
+                state.update(json.loads(file.read()))
+
+        return state
+
+    def __len__(self):
+        """Amount of queued movies.
+
+        Returns
+        -------
+        int
+            Amount of queued movies.
+        """
+        return len(self._state["queue"])
+
+    def push(self, movie, candidates):
+        """Queue a movie.
+
+        Parameters
+        ----------
+        movie : dict
+            The movie base data.
+        candidates : list
+            The plausible candidates in the format of OMDb API responses.
+        """
+        with self._lock:
+            item = {"movie": dict(movie), "candidates": candidates}
+            self._state["queue"][movie["file_name"]] = self._pushed[movie["file_name"]] = item
+            self._removed.discard(movie["file_name"])
+
+    def discard(self, file_name):
+        """Remove a movie from the queue.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+        """
+        with self._lock:
+            self._state["queue"].pop(file_name, None)
+            self._pushed.pop(file_name, None)
+            self._removed.add(file_name)
+
+    def items(self):
+        """Get the queued movies.
+
+        Returns
+        -------
+        list
+            A list of dictionaries with ``movie`` and ``candidates`` keys.
+        """
+        with self._lock:
+            return list(self._state["queue"].values())
+
+    def apply(self, movie):
+        """Apply a remembered answer to a movie.
+
+        Parameters
+        ----------
+        movie : dict
+            The movie base data.
+
+        Returns
+        -------
+        dict
+            A copy of the movie with the IMDb ID of the remembered answer, or the movie as it
+            is if there is no answer for it or it already has an IMDb ID.
+        """
+        imdb_id = self._state["answers"].get(pattern_key(movie))
+
+        return dict(movie, imdb_id=imdb_id) if imdb_id and not movie.get("imdb_id") else movie
+
+    def is_dismissed(self, movie):
+        """Check whether the user answered that none of the candidates of a movie is right.
+
+        Parameters
+        ----------
+        movie : dict
+            The movie base data.
+
+        Returns
+        -------
+        bool
+            Whether the movie should be considered not found instead of being queued.
+        """
+        key = pattern_key(movie)
+
+        return key in self._state["answers"] and self._state["answers"][key] is None
+
+    def answer(self, answers):
+        """Store answers and remove their movies from the queue.
+
+        Parameters
+        ----------
+        answers : dict
+            Maps file names of queued movies to the chosen candidate (in the format of an OMDb
+            API response), or None if none of the candidates is the right one.
+        """
+        with self._lock:
+            for file_name, candidate in answers.items():
+                item = self._state["queue"].pop(file_name)
+                self._pushed.pop(file_name, None)
+                self._removed.add(file_name)
+                key = pattern_key(item["movie"])
+                self._state["answers"][key] = self._answered[key] = \
+                    candidate["imdbID"] if candidate is not None else None
+
+    def save(self):
+        """Store the queue and the answers.
+
+        The changes are applied to the state stored by other processes since it was read.
+        """
+        with self._lock, file_lock.locked(self.path):
+            state = self._read()
+            state["queue"].update(self._pushed)
+
+            for file_name in self._removed:
+                state["queue"].pop(file_name, None)
+
+            state["answers"].update(self._answered)
+            tmp_path = self.path + ".tmp"
+
+            with open(tmp_path, "w") as out:
+                json.dump(state, out)
+
+            os.replace(tmp_path, self.path)
+            self._state = state
+            self._pushed, self._removed, self._answered = {}, set(), {}
+
+
+if __name__ == "__main__":
+    pass
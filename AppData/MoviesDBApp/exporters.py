@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""Streaming exporters of the movies catalog.
+
+Movies are read from the catalog in batches (see :any:`catalog.Catalog.movies`), flattened
+into rows with the :any:`FIELDS` and encoded in chunks of about :any:`CHUNK_SIZE`, so exports
+use constant memory whatever the size of the library. The same chunks are written to files
+and sent as chunked HTTP responses.
+
+The exported movies are selected with the query language of the catalog (see
+:any:`catalog_query`), so they are filtered by SQLite before they are read.
+
+Attributes
+----------
+CHUNK_SIZE : int
+    Approximate size in characters of the encoded chunks.
+CONTENT_TYPES : dict
+    Maps the formats that can be streamed to their HTTP content type.
+EXTENSIONS : dict
+    Maps file extensions to the format they are exported in.
+FIELDS : tuple
+    Exported fields. The movie details provide the values of the fields after ``imdb_id``.
+FORMATS : tuple
+    Supported export formats.
+"""
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+
+from . import catalog
+from . import records
+
+CHUNK_SIZE = 64 * 1024
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "m3u": "audio/x-mpegurl; charset=utf-8",
+}
+EXTENSIONS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".m3u": "m3u",
+    ".m3u8": "m3u",
+    ".sqlite": "sqlite",
+    ".db": "sqlite",
+}
+FIELDS = records.FIELDS + ("rating", "runtime", "genre", "director", "actors")
+FORMATS = ("csv", "ndjson", "m3u", "sqlite")
+
+_number = re.compile(r"\d+(?:\.\d+)?")
+_sql_types = {"year": "INTEGER", "cd": "INTEGER", "rating": "REAL", "runtime": "INTEGER"}
+
+
+def _to_number(value):
+    """Extract a number from a movie detail (e.g. ``136 min`` or ``N/A``).
+
+    Parameters
+    ----------
+    value : object
+        The detail value.
+
+    Returns
+    -------
+    int, float, None
+        The number, or None if the value doesn't contain a number.
+    """
+    match = _number.search(str(value or ""))
+
+    if match is None:
+        return None
+
+    return float(match.group()) if "." in match.group() else int(match.group())
+
+
+def _text(value):
+    """Convert a value into text.
+
+    Parameters
+    ----------
+    value : object
+        The value. Values guessed from file names can be lists.
+
+    Returns
+    -------
+    str
+        The text. None is converted into an empty string.
+    """
+    if isinstance(value, (list, tuple)):
+        return "/".join(map(str, value))
+
+    return "" if value is None else str(value)
+
+
+def to_row(movie):
+    """Flatten a movie into an exported row.
+
+    Parameters
+    ----------
+    movie : dict
+        The movie base data, with a ``details`` key if the movie was resolved.
+
+    Returns
+    -------
+    dict
+        The :any:`FIELDS` of the movie. Missing values are None.
+    """
+    details = movie.get("details") or {}
+    row = {field: movie.get(field) for field in records.FIELDS}
+
+    row["title"] = details.get("Title") or row["title"]
+    row["year"] = _to_number(details.get("Year")) or row["year"]
+    row["imdb_id"] = details.get("imdbID") or row["imdb_id"]
+    row["rating"] = _to_number(details.get("imdbRating"))
+    row["runtime"] = _to_number(details.get("Runtime"))
+
+    for field, key in (("genre", "Genre"), ("director", "Director"), ("actors", "Actors")):
+        row[field] = details.get(key) if details.get(key) not in (None, "N/A") else None
+
+    return row
+
+
+def to_rows(movies):
+    """Flatten movies into exported rows.
+
+    Parameters
+    ----------
+    movies : iterable
+        The movies (see :any:`to_row`).
+
+    Yields
+    ------
+    dict
+        A row.
+    """
+    for movie in movies:
+        yield to_row(movie)
+
+
+def _encode_row(row, export_format, writer):
+    """Encode a row.
+
+    Parameters
+    ----------
+    row : dict
+        The row.
+    export_format : str
+        ``csv``, ``ndjson`` or ``m3u``.
+    writer : function
+        Writes CSV rows. Only used by the ``csv`` format.
+
+    Returns
+    -------
+    str, None
+        The encoded row, or None if the row was written by the writer or it can't be encoded
+        in the format (e.g. playlist entries without path).
+    """
+    if export_format == "ndjson":
+        return json.dumps(row) + "\n"
+
+    if export_format == "m3u":
+        if not row["path_to_movie"]:
+            return None
+
+        title = "%s (%s)" % (row["title"], row["year"]) if row["year"] else row["title"]
+
+        return "#EXTINF:%d,%s\n%s\n" % (row["runtime"] * 60 if row["runtime"] else -1,
+                                        _text(title or row["file_name"]), row["path_to_movie"])
+
+    writer([_text(row[field]) for field in FIELDS])
+
+
+def encode(rows, export_format):
+    """Encode rows in chunks.
+
+    Parameters
+    ----------
+    rows : iterable
+        The rows (see :any:`to_rows`).
+    export_format : str
+        One of the :any:`CONTENT_TYPES` formats.
+
+    Yields
+    ------
+    str
+        A chunk of the encoded rows of about :any:`CHUNK_SIZE` characters.
+
+    Raises
+    ------
+    ValueError
+        If the format can't be encoded as text.
+    """
+    if export_format not in CONTENT_TYPES:
+        raise ValueError("Unsupported streaming format: %s" % export_format)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer).writerow
+
+    if export_format == "csv":
+        writer(FIELDS)
+    elif export_format == "m3u":
+        buffer.write("#EXTM3U\n")
+
+    for row in rows:
+        line = _encode_row(row, export_format, writer)
+
+        if line:
+            buffer.write(line)
+
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _write_sqlite(path, rows):
+    """Write rows into an SQLite database.
+
+    Parameters
+    ----------
+    path : str
+        Path to the database file. It must not exist.
+    rows : iterable
+        The rows (see :any:`to_rows`).
+
+    Returns
+    -------
+    int
+        The amount of written rows.
+    """
+    conn = sqlite3.connect(path)
+    count = 0
+
+    try:
+        conn.execute("CREATE TABLE movies (%s)" % ", ".join(
+            "%s %s" % (field, _sql_types.get(field, "TEXT")) for field in FIELDS))
+        query = "INSERT INTO movies VALUES (%s)" % ", ".join("?" * len(FIELDS))
+        batch = []
+
+        for row in rows:
+            batch.append([row[field] if field in _sql_types else (_text(row[field]) or None)
+                          for field in FIELDS])
+
+            if len(batch) >= catalog.BATCH_SIZE:
+                conn.executemany(query, batch)
+                count += len(batch)
+                batch = []
+
+        conn.executemany(query, batch)
+        count += len(batch)
+        conn.execute("CREATE INDEX movies_imdb_id ON movies (imdb_id)")
+        conn.commit()
+    finally:
+        conn.close()
+
+    return count
+
+
+def write(path, rows, export_format):
+    """Export rows into a file.
+
+    The file is replaced atomically.
+
+    Parameters
+    ----------
+    path : str
+        Path to the exported file.
+    rows : iterable
+        The rows (see :any:`to_rows`).
+    export_format : str
+        One of the :any:`FORMATS`.
+
+    Returns
+    -------
+    int
+        The amount of exported rows.
+
+    Raises
+    ------
+    ValueError
+        If the format isn't supported.
+    """
+    if export_format not in FORMATS:
+        raise ValueError("Unsupported export format: %s" % export_format)
+
+    tmp_path = path + ".tmp"
+
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    if export_format == "sqlite":
+        count = _write_sqlite(tmp_path, rows)
+    else:
+        count = 0
+
+        def counted():
+            nonlocal count
+
+            for row in rows:
+                count += 1
+                yield row
+
+        with open(tmp_path, "w", encoding="utf-8", newline="") as out:
+            for chunk in encode(counted(), export_format):
+                out.write(chunk)
+
+    os.replace(tmp_path, path)
+
+    return count
+
+
+def stream(rows, export_format):
+    """Export rows as a stream of bytes (e.g. a chunked HTTP response).
+
+    Parameters
+    ----------
+    rows : iterable
+        The rows (see :any:`to_rows`).
+    export_format : str
+        One of the :any:`CONTENT_TYPES` formats.
+
+    Yields
+    ------
+    bytes
+        A chunk of the exported rows encoded as UTF-8.
+    """
+    for chunk in encode(rows, export_format):
+        yield chunk.encode("utf-8")
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+"""Faceted navigation of the movies catalog backed by bitmap indexes.
+
+Every value of a facet (e.g. the ``Drama`` genre) has the set of movies with that value, so
+filtering is a bitwise AND of sets and counting is a popcount. The sets of the values of the
+facets with few values (see :any:`BITSETS`) and of the :any:`CANDIDATES` most frequent values
+of the rest of facets are Python ints used as bitsets (bit ``i`` is the movie ``i``). The sets
+of the rest of values (most directors and actors) are sorted :py:mod:`array` of movie indexes,
+because a bitset per actor would need as many bits as movies.
+
+Facet counts are disjunctive: the counts of a facet are computed with the selections of the
+other facets, so they are the amount of movies that selecting each value would add. If few
+movies are selected (see :any:`MOVIES_PER_POPCOUNT`), the values of each selected movie are
+counted instead, because a popcount takes time proportional to the amount of movies of the
+catalog. Otherwise, facets with many values (directors and actors) only count their
+:any:`CANDIDATES` most frequent values.
+
+This module only depends on the standard library, so the web application can use it without
+the dependencies needed to generate movies data.
+
+Attributes
+----------
+BITSETS : int
+    Maximum amount of values of the facets whose values are all stored as bitsets (e.g. years
+    or genres).
+CANDIDATES : int
+    Amount of most frequent values of the facets with more than :any:`BITSETS` values stored
+    as bitsets. They are the values counted when there are many selected movies.
+FACETS : tuple
+    Facets of the movies.
+LIMIT : int
+    Default amount of values returned per facet.
+MOVIES_PER_POPCOUNT : int
+    Amount of selected movies whose value is counted in about the time of a popcount of a
+    bitset of 100000 movies, for facets with a single value per movie (e.g. years).
+"""
+import heapq
+import itertools
+import operator
+import re
+
+from array import array
+from collections import Counter
+
+BITSETS = 256
+CANDIDATES = 50
+FACETS = ("year", "decade", "resolution", "codec", "genre", "director", "actor")
+LIMIT = 10
+MOVIES_PER_POPCOUNT = 160
+
+_byte_bits = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+_year = re.compile(r"\d{4}")
+
+try:
+    _popcount = int.bit_count
+except AttributeError:
+    # Python < 3.10.
+    def _popcount(mask):
+        return bin(mask).count("1")
+
+
+def _listed(value):
+    """Convert a value guessed from a file name into facet values.
+
+    Parameters
+    ----------
+    value : object
+        The value. It can be a list.
+
+    Returns
+    -------
+    tuple
+        The values as text.
+    """
+    values = value if isinstance(value, (list, tuple)) else [value]
+
+    return tuple(dict.fromkeys(str(v) for v in values if v))
+
+
+def _names(value):
+    """Split the comma-separated names of a movie detail.
+
+    Parameters
+    ----------
+    value : str, None
+        The detail value.
+
+    Returns
+    -------
+    tuple
+        The distinct names. ``N/A`` is no name.
+    """
+    if not value or value == "N/A":
+        return ()
+
+    return tuple(dict.fromkeys(name for name in map(str.strip, value.split(",")) if name))
+
+
+def facet_values(movie):
+    """Get the facet values of a movie.
+
+    Parameters
+    ----------
+    movie : dict
+        The movie base data, with a ``details`` key if the movie was resolved.
+
+    Returns
+    -------
+    dict
+        Maps each of the :any:`FACETS` to a tuple with the values of the movie. Years and
+        decades are integers.
+    """
+    details = movie.get("details") or {}
+    match = _year.search(str(details.get("Year") or movie.get("year") or ""))
+    year = int(match.group()) if match else None
+
+    return {
+        "year": (year,) if year else (),
+        "decade": (year // 10 * 10,) if year else (),
+        "resolution": _listed(movie.get("screen_size")),
+        "codec": _listed(movie.get("video_codec")),
+        "genre": _names(details.get("Genre")),
+        "director": _names(details.get("Director")),
+        "actor": _names(details.get("Actors")),
+    }
+
+
+def _bitset(indexes, size):
+    """Convert movie indexes into a bitset.
+
+    Parameters
+    ----------
+    indexes : iterable
+        The movie indexes.
+    size : int
+        Amount of movies.
+
+    Returns
+    -------
+    int
+        The bitset.
+    """
+    data = bytearray((size + 7) // 8)
+
+    for index in indexes:
+        data[index >> 3] |= 1 << (index & 7)
+
+    return int.from_bytes(data, "little")
+
+
+def _indexes(mask):
+    """Get the movie indexes of a bitset.
+
+    Parameters
+    ----------
+    mask : int
+        The bitset.
+
+    Returns
+    -------
+    list
+        The movie indexes, in ascending order.
+    """
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+
+    # Bytes without movies are skipped by itertools.compress, without a Python loop.
+    return [position * 8 + bit for position in itertools.compress(range(len(data)), data)
+            for bit in _byte_bits[data[position]]]
+
+
+class FacetIndex():
+    """Bitmap indexes of the facets of a list of movies.
+
+    Movies are referred to by their position in the list (e.g. the record indexes of a
+    :any:`catalog_snapshot.Snapshot`).
+
+    Attributes
+    ----------
+    size : int
+        Amount of movies.
+    """
+
+    def __init__(self, movies):
+        """Initialization.
+
+        Parameters
+        ----------
+        movies : iterable
+            The movies (see :any:`facet_values`).
+        """
+        # For each facet, the values, the code of each value, the movie indexes of each value
+        # and the value codes of each movie, stored as a flat array with the offsets of the
+        # codes of each movie (or as an array with a code per movie if movies have a single
+        # value, see _singles).
+        self._values = {facet: [] for facet in FACETS}
+        self._codes = {facet: {} for facet in FACETS}
+        self._links = {facet: (array("I"), array("I", [0])) for facet in FACETS}
+        postings = {facet: [] for facet in FACETS}
+        state = [(facet, self._codes[facet], self._values[facet], postings[facet]) +
+                 self._links[facet] for facet in FACETS]
+
+        for index, movie in enumerate(movies):
+            movie_values = facet_values(movie)
+
+            for facet, codes, values, facet_postings, links, offsets in state:
+                for value in movie_values[facet]:
+                    code = codes.get(value)
+
+                    if code is None:
+                        code = codes[value] = len(values)
+                        values.append(value)
+                        facet_postings.append(array("I"))
+
+                    facet_postings[code].append(index)
+                    links.append(code)
+
+                offsets.append(len(links))
+
+        self.size = len(self._links[FACETS[0]][1]) - 1
+        self._sets = {}
+        self._totals = {}
+        self._bitsets = {}
+        self._singles = {}
+
+        for facet in FACETS:
+            self._totals[facet] = sorted(((code, len(p)) for code, p in
+                                          enumerate(postings[facet])),
+                                         key=lambda item: -item[1])
+            self._sets[facet] = postings[facet]
+            amount = len(postings[facet]) if len(postings[facet]) <= BITSETS else CANDIDATES
+            self._bitsets[facet] = [code for code, total in self._totals[facet][:amount]]
+
+            for code in self._bitsets[facet]:
+                self._sets[facet][code] = _bitset(postings[facet][code], self.size)
+
+            links, offsets = self._links[facet]
+            self._singles[facet] = None
+
+            if self.size and max(map(operator.sub, offsets[1:], offsets[:-1])) <= 1:
+                # Movies without value have the code of no value.
+                single = array("I", [len(self._values[facet])]) * self.size
+
+                for index in itertools.compress(range(self.size), map(
+                        operator.sub, offsets[1:], offsets[:-1])):
+                    single[index] = links[offsets[index]]
+
+                self._singles[facet] = single
+                self._links[facet] = None
+
+    def __len__(self):
+        """Amount of movies.
+
+        Returns
+        -------
+        int
+            Amount of movies.
+        """
+        return self.size
+
+    def _mask(self, facet, values):
+        """Get the movies with any of some values of a facet.
+
+        Parameters
+        ----------
+        facet : str
+            One of the :any:`FACETS`.
+        values : list
+            The values. Unknown values are ignored.
+
+        Returns
+        -------
+        int
+            The movies bitset.
+        """
+        mask = 0
+
+        for value in values:
+            code = self._codes[facet].get(value)
+
+            if code is not None:
+                movies = self._sets[facet][code]
+                mask |= movies if isinstance(movies, int) else _bitset(movies, self.size)
+
+        return mask
+
+    def _count(self, facet, codes, base):
+        """Count the selected movies of some values of a facet.
+
+        Parameters
+        ----------
+        facet : str
+            One of the :any:`FACETS`.
+        codes : iterable
+            The value codes.
+        base : int
+            The selected movies bitset.
+
+        Returns
+        -------
+        dict
+            Maps value codes to amounts of movies.
+        """
+        counts = {}
+        base_bytes = None
+
+        for code in codes:
+            movies = self._sets[facet][code]
+
+            if isinstance(movies, int):
+                counts[code] = _popcount(movies & base)
+            else:
+                if base_bytes is None:
+                    base_bytes = base.to_bytes((self.size + 7) // 8, "little")
+
+                counts[code] = sum(base_bytes[i >> 3] >> (i & 7) & 1 for i in movies)
+
+        return counts
+
+    def _count_movies(self, facet, indexes):
+        """Count the values of a facet of some movies.
+
+        Parameters
+        ----------
+        facet : str
+            One of the :any:`FACETS`.
+        indexes : list
+            The movie indexes.
+
+        Returns
+        -------
+        collections.Counter
+            Maps value codes to amounts of movies.
+        """
+        single = self._singles[facet]
+
+        if single is None:
+            links, offsets = self._links[facet]
+
+            return Counter(itertools.chain.from_iterable(
+                links[offsets[i]:offsets[i + 1]] for i in indexes))
+
+        counts = Counter(operator.itemgetter(*indexes)(single) if len(indexes) > 1 else
+                         [single[i] for i in indexes])
+        counts.pop(len(self._values[facet]), None)
+
+        return counts
+
+    def select(self, selections):
+        """Get the movies matching facet selections.
+
+        Parameters
+        ----------
+        selections : dict
+            Maps facets to lists of values. A movie must have any of the values of every
+            facet.
+
+        Returns
+        -------
+        int
+            The movies bitset.
+
+        Raises
+        ------
+        ValueError
+            If a facet isn't one of the :any:`FACETS`.
+        """
+        mask = (1 << self.size) - 1
+
+        for facet, values in selections.items():
+            if facet not in FACETS:
+                raise ValueError("Unknown facet: %s" % facet)
+
+            if values:
+                mask &= self._mask(facet, values)
+
+        return mask
+
+    def counts(self, selections, limit=LIMIT):
+        """Count the movies matching facet selections and the movies of each facet value.
+
+        Parameters
+        ----------
+        selections : dict
+            See :any:`FacetIndex.select`.
+        limit : int, optional
+            Maximum amount of values per facet. Selected values are always included.
+
+        Returns
+        -------
+        dict
+            The amount of matching movies (``count``) and, for each of the :any:`FACETS`, a
+            list of ``{"value", "count", "selected"}`` dictionaries sorted by count in
+            descending order (``facets``).
+
+        Raises
+        ------
+        ValueError
+            If a facet isn't one of the :any:`FACETS`.
+        """
+        full = (1 << self.size) - 1
+        masks = {facet: self.select({facet: values}) for facet, values in selections.items()
+                 if values}
+        # Facets without selections share the same base, so its movies are only found once.
+        selected_movies = {}
+        facets = {}
+
+        for facet in FACETS:
+            base = full
+
+            for other, mask in masks.items():
+                if other != facet:
+                    base &= mask
+
+            codes = self._codes[facet]
+            selected = [codes[v] for v in selections.get(facet) or () if v in codes]
+
+            if base == full:
+                counts = dict(self._totals[facet][:limit])
+            else:
+                if base not in selected_movies:
+                    selected_movies[base] = [_popcount(base), None]
+
+                # Popcounts take time proportional to the amount of movies, and counting the
+                # values of movies with several values is about 8 times slower.
+                movies_per_popcount = MOVIES_PER_POPCOUNT * self.size / 100000 / \
+                    (1 if self._singles[facet] is not None else 8)
+
+                if selected_movies[base][0] <= movies_per_popcount * len(self._bitsets[facet]):
+                    if selected_movies[base][1] is None:
+                        selected_movies[base][1] = _indexes(base)
+
+                    counts = self._count_movies(facet, selected_movies[base][1])
+                else:
+                    counts = self._count(facet, self._bitsets[facet], base)
+
+            counts.update(self._count(facet, [c for c in selected if c not in counts], base))
+            top = [code for code, count in heapq.nlargest(limit, counts.items(),
+                                                          key=operator.itemgetter(1)) if count]
+            top += [code for code in selected if code not in top]
+            facets[facet] = [{"value": self._values[facet][code], "count": counts[code],
+                              "selected": code in selected} for code in top]
+
+        total = full
+
+        for mask in masks.values():
+            total &= mask
+
+        return {"count": _popcount(total), "facets": facets}
+
+    def indexes(self, selections):
+        """Get the movies matching facet selections.
+
+        Parameters
+        ----------
+        selections : dict
+            See :any:`FacetIndex.select`.
+
+        Returns
+        -------
+        set
+            The movie indexes.
+        """
+        return set(_indexes(self.select(selections)))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Inter-process locks of state files.
+
+The command line application and the web application can run at the same time and update the
+same state files (e.g. the requests quota or the disambiguation queue). Their updates are
+serialized with a lock file next to the state file, and the state is read again while the lock
+is held, so the changes of another process aren't overwritten.
+"""
+import os
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows.
+    import msvcrt
+
+    fcntl = None
+
+
+@contextmanager
+def locked(path):
+    """Hold the exclusive lock of a file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the locked file. The lock is held on a file with the same path plus ``.lock``,
+        so the locked file can be replaced while the lock is held.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path + ".lock", "a+b") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+if __name__ == "__main__":
+    pass
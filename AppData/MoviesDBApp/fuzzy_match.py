@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Trigram based fuzzy matching of movie titles.
+
+Attributes
+----------
+MIN_SIMILARITY : float
+    Minimum similarity (Sørensen–Dice coefficient over trigrams) for a candidate to match.
+SNAPSHOT_VERSION : int
+    Version of the snapshot format. Snapshots with a different version are ignored.
+"""
+import heapq
+import math
+import os
+import pickle
+
+from array import array
+
+from . import title_keys
+
+MIN_SIMILARITY = 0.75
+SNAPSHOT_VERSION = 2
+
+
+def trigrams(norm_title):
+    """Get the trigrams of a normalized title.
+
+    Parameters
+    ----------
+    norm_title : str
+        A title key (see :any:`title_keys.title_key`).
+
+    Returns
+    -------
+    set
+        The title trigrams. The title is padded so its start and end are also represented.
+    """
+    padded = "  %s " % norm_title
+
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex():
+    """Inverted index of title trigrams.
+
+    Attributes
+    ----------
+    ids : list
+        The identifier of every indexed title.
+    titles : list
+        The indexed titles.
+    years : array.array
+        The year of every indexed title (0 if unknown).
+    """
+
+    def __init__(self):
+        """Initialization.
+        """
+        self.ids = []
+        self.titles = []
+        self.years = array("H")
+        self._norm_titles = []
+        self._sizes = array("B")
+        self._postings = {}
+
+    def __len__(self):
+        """Amount of indexed titles.
+
+        Returns
+        -------
+        int
+            Amount of indexed titles.
+        """
+        return len(self.ids)
+
+    def add(self, item_id, title, year=None):
+        """Add a title to the index.
+
+        Parameters
+        ----------
+        item_id : str
+            The title identifier (e.g. an IMDb ID) returned by :any:`TrigramIndex.search`.
+        title : str
+            A movie title.
+        year : int, None, optional
+            A movie release year.
+        """
+        norm_title = title_keys.title_key(title)
+
+        if not norm_title:
+            return
+
+        pos = len(self.ids)
+        self.ids.append(item_id)
+        self.titles.append(title)
+        self.years.append(int(year) if year else 0)
+        self._norm_titles.append(norm_title)
+        title_trigrams = trigrams(norm_title)
+        self._sizes.append(min(255, len(title_trigrams)))
+
+        for trigram in title_trigrams:
+            posting = self._postings.get(trigram)
+
+            if posting is None:
+                posting = self._postings[trigram] = array("I")
+
+            posting.append(pos)
+
+    def search(self, title, year=None, k=5, year_tolerance=1, min_similarity=MIN_SIMILARITY):
+        """Find the titles most similar to ``title``.
+
+        Candidates are gathered from the postings of the query rarest trigrams only. A title
+        sharing none of them can't reach ``min_similarity`` (prefix filtering), so only a small
+        fraction of the index is considered. Candidates whose amount of trigrams makes
+        reaching ``min_similarity`` impossible are discarded before being scored.
+
+        Parameters
+        ----------
+        title : str
+            A movie title.
+        year : int, None, optional
+            A movie release year. If passed, only titles with a year within ``year_tolerance``
+            (or without a year) are considered.
+        k : int, optional
+            Maximum amount of results.
+        year_tolerance : int, optional
+            Maximum difference between years.
+        min_similarity : float, optional
+            See :any:`MIN_SIMILARITY`.
+
+        Returns
+        -------
+        list
+            A list of ``(similarity, item_id, title, year)`` tuples sorted by similarity.
+        """
+        query = trigrams(title_keys.title_key(title))
+        postings = sorted((self._postings.get(t, ()) for t in query), key=len)
+
+        # A candidate with a Dice similarity of at least min_similarity shares at least
+        # min_overlap trigrams with the query, so it must appear in one of the
+        # len(query) - min_overlap + 1 rarest postings.
+        min_overlap = math.ceil(min_similarity * len(query) / (2 - min_similarity))
+        candidates = set()
+
+        for posting in postings[:len(query) - min_overlap + 1]:
+            candidates.update(posting)
+
+        year = int(year) if year else 0
+        min_size = min_similarity * len(query) / (2 - min_similarity)
+        max_size = (2 - min_similarity) * len(query) / min_similarity
+        sizes = self._sizes
+        years = self.years
+        results = []
+
+        for pos in candidates:
+            if not min_size <= sizes[pos] <= max_size:
+                continue
+
+            cand_year = years[pos]
+
+            if year and cand_year and abs(cand_year - year) > year_tolerance:
+                continue
+
+            cand = trigrams(self._norm_titles[pos])
+            similarity = 2 * len(query & cand) / (len(query) + len(cand))
+
+            if similarity >= min_similarity:
+                results.append((similarity, self.ids[pos], self.titles[pos], cand_year or None))
+
+        return heapq.nlargest(k, results, key=lambda r: r[0])
+
+    def save(self, path, signature=None):
+        """Store a snapshot of the index.
+
+        Parameters
+        ----------
+        path : str
+            Path to the snapshot file.
+        signature : object, optional
+            Any picklable value describing the sources of the index. See
+            :any:`TrigramIndex.load`.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+
+        with open(tmp_path, "wb") as out:
+            pickle.dump((SNAPSHOT_VERSION, signature, self.ids, self.titles, self.years,
+                         self._norm_titles, self._sizes, self._postings),
+                        out, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, signature=None):
+        """Load a snapshot of the index.
+
+        Parameters
+        ----------
+        path : str
+            Path to the snapshot file.
+        signature : object, optional
+            The signature of the current sources of the index. See :any:`TrigramIndex.save`.
+
+        Returns
+        -------
+        TrigramIndex, None
+            The index, or None if the snapshot doesn't exist or has a different version or
+            signature.
+        """
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, "rb") as file:
+            data = pickle.load(file)
+
+        if data[0] != SNAPSHOT_VERSION or data[1] != signature:
+            return None
+
+        index = cls()
+        (index.ids, index.titles, index.years, index._norm_titles,
+         index._sizes, index._postings) = data[2:]
+
+        return index
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""Offline movies data from the public IMDb datasets.
+
+The ``title.basics.tsv.gz`` and ``title.ratings.tsv.gz`` files from
+`IMDb datasets <https://www.imdb.com/interfaces/>`__ are streamed into a compact SQLite index
+that can be queried by title and year without any network access.
+
+Attributes
+----------
+BATCH_SIZE : int
+    Amount of rows inserted per transaction while importing.
+TITLE_TYPES : tuple
+    IMDb title types that are imported.
+"""
+import gzip
+import os
+import sqlite3
+
+from . import title_keys
+
+BATCH_SIZE = 10000
+TITLE_TYPES = ("movie", "tvMovie")
+
+_schema = """
+CREATE TABLE ratings (
+    tconst TEXT PRIMARY KEY,
+    rating REAL,
+    votes INTEGER
+) WITHOUT ROWID;
+CREATE TABLE titles (
+    tconst TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    original_title TEXT,
+    year INTEGER,
+    runtime INTEGER,
+    genres TEXT,
+    rating REAL,
+    votes INTEGER
+) WITHOUT ROWID;
+CREATE TABLE title_keys (
+    key TEXT NOT NULL,
+    year INTEGER,
+    tconst TEXT NOT NULL
+);
+"""
+
+_columns = ("tconst", "title", "original_title", "year", "runtime", "genres", "rating", "votes")
+
+_indexes = """
+CREATE INDEX title_keys_key_year ON title_keys (key, year);
+DROP TABLE ratings;
+"""
+
+
+def title_key(title):
+    """Get the key used to index a title.
+
+    Parameters
+    ----------
+    title : str
+        A movie title.
+
+    Returns
+    -------
+    str
+        The title key (see :any:`title_keys.title_key`).
+    """
+    return title_keys.title_key(title)
+
+
+def _read_tsv(path):
+    """Stream the rows of a (possibly gzipped) IMDb TSV file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+
+    Yields
+    ------
+    list
+        The row fields. Null values (``\\N``) are converted to None. The header is skipped.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+
+    with opener(path, "rt", encoding="utf-8", newline="\n") as file:
+        next(file, None)
+
+        for line in file:
+            yield [None if f == "\\N" else f for f in line.rstrip("\n").split("\t")]
+
+
+def _to_int(value):
+    """Convert a field to an integer.
+
+    Parameters
+    ----------
+    value : str, None
+        The field value.
+
+    Returns
+    -------
+    int, None
+        The converted value.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _batches(rows):
+    """Group rows in lists of :any:`BATCH_SIZE` items.
+
+    Parameters
+    ----------
+    rows : iterable
+        The rows to group.
+
+    Yields
+    ------
+    list
+        A batch of rows.
+    """
+    batch = []
+
+    for row in rows:
+        batch.append(row)
+
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def import_dataset(basics_path, ratings_path, db_path, logger):
+    """Import the IMDb datasets into a local index.
+
+    Files are streamed in batches, so memory usage doesn't depend on their size. The index is
+    built on a temporary file that replaces ``db_path`` once complete.
+
+    Parameters
+    ----------
+    basics_path : str
+        Path to the ``title.basics.tsv.gz`` file.
+    ratings_path : str
+        Path to the ``title.ratings.tsv.gz`` file.
+    db_path : str
+        Path to the SQLite database storing the index.
+    logger : LogSystem
+        The logger.
+
+    Returns
+    -------
+    int
+        The amount of imported titles.
+    """
+    tmp_path = db_path + ".tmp"
+
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(_schema)
+
+    logger.info("Importing ratings...")
+
+    for batch in _batches((r[0], float(r[1]), _to_int(r[2]))
+                          for r in _read_tsv(ratings_path) if len(r) >= 3 and r[1]):
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO ratings VALUES (?, ?, ?)", batch)
+
+    logger.info("Importing titles...")
+    total = 0
+    titles = (r for r in _read_tsv(basics_path)
+              if len(r) >= 9 and r[1] in TITLE_TYPES and r[4] != "1")
+
+    for batch in _batches(titles):
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO titles "
+                "SELECT ?, ?, ?, ?, ?, ?, r.rating, r.votes FROM (SELECT 1) "
+                "LEFT JOIN ratings r ON r.tconst = ?",
+                ((r[0], r[2], r[3] if r[3] != r[2] else None, _to_int(r[5]),
+                  _to_int(r[7]), r[8], r[0]) for r in batch))
+            conn.executemany(
+                "INSERT INTO title_keys VALUES (?, ?, ?)",
+                ((key, _to_int(r[5]), r[0]) for r in batch
+                 for key in {title_key(r[2]), title_key(r[3] or r[2])} if key))
+
+        total += len(batch)
+
+    logger.info("Building indexes...")
+    conn.executescript(_indexes)
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, db_path)
+
+    return total
+
+
+class IMDbIndex():
+    """Query a local index created by :any:`import_dataset`.
+
+    Attributes
+    ----------
+    db_path : str
+        Path to the SQLite database storing the index.
+    """
+
+    def __init__(self, db_path):
+        """Initialization.
+
+        Parameters
+        ----------
+        db_path : str
+            Path to the SQLite database storing the index.
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect("file:%s?mode=ro" % db_path, uri=True,
+                                     check_same_thread=False)
+
+    def lookup(self, title, year=None):
+        """Find a movie.
+
+        The title with the exact year is preferred. Otherwise, the title with the nearest year
+        is returned. Ties (and lookups without a year) are resolved by amount of votes.
+
+        Parameters
+        ----------
+        title : str
+            A movie title.
+        year : int, None, optional
+            A movie release year.
+
+        Returns
+        -------
+        dict, None
+            The movie data (``tconst``, ``title``, ``original_title``, ``year``, ``runtime``,
+            ``genres``, ``rating`` and ``votes``) or None if not found.
+        """
+        year = int(year) if year else None
+        row = self._conn.execute(
+            "SELECT t.tconst, t.title, t.original_title, t.year, t.runtime, t.genres, t.rating, "
+            "t.votes "
+            "FROM title_keys k JOIN titles t ON t.tconst = k.tconst WHERE k.key = ? "
+            "ORDER BY CASE WHEN ? IS NULL THEN 0 ELSE abs(coalesce(k.year, 0) - ?) END, "
+            "coalesce(t.votes, 0) DESC LIMIT 1",
+            (title_key(title), year, year)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return dict(zip(_columns, row))
+
+    def get(self, tconst):
+        """Get a movie by its IMDb ID.
+
+        Parameters
+        ----------
+        tconst : str
+            An IMDb ID.
+
+        Returns
+        -------
+        dict, None
+            See :any:`IMDbIndex.lookup`.
+        """
+        row = self._conn.execute(
+            "SELECT tconst, title, original_title, year, runtime, genres, rating, votes "
+            "FROM titles WHERE tconst = ?", (tconst,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return dict(zip(_columns, row))
+
+    def iter_titles(self):
+        """Iterate over all the indexed titles.
+
+        Yields
+        ------
+        tuple
+            An ``(tconst, title, year)`` tuple for every primary and original title.
+        """
+        cursor = self._conn.execute("SELECT tconst, title, original_title, year FROM titles")
+
+        for tconst, title, original_title, year in cursor:
+            yield tconst, title, year
+
+            if original_title:
+                yield tconst, original_title, year
+
+    def close(self):
+        """Close the database connection.
+        """
+        self._conn.close()
+
+
+def to_omdb_response(movie):
+    """Convert a movie found in the local index to the format of an OMDb API response.
+
+    Parameters
+    ----------
+    movie : dict
+        A movie as returned by :any:`IMDbIndex.lookup`.
+
+    Returns
+    -------
+    dict
+        The movie data using the same keys as an OMDb API response, plus an ``OriginalTitle``
+        key if the original title is different.
+    """
+    response = {
+        "Response": "True",
+        "Title": movie["title"],
+        "Year": str(movie["year"] or "N/A"),
+        "Runtime": "%d min" % movie["runtime"] if movie["runtime"] else "N/A",
+        "Genre": movie["genres"].replace(",", ", ") if movie["genres"] else "N/A",
+        "imdbID": movie["tconst"],
+        "imdbRating": str(movie["rating"]) if movie["rating"] is not None else "N/A",
+        "imdbVotes": str(movie["votes"]) if movie["votes"] is not None else "N/A",
+        "Type": "movie",
+    }
+
+    if movie["original_title"] and movie["original_title"] != movie["title"]:
+        response["OriginalTitle"] = movie["original_title"]
+
+    return response
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""On demand resolution of movie details.
+
+Used by the web application so a library can be browsed before (or without) generating the
+detailed data of all its movies up front.
+
+Attributes
+----------
+MAX_PENDING : int
+    Maximum amount of prefetches waiting to be resolved. Prefetches requested while this
+    amount is reached are ignored.
+PREFETCH_WORKERS : int
+    Amount of movies resolved concurrently in the background.
+"""
+import threading
+
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_PENDING = 50
+PREFETCH_WORKERS = 4
+
+
+class LazyEnricher():
+    """Resolve movie details the first time they are requested.
+
+    Movies are read from the catalog when requested, so the movies added by a scan since the
+    web application started can be resolved too. Resolved movies are stored into the catalog,
+    so they are found by searches and queries right away, and they are not looked up again by
+    the web application nor by the next detailed data generation.
+
+    Attributes
+    ----------
+    details : dict
+        Maps file names to their resolved movie data (the base data plus a ``details`` key), or
+        None for movies known to not be found. Only the movies requested from this instance
+        are included.
+    movies_catalog : catalog.Catalog
+        The catalog where the movies are read from and where resolved movies are stored.
+    """
+
+    def __init__(self, movies_catalog, lookup, max_workers=PREFETCH_WORKERS):
+        """Initialization.
+
+        Parameters
+        ----------
+        movies_catalog : catalog.Catalog
+            See :any:`LazyEnricher.movies_catalog`.
+        lookup : callable
+            Called with a movie base data. It should return the movie details in the format of
+            an OMDb API response (e.g. :any:`metadata_providers.ProviderChain.lookup`).
+        max_workers : int, optional
+            See :any:`PREFETCH_WORKERS`.
+        """
+        self.movies_catalog = movies_catalog
+        self.details = {}
+        self._lookup = lookup
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def get(self, file_name):
+        """Get a movie data, resolving it if needed.
+
+        A lookup of the same movie already in progress (e.g. a prefetch) is waited for instead
+        of performing another one.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+
+        Returns
+        -------
+        dict, None
+            The movie data, or None if the movie wasn't found.
+
+        Raises
+        ------
+        KeyError
+            If the file name isn't part of the library.
+        """
+        with self._lock:
+            if file_name in self.details:
+                return self.details[file_name]
+
+            future = self._futures.get(file_name)
+            owner = future is None
+
+            if owner:
+                future = self._futures[file_name] = Future()
+
+        if owner:
+            self._resolve(file_name, future)
+
+        return future.result()
+
+    def prefetch(self, file_names):
+        """Resolve movies in the background.
+
+        Parameters
+        ----------
+        file_names : list
+            The file names of the movies to resolve. Unknown, already resolved and already
+            pending movies are ignored.
+        """
+        with self._lock:
+            for file_name in file_names:
+                if len(self._futures) >= MAX_PENDING:
+                    break
+
+                if file_name not in self.details and file_name not in self._futures:
+                    future = self._futures[file_name] = Future()
+                    self._executor.submit(self._resolve, file_name, future)
+
+    def _resolve(self, file_name, future):
+        """Look up a movie and store the result.
+
+        Movies already stored in the catalog (e.g. by a detailed data generation) aren't looked
+        up. Failed lookups (e.g. due to quota exhaustion) are not stored, so they are retried
+        the next time the movie is requested.
+
+        Parameters
+        ----------
+        file_name : str
+            The movie file name.
+        future : concurrent.futures.Future
+            The future where the result (or the error) is set.
+        """
+        try:
+            stored = self.movies_catalog.details([file_name])
+
+            if file_name in stored:
+                result = stored[file_name]
+            else:
+                movie = next(self.movies_catalog.select("f.file_name = ?", (file_name,)), None)
+
+                if movie is None:
+                    raise KeyError(file_name)
+
+                data = self._lookup(movie)
+                result = dict(movie, details=data) if data.get("Response") == "True" else None
+                self.movies_catalog.set_metadata(file_name, data if result else None)
+                self.movies_catalog.commit()
+        except Exception as err:
+            with self._lock:
+                del self._futures[file_name]
+
+            future.set_exception(err)
+            return
+
+        with self._lock:
+            self.details[file_name] = result
+            del self._futures[file_name]
+
+        future.set_result(result)
+
+    def close(self):
+        """Stop the background lookups and close the catalog.
+        """
+        self._executor.shutdown(wait=True)
+        self.movies_catalog.close()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Generation of alternative lookups for movies whose exact title and year aren't found.
+
+Attributes
+----------
+MAX_REMOTE_LOOKUPS : int
+    Maximum amount of lookups of a single movie performed against a remote API.
+MAX_YEAR_DIFF : int
+    Maximum difference between the wanted year and the year of a result for the result to be
+    considered a confident hit.
+"""
+import re
+
+from . import title_keys
+
+MAX_REMOTE_LOOKUPS = 3
+MAX_YEAR_DIFF = 1
+
+_edition_tag = re.compile(
+    r"[\s\-:,(\[]*\b(director'?s cut|extended( edition| cut| version)?|"
+    r"unrated( edition| cut| version)?|uncut|remastered|theatrical( cut| version)?|"
+    r"special edition|collector'?s edition|ultimate edition|anniversary edition|"
+    r"final cut|redux|imax( edition)?|criterion( collection)?)\b[\s)\]]*$",
+    re.IGNORECASE)
+_aka = re.compile(r"\s+a\.?k\.?a\.?\s+", re.IGNORECASE)
+_leading_article = re.compile(r"^(%s)\s+" % "|".join(title_keys.ARTICLES), re.IGNORECASE)
+
+
+def strip_edition_tag(title):
+    """Remove a trailing edition tag (e.g. "Director's Cut", "Extended Edition") from a title.
+
+    Parameters
+    ----------
+    title : str
+        A movie title.
+
+    Returns
+    -------
+    str
+        The title without edition tags.
+    """
+    previous = None
+
+    while previous != title:
+        previous = title
+        title = _edition_tag.sub("", title).strip()
+
+    return title or previous
+
+
+def plan(title, year=None):
+    """Generate lookups ranked by likelihood of matching.
+
+    The lookups are (in order): the exact title and year, the title without a trailing edition
+    tag, each part of a title with an "AKA", the titles without leading article, the previous
+    and next years and, finally, no year at all.
+
+    Parameters
+    ----------
+    title : str
+        A movie title.
+    year : int, None, optional
+        A movie release year.
+
+    Returns
+    -------
+    list
+        A list of unique ``(title, year)`` tuples. The first one is always the exact lookup.
+    """
+    titles = [title]
+    base_title = strip_edition_tag(title)
+    titles.append(base_title)
+    titles.extend(part.strip() for part in _aka.split(base_title) if part.strip())
+    titles.extend([_leading_article.sub("", t) for t in titles[1:]])
+
+    # Titles with the same key (e.g. that only differ in punctuation) are looked up once.
+    unique_titles = {}
+
+    for t in titles:
+        if t:
+            unique_titles.setdefault(title_keys.title_key(t, strip_articles=False), t)
+
+    unique_titles = list(unique_titles.values())
+
+    lookups = [(t, year) for t in unique_titles]
+
+    if year:
+        year = int(year)
+        lookups.extend((t, y) for y in (year - 1, year + 1) for t in unique_titles)
+        lookups.extend((t, None) for t in unique_titles)
+
+    return lookups
+
+
+def is_confident(wanted_year, found_year):
+    """Check whether a result found for a lookup is a confident hit.
+
+    Parameters
+    ----------
+    wanted_year : int, None
+        The year used for the lookup.
+    found_year : int, str, None
+        The year of the result.
+
+    Returns
+    -------
+    bool
+        Whether the years are close enough (see :any:`MAX_YEAR_DIFF`) or any of them is
+        unknown.
+    """
+    try:
+        return not wanted_year or not found_year or \
+            abs(int(str(found_year)[:4]) - int(wanted_year)) <= MAX_YEAR_DIFF
+    except ValueError:
+        return True
+
+
+if __name__ == "__main__":
+    pass
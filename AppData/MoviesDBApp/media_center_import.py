@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+"""Bulk import of movie details from media center libraries.
+
+Kodi video databases (``MyVideos*.db``), Jellyfin databases (``library.db`` or ``jellyfin.db``)
+and trees of NFO files are read as entries with a path, a file size (if known) and the movie
+details in the format of an OMDb API response. Entries are matched with the files of the
+catalog (see :any:`Matcher`) and their details are stored in batched transactions, so movies
+already curated in another library are neither parsed nor looked up again (see
+:any:`metadata_providers.ImportedProvider`).
+
+The readers only need the path of a database or a folder, so they can be used with small
+fixture databases.
+
+Attributes
+----------
+JELLYFIN_MOVIE_TYPE : str
+    Type of the movie items in Jellyfin databases.
+SOURCES : tuple
+    Supported kinds of libraries.
+"""
+import os
+import re
+import sqlite3
+
+from urllib.request import pathname2url
+
+from . import catalog
+from . import metadata_providers
+
+JELLYFIN_MOVIE_TYPE = "MediaBrowser.Controller.Entities.Movies.Movie"
+SOURCES = ("kodi", "jellyfin", "nfo")
+
+_path_separators = re.compile(r"[\\/]")
+
+
+def _details(title, year=None, plot=None, runtime=None, genre=None, director=None,
+             actors=None, imdb_id=None, rating=None, original_title=None):
+    """Create movie details in the format of an OMDb API response.
+
+    Parameters
+    ----------
+    title : str
+        The movie title.
+    year : int, str, None, optional
+        The release year.
+    plot : str, None, optional
+        The plot.
+    runtime : int, None, optional
+        The runtime in minutes.
+    genre : list, None, optional
+        The genres.
+    director : list, None, optional
+        The directors.
+    actors : list, None, optional
+        The actors.
+    imdb_id : str, None, optional
+        The IMDb ID.
+    rating : float, str, None, optional
+        The rating.
+    original_title : str, None, optional
+        The original title.
+
+    Returns
+    -------
+    dict
+        The movie details (plus an ``OriginalTitle`` key if the original title is different).
+    """
+    response = {
+        "Response": "True",
+        "Title": title,
+        "Year": str(year) if year else "N/A",
+        "Plot": plot or "N/A",
+        "Runtime": "%d min" % runtime if runtime else "N/A",
+        "Genre": ", ".join(genre) if genre else "N/A",
+        "Director": ", ".join(director) if director else "N/A",
+        "Actors": ", ".join(actors) if actors else "N/A",
+        "imdbID": imdb_id if imdb_id and imdb_id.startswith("tt") else "N/A",
+        "imdbRating": ("%.1f" % float(rating)) if rating else "N/A",
+        "Type": "movie",
+    }
+
+    if original_title and original_title != title:
+        response["OriginalTitle"] = original_title
+
+    return response
+
+
+def _split(value, separator):
+    """Split a list of values stored as text.
+
+    Parameters
+    ----------
+    value : str, None
+        The values.
+    separator : str
+        The separator.
+
+    Returns
+    -------
+    list
+        The non-empty values.
+    """
+    return [v.strip() for v in (value or "").split(separator) if v.strip()]
+
+
+def _connect(db_path):
+    """Open a database read-only.
+
+    Parameters
+    ----------
+    db_path : str
+        Path to the database file.
+
+    Returns
+    -------
+    sqlite3.Connection
+        The connection. Rows are dictionaries.
+    """
+    conn = sqlite3.connect("file:%s?mode=ro" % pathname2url(os.path.abspath(db_path)),
+                           uri=True)
+    # Columns vary between versions, so rows are dictionaries and missing columns are None.
+    conn.row_factory = lambda cursor, row: {c[0]: v for c, v in zip(cursor.description, row)}
+
+    return conn
+
+
+def _tables(conn):
+    """Get the names of the tables and views of a database.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        The connection.
+
+    Returns
+    -------
+    set
+        The names.
+    """
+    return {row["name"] for row in conn.execute("SELECT name FROM sqlite_master")}
+
+
+def _grouped(conn, query):
+    """Group the values of a query by key.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        The connection.
+    query : str
+        A query selecting a key and a value, sorted as the values should be grouped.
+
+    Returns
+    -------
+    dict
+        Maps keys to lists of values.
+    """
+    groups = {}
+
+    for row in conn.execute(query):
+        key, value = row.values()
+        groups.setdefault(key, []).append(value)
+
+    return groups
+
+
+def read_kodi(db_path):
+    """Read the movies of a Kodi video database.
+
+    Parameters
+    ----------
+    db_path : str
+        Path to the database (``MyVideos*.db``).
+
+    Yields
+    ------
+    dict
+        An entry with ``path``, ``size`` (always None), ``title``, ``year`` and ``details``
+        keys.
+    """
+    conn = _connect(db_path)
+
+    try:
+        tables = _tables(conn)
+        view = "movie_view" if "movie_view" in tables else "movieview"
+        imdb_ids = {}
+        actors = {}
+
+        if "uniqueid" in tables:
+            imdb_ids = {row["media_id"]: row["value"] for row in conn.execute(
+                "SELECT media_id, value FROM uniqueid WHERE media_type = 'movie' AND "
+                "type = 'imdb'")}
+
+        if "actor_link" in tables:
+            actors = _grouped(conn, "SELECT l.media_id, a.name FROM actor_link l JOIN actor a "
+                              "ON a.actor_id = l.actor_id WHERE l.media_type = 'movie' "
+                              "ORDER BY l.media_id, l.cast_order")
+
+        for row in conn.execute("SELECT * FROM %s" % view):
+            file_name = row.get("strFileName") or ""
+
+            if file_name.startswith("stack://"):
+                # Movies split into several files. The first one identifies the movie.
+                path = file_name[len("stack://"):].split(" , ")[0]
+            else:
+                path = (row.get("strPath") or "") + file_name
+
+            year = (row.get("premiered") or "")[:4] or row.get("c07")
+            # Old databases store the runtime in minutes.
+            runtime = int(row["c11"]) if str(row.get("c11") or "").isdigit() else 0
+            runtime = runtime // 60 if runtime > 600 else runtime
+            imdb_id = imdb_ids.get(row["idMovie"]) or row.get("uniqueid_value") or row.get("c09")
+            rating = row.get("rating", row.get("c05"))
+
+            yield {
+                "path": path,
+                "size": None,
+                "title": row["c00"],
+                "year": int(year) if str(year or "").isdigit() else None,
+                "details": _details(row["c00"], year, row.get("c01"), runtime,
+                                    _split(row.get("c14"), " / "), _split(row.get("c15"), " / "),
+                                    actors.get(row["idMovie"]), imdb_id, rating, row.get("c16")),
+            }
+    finally:
+        conn.close()
+
+
+def read_jellyfin(db_path):
+    """Read the movies of a Jellyfin database.
+
+    Parameters
+    ----------
+    db_path : str
+        Path to the database (``library.db`` or, since Jellyfin 10.11, ``jellyfin.db``).
+
+    Yields
+    ------
+    dict
+        An entry with ``path``, ``size``, ``title``, ``year`` and ``details`` keys.
+    """
+    conn = _connect(db_path)
+
+    try:
+        tables = _tables(conn)
+        people = {}
+
+        if "TypedBaseItems" in tables:
+            query = "SELECT *, guid AS item_id FROM TypedBaseItems WHERE type = ?"
+
+            if "People" in tables:
+                for kind in ("Director", "Actor"):
+                    people[kind] = _grouped(
+                        conn, "SELECT ItemId, Name FROM People WHERE PersonType = '%s' "
+                        "ORDER BY ItemId, ListOrder" % kind)
+        else:
+            query = "SELECT *, Id AS item_id FROM BaseItems WHERE Type = ?"
+
+        provider_ids = {}
+
+        if "BaseItemProviders" in tables:
+            provider_ids = {row["ItemId"]: row["ProviderValue"] for row in conn.execute(
+                "SELECT ItemId, ProviderValue FROM BaseItemProviders WHERE ProviderId = 'Imdb'")}
+
+        for row in conn.execute(query, (JELLYFIN_MOVIE_TYPE,)):
+            item_id = row["item_id"]
+            providers = dict(p.split("=", 1) for p in _split(row.get("ProviderIds"), "|")
+                             if "=" in p)
+            imdb_id = provider_ids.get(item_id) or providers.get("Imdb")
+
+            yield {
+                "path": row["Path"],
+                "size": row.get("Size"),
+                "title": row["Name"],
+                "year": row.get("ProductionYear"),
+                "details": _details(row["Name"], row.get("ProductionYear"), row.get("Overview"),
+                                    # Ticks of 100 nanoseconds.
+                                    (row.get("RunTimeTicks") or 0) // 600000000,
+                                    _split(row.get("Genres"), "|"),
+                                    people.get("Director", {}).get(item_id),
+                                    people.get("Actor", {}).get(item_id), imdb_id,
+                                    row.get("CommunityRating"), row.get("OriginalTitle")),
+            }
+    finally:
+        conn.close()
+
+
+def read_nfo_tree(root, extensions):
+    """Read the NFO files of a folder tree.
+
+    Parameters
+    ----------
+    root : str
+        Path to the folder.
+    extensions : tuple
+        Extensions of the movie files.
+
+    Yields
+    ------
+    dict
+        An entry with ``path``, ``size``, ``title``, ``year`` and ``details`` keys for every
+        movie file with an NFO file (see :any:`metadata_providers.find_nfo_file`).
+    """
+    for folder, dirs, files in os.walk(os.path.abspath(root)):
+        for filename in files:
+            if os.path.splitext(filename)[1].lower() not in extensions:
+                continue
+
+            path = os.path.join(folder, filename)
+            nfo_path = metadata_providers.find_nfo_file(path, extensions, files)
+            details = metadata_providers.parse_nfo(nfo_path) if nfo_path else None
+
+            if details is not None:
+                year = details["Year"]
+
+                yield {
+                    "path": path,
+                    "size": os.path.getsize(path),
+                    "title": details["Title"],
+                    "year": int(year) if year.isdigit() else None,
+                    "details": details,
+                }
+
+
+def map_path(path, path_map):
+    """Translate a path of another library into a local path.
+
+    Parameters
+    ----------
+    path : str
+        The path.
+    path_map : list
+        ``(prefix, replacement)`` tuples (e.g. ``("smb://nas/movies/", "/mnt/movies/")``).
+        The first matching prefix is replaced.
+
+    Returns
+    -------
+    str
+        The local path. The separators of mapped paths are converted into the local separator.
+    """
+    for prefix, replacement in path_map:
+        if path.startswith(prefix):
+            return replacement + _path_separators.sub(lambda m: os.sep, path[len(prefix):])
+
+    return path
+
+
+class Matcher():
+    """Match the entries of other libraries with the files of the catalog.
+
+    Entries are matched by path first. Otherwise, they are matched by fingerprint: the base
+    name of the file (case-insensitively) and its size if both are known. Fingerprints matching
+    several files are ignored.
+    """
+
+    def __init__(self, movies_catalog):
+        """Initialization.
+
+        Parameters
+        ----------
+        movies_catalog : catalog.Catalog
+            The movies catalog.
+        """
+        self._paths = {}
+        self._basenames = {}
+
+        for file_name, path, size in movies_catalog.fingerprints():
+            self._paths[path] = file_name
+            self._basenames.setdefault(_path_separators.split(path)[-1].casefold(),
+                                       []).append((file_name, size))
+
+    def match(self, path, size=None):
+        """Find the file of the catalog matching an entry.
+
+        Parameters
+        ----------
+        path : str
+            The entry path.
+        size : int, None, optional
+            The entry file size.
+
+        Returns
+        -------
+        tuple
+            The file name of the matching file (None if there isn't a single one) and how it
+            was matched (``path``, ``fingerprint`` or None).
+        """
+        if path in self._paths:
+            return self._paths[path], "path"
+
+        candidates = [file_name for file_name, file_size in self._basenames.get(
+            _path_separators.split(path)[-1].casefold(), [])
+            if not size or not file_size or size == file_size]
+
+        return (candidates[0], "fingerprint") if len(candidates) == 1 else (None, None)
+
+
+def import_entries(movies_catalog, entries, source, path_map=(), overwrite=False):
+    """Store the details of the entries of another library in the catalog.
+
+    For every matched entry, the details are stored as imported details, and as the movie
+    details unless the movie was already resolved. The title and year are stored as the parse
+    result of movies not parsed yet. Changes are committed every :any:`catalog.BATCH_SIZE`
+    entries.
+
+    Parameters
+    ----------
+    movies_catalog : catalog.Catalog
+        The movies catalog.
+    entries : iterable
+        The entries (e.g. from :any:`read_kodi`).
+    source : str
+        One of the :any:`SOURCES`.
+    path_map : list, optional
+        See :any:`map_path`.
+    overwrite : bool, optional
+        Replace the details of movies already resolved.
+
+    Returns
+    -------
+    dict
+        Amount of entries matched by ``path`` and by ``fingerprint``, ``unmatched`` entries
+        and ``resolved`` movies whose details were replaced or kept.
+    """
+    matcher = Matcher(movies_catalog)
+    unparsed = set(movies_catalog.unparsed())
+    resolved = movies_catalog.resolved()
+    summary = {"path": 0, "fingerprint": 0, "unmatched": 0, "resolved": 0}
+    pending = 0
+
+    for entry in entries:
+        file_name, method = matcher.match(map_path(entry["path"] or "", path_map),
+                                          entry["size"])
+
+        if file_name is None:
+            summary["unmatched"] += 1
+            continue
+
+        summary[method] += 1
+        movies_catalog.set_imported_details(file_name, source, entry["details"])
+
+        if file_name in unparsed:
+            movies_catalog.set_parse_result(file_name, entry["title"], entry["year"], {})
+            unparsed.discard(file_name)
+
+        if file_name in resolved:
+            summary["resolved"] += 1
+
+        if overwrite or file_name not in resolved:
+            movies_catalog.set_metadata(file_name, entry["details"])
+
+        pending += 1
+
+        if pending >= catalog.BATCH_SIZE:
+            movies_catalog.commit()
+            pending = 0
+
+    movies_catalog.commit()
+
+    return summary
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,634 @@
+# -*- coding: utf-8 -*-
+"""Metadata providers.
+
+A metadata provider resolves a movie (as generated by
+:any:`app_utils.generate_movies_base_data_from_file_names`) into movie details in the format of
+an OMDb API response. Providers are combined with a :any:`ProviderChain`.
+
+Attributes
+----------
+AMBIGUITY_MARGIN : float
+    Fuzzy matches whose similarity is within this margin of the best match are considered
+    plausible candidates too.
+DEFAULT_BUDGET : float
+    Default maximum time in seconds that resolving a single movie can take.
+NOT_FOUND : dict
+    Response returned when no provider found a movie.
+"""
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from urllib.parse import quote
+
+from . import imdb_dataset
+from . import lookup_planner
+from .python_utils import exceptions
+
+try:
+    import requests
+except (SystemError, ImportError):
+    raise exceptions.MissingDependencyModule("Module not installed: <requests>")
+
+AMBIGUITY_MARGIN = 0.05
+DEFAULT_BUDGET = 30.0
+NOT_FOUND = {"Response": "False", "Error": "Movie not found!"}
+
+# Suffix of the files of a movie split in several parts (e.g. "Movie cd1.avi").
+_part_re = re.compile(r"[\s._-]*(?:cd|dvd|part|pt|dis[ck])[\s._-]*\d+$", re.IGNORECASE)
+
+
+class LookupTimeout(Exception):
+    """Raised when resolving a movie exceeds the time budget.
+    """
+    pass
+
+
+class AmbiguousMatch(Exception):
+    """Raised when a movie matches several plausible candidates.
+
+    Attributes
+    ----------
+    candidates : list
+        The candidates in the format of OMDb API responses.
+    """
+
+    def __init__(self, candidates):
+        """Initialization.
+
+        Parameters
+        ----------
+        candidates : list
+            The candidates in the format of OMDb API responses.
+        """
+        super().__init__("Ambiguous match: %s" % ", ".join(
+            "%s (%s)" % (c.get("Title"), c.get("Year")) for c in candidates))
+        self.candidates = candidates
+
+
+def pick_fuzzy_match(matches, resolve):
+    """Pick the result of a fuzzy search.
+
+    Parameters
+    ----------
+    matches : list
+        Results of :any:`fuzzy_match.TrigramIndex.search`.
+    resolve : callable
+        Called with the identifier of a match. It should return the match details in the
+        format of an OMDb API response, or None to ignore the match.
+
+    Returns
+    -------
+    dict, None
+        The details of the best match if it's the only plausible one.
+
+    Raises
+    ------
+    AmbiguousMatch
+        If the best match isn't clearly better than other matches of a different movie.
+    """
+    candidates = {}
+    best = None
+
+    for similarity, item_id, title, year in matches:
+        if best is not None and similarity < best - AMBIGUITY_MARGIN:
+            break
+
+        data = resolve(item_id)
+
+        if data is not None:
+            best = similarity if best is None else best
+            candidates.setdefault(data.get("imdbID") or item_id, data)
+
+    if len(candidates) > 1:
+        raise AmbiguousMatch(list(candidates.values()))
+
+    return next(iter(candidates.values()), None)
+
+
+class MetadataProvider():
+    """Metadata provider interface.
+
+    Attributes
+    ----------
+    name : str
+        The provider name used to refer to it in the configuration.
+    """
+    name = ""
+
+    def lookup(self, movie):
+        """Resolve a movie.
+
+        Parameters
+        ----------
+        movie : dict
+            The movie base data.
+
+        Returns
+        -------
+        dict, None
+            The movie details in the format of an OMDb API response, or None if the provider
+            couldn't confidently resolve the movie.
+
+        Raises
+        ------
+        exceptions.MethodNotImplemented
+            See :any:`exceptions.MethodNotImplemented`
+        """
+        raise exceptions.MethodNotImplemented("lookup")
+
+    def close(self):
+        """Release the resources used by the provider.
+        """
+        pass
+
+
+def is_single_movie_folder(file_names, extensions):
+    """Check whether the video files of a folder are a single movie.
+
+    Parameters
+    ----------
+    file_names : list
+        Names of the files in the folder.
+    extensions : tuple
+        Extensions of the movie files.
+
+    Returns
+    -------
+    bool
+        Whether the folder has a single movie file, or the parts of a single movie (e.g.
+        ``Movie cd1.avi`` and ``Movie cd2.avi``). Only then a ``movie.nfo`` file describes it.
+    """
+    movies = set()
+
+    for file_name in file_names:
+        name, ext = os.path.splitext(file_name)
+
+        if ext.lower() in extensions:
+            movies.add(_part_re.sub("", name).lower())
+
+            if len(movies) > 1:
+                return False
+
+    return len(movies) == 1
+
+
+def find_nfo_file(movie_path, extensions, file_names=None):
+    """Find the NFO file describing a movie.
+
+    Parameters
+    ----------
+    movie_path : str
+        Path to the movie file.
+    extensions : tuple
+        Extensions of the movie files.
+    file_names : list, optional
+        Names of the files in the folder of the movie file. The folder is listed if not passed.
+
+    Returns
+    -------
+    str, None
+        Path to the NFO file with the same name as the movie file, or named ``movie.nfo`` if
+        the movie is the only one in its folder (see :any:`is_single_movie_folder`).
+    """
+    nfo_path = os.path.splitext(movie_path)[0] + ".nfo"
+
+    if os.path.isfile(nfo_path):
+        return nfo_path
+
+    folder = os.path.dirname(movie_path)
+    nfo_path = os.path.join(folder, "movie.nfo")
+
+    if not os.path.isfile(nfo_path):
+        return None
+
+    if file_names is None:
+        file_names = os.listdir(folder)
+
+    return nfo_path if is_single_movie_folder(file_names, extensions) else None
+
+
+def parse_nfo(nfo_path):
+    """Parse a Kodi/Jellyfin style movie NFO file.
+
+    Parameters
+    ----------
+    nfo_path : str
+        Path to the NFO file.
+
+    Returns
+    -------
+    dict, None
+        The movie details in the format of an OMDb API response (plus an ``OriginalTitle`` key
+        if the original title is different), or None if the file isn't a movie NFO file.
+    """
+    with open(nfo_path, "r", encoding="utf-8", errors="replace") as file:
+        content = file.read()
+
+    # NFO files can have an URL after the XML document.
+    end = content.find("</movie>")
+
+    try:
+        root = ET.fromstring(content[:end + len("</movie>")] if end >= 0 else content)
+    except ET.ParseError:
+        return None
+
+    if root.tag != "movie" or not root.findtext("title"):
+        return None
+
+    def join(path):
+        values = [e.text.strip() for e in root.findall(path) if e.text and e.text.strip()]
+
+        return ", ".join(values) if values else "N/A"
+
+    imdb_id = root.findtext("uniqueid[@type='imdb']") or root.findtext("imdbid") or \
+        root.findtext("id") or ""
+    rating = root.findtext("ratings/rating[@name='imdb']/value") or root.findtext("rating")
+    year = root.findtext("year") or (root.findtext("premiered") or "")[:4]
+    runtime = root.findtext("runtime")
+    original_title = (root.findtext("originaltitle") or "").strip()
+
+    response = {
+        "Response": "True",
+        "Title": root.findtext("title").strip(),
+        "Year": year or "N/A",
+        "Plot": root.findtext("plot") or root.findtext("outline") or "N/A",
+        "Runtime": "%s min" % runtime if runtime else "N/A",
+        "Genre": join("genre"),
+        "Director": join("director"),
+        "Actors": join("actor/name"),
+        "imdbID": imdb_id if imdb_id.startswith("tt") else "N/A",
+        "imdbRating": rating or "N/A",
+        "Type": "movie",
+    }
+
+    if original_title and original_title != response["Title"]:
+        response["OriginalTitle"] = original_title
+
+    return response
+
+
+class NFOProvider(MetadataProvider):
+    """Resolve movies from the NFO files stored next to them.
+
+    Attributes
+    ----------
+    extensions : tuple
+        Extensions of the movie files. See :any:`find_nfo_file`.
+    """
+    name = "nfo"
+
+    def __init__(self, extensions):
+        """Initialization.
+
+        Parameters
+        ----------
+        extensions : tuple
+            Extensions of the movie files.
+        """
+        self.extensions = extensions
+
+    def lookup(self, movie):
+        """See :any:`MetadataProvider.lookup`.
+
+        Parameters
+        ----------
+        movie : dict
+            See :any:`MetadataProvider.lookup`.
+
+        Returns
+        -------
+        dict, None
+            See :any:`MetadataProvider.lookup`.
+        """
+        movie_path = movie.get("path_to_movie")
+        nfo_path = find_nfo_file(movie_path, self.extensions) if movie_path else None
+
+        return parse_nfo(nfo_path) if nfo_path else None
+
+
+class ImportedProvider(MetadataProvider):
+    """Resolve movies from the details imported from media center libraries (see
+    :any:`media_center_import`).
+
+    Attributes
+    ----------
+    movies_catalog : catalog.Catalog
+        The movies catalog storing the imported details. It's closed with the provider.
+    """
+    name = "imported"
+
+    def __init__(self, movies_catalog):
+        """Initialization.
+
+        Parameters
+        ----------
+        movies_catalog : catalog.Catalog
+            See :any:`ImportedProvider.movies_catalog`.
+        """
+        self.movies_catalog = movies_catalog
+
+    def lookup(self, movie):
+        """See :any:`MetadataProvider.lookup`.
+
+        Parameters
+        ----------
+        movie : dict
+            See :any:`MetadataProvider.lookup`.
+
+        Returns
+        -------
+        dict, None
+            See :any:`MetadataProvider.lookup`.
+        """
+        return self.movies_catalog.imported_details(movie["file_name"])
+
+    def close(self):
+        """See :any:`MetadataProvider.close`.
+        """
+        self.movies_catalog.close()
+
+
+class IMDbIndexProvider(MetadataProvider):
+    """Resolve movies from the local IMDb index (see :any:`imdb_dataset`).
+
+    Attributes
+    ----------
+    imdb_index : imdb_dataset.IMDbIndex
+        The local IMDb index.
+    matcher : fuzzy_match.TrigramIndex
+        Trigram index used to fuzzy match titles. Only items whose identifier is an
+        ``("imdb", tconst)`` tuple are considered.
+    """
+    name = "imdb"
+
+    def __init__(self, imdb_index, matcher=None):
+        """Initialization.
+
+        Parameters
+        ----------
+        imdb_index : imdb_dataset.IMDbIndex
+            The local IMDb index.
+        matcher : fuzzy_match.TrigramIndex, optional
+            Trigram index used to fuzzy match titles.
+        """
+        self.imdb_index = imdb_index
+        self.matcher = matcher
+
+    def lookup(self, movie):
+        """See :any:`MetadataProvider.lookup`.
+
+        The movie is looked up by IMDb ID, then by every lookup generated by
+        :any:`lookup_planner.plan` and finally by fuzzy matching its title.
+
+        Parameters
+        ----------
+        movie : dict
+            See :any:`MetadataProvider.lookup`.
+
+        Returns
+        -------
+        dict, None
+            See :any:`MetadataProvider.lookup`.
+
+        Raises
+        ------
+        AmbiguousMatch
+            See :any:`pick_fuzzy_match`.
+        """
+        title, year = movie.get("title"), movie.get("year")
+
+        if movie.get("imdb_id"):
+            found = self.imdb_index.get(movie["imdb_id"])
+
+            if found is not None:
+                return imdb_dataset.to_omdb_response(found)
+
+        if not title:
+            return None
+
+        for lookup_title, lookup_year in lookup_planner.plan(title, year):
+            found = self.imdb_index.lookup(lookup_title, lookup_year)
+
+            if found is not None and lookup_planner.is_confident(year, found["year"]):
+                return imdb_dataset.to_omdb_response(found)
+
+        if self.matcher is not None:
+            return pick_fuzzy_match(self.matcher.search(title, year), self._resolve_match)
+
+        return None
+
+    def _resolve_match(self, item_id):
+        """Get the details of a fuzzy match.
+
+        Parameters
+        ----------
+        item_id : tuple
+            The match identifier.
+
+        Returns
+        -------
+        dict, None
+            The match details, or None if it isn't a title from the local IMDb index.
+        """
+        source, tconst = item_id
+        found = self.imdb_index.get(tconst) if source == "imdb" else None
+
+        return imdb_dataset.to_omdb_response(found) if found is not None else None
+
+    def close(self):
+        """See :any:`MetadataProvider.close`.
+        """
+        self.imdb_index.close()
+
+
+class JSONHTTPProvider(MetadataProvider):
+    """Resolve movies from a generic JSON HTTP API.
+
+    Attributes
+    ----------
+    fields : dict
+        Maps OMDb response keys to paths in the API response. Paths are keys separated by dots
+        (e.g. ``data.title``). Only the ``Title`` key is mandatory.
+    name : str
+        The provider name.
+    timeout : float
+        Requests timeout in seconds.
+    url : str
+        URL template. The ``{title}``, ``{year}`` and ``{imdb_id}`` placeholders are replaced
+        by the URL encoded movie data.
+    """
+
+    def __init__(self, name, url, fields, timeout=10):
+        """Initialization.
+
+        Parameters
+        ----------
+        name : str
+            The provider name.
+        url : str
+            URL template.
+        fields : dict
+            Maps OMDb response keys to paths in the API response.
+        timeout : float, optional
+            Requests timeout in seconds.
+        """
+        self.name = name
+        self.url = url
+        self.fields = fields
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def lookup(self, movie):
+        """See :any:`MetadataProvider.lookup`.
+
+        Parameters
+        ----------
+        movie : dict
+            See :any:`MetadataProvider.lookup`.
+
+        Returns
+        -------
+        dict, None
+            See :any:`MetadataProvider.lookup`.
+        """
+        url = self.url.format(title=quote(str(movie.get("title") or "")),
+                              year=quote(str(movie.get("year") or "")),
+                              imdb_id=quote(str(movie.get("imdb_id") or "")))
+        response = self._session.get(url, timeout=self.timeout)
+
+        if response.status_code == 404:
+            return None
+
+        response.raise_for_status()
+        data = response.json()
+        result = {"Response": "True", "Type": "movie"}
+
+        for key, path in self.fields.items():
+            value = data
+
+            for part in path.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+
+            result[key] = ", ".join(map(str, value)) if isinstance(value, list) else \
+                str(value) if value is not None else "N/A"
+
+        if result.get("Title", "N/A") == "N/A" or \
+                not lookup_planner.is_confident(movie.get("year"), result.get("Year")):
+            return None
+
+        return result
+
+    def close(self):
+        """See :any:`MetadataProvider.close`.
+        """
+        self._session.close()
+
+
+class ProviderChain():
+    """Resolve movies through several providers.
+
+    Attributes
+    ----------
+    budget : float
+        Maximum time in seconds that resolving a single movie can take.
+    mode : str
+        ``ordered`` to query the providers one after the other, or ``race`` to query all of them
+        concurrently. In both cases, the first confident result wins.
+    providers : list
+        The providers, in order of preference.
+    """
+
+    def __init__(self, providers, mode="ordered", budget=DEFAULT_BUDGET, max_workers=32):
+        """Initialization.
+
+        Parameters
+        ----------
+        providers : list
+            The providers, in order of preference.
+        mode : str, optional
+            See :any:`ProviderChain.mode`.
+        budget : float, optional
+            See :any:`ProviderChain.budget`.
+        max_workers : int, optional
+            Maximum amount of provider queries running concurrently.
+        """
+        self.providers = providers
+        self.mode = mode
+        self.budget = budget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def lookup(self, movie):
+        """Resolve a movie.
+
+        Parameters
+        ----------
+        movie : dict
+            The movie base data.
+
+        Returns
+        -------
+        dict
+            The movie details, or :any:`NOT_FOUND` if no provider found the movie.
+
+        Raises
+        ------
+        Exception
+            If no provider found the movie and any of them failed, the first error is raised
+            (e.g. :any:`quota_scheduler.QuotaExhausted` or :any:`LookupTimeout`), so the
+            lookup can be retried later.
+        """
+        deadline = time.monotonic() + self.budget
+        errors = []
+        pending = [self._executor.submit(p.lookup, movie)
+                   for p in (self.providers if self.mode == "race" else self.providers[:1])]
+        next_provider = len(pending)
+
+        while pending:
+            done, not_done = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                  return_when=FIRST_COMPLETED)
+
+            if not done:
+                errors.append(LookupTimeout("Lookup budget of %ss exceeded." % self.budget))
+                break
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as err:
+                    errors.append(err)
+                    continue
+
+                if result is not None and result.get("Response") == "True":
+                    for other in not_done:
+                        other.cancel()
+
+                    return result
+
+            pending = list(not_done)
+
+            if not pending and next_provider < len(self.providers):
+                pending.append(self._executor.submit(self.providers[next_provider].lookup,
+                                                     movie))
+                next_provider += 1
+
+        if errors:
+            raise errors[0]
+
+        return NOT_FOUND
+
+    def close(self):
+        """Release the resources used by the providers.
+        """
+        self._executor.shutdown(wait=False)
+
+        for provider in self.providers:
+            provider.close()
+
+
+if __name__ == "__main__":
+    pass
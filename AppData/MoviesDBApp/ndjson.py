@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Streaming reader and writer of newline-delimited JSON data files.
+
+Every record is stored as a line of JSON, so files are written and read one record at a time
+and memory usage doesn't depend on the amount of records. Files can be compressed with gzip or
+LZMA. The compression is identified by the file extension.
+
+Attributes
+----------
+COMPRESSIONS : dict
+    Maps supported compression names to the extension appended to compressed files.
+"""
+import gzip
+import json
+import lzma
+import os
+
+COMPRESSIONS = {
+    "none": "",
+    "gzip": ".gz",
+    "lzma": ".xz",
+}
+
+
+def _open(path, mode):
+    """Open a data file in text mode.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+    mode : str
+        ``r`` or ``w``.
+
+    Returns
+    -------
+    file object
+        The opened file.
+    """
+    if path.endswith(COMPRESSIONS["gzip"]):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+
+    if path.endswith(COMPRESSIONS["lzma"]):
+        return lzma.open(path, mode + "t", encoding="utf-8")
+
+    return open(path, mode, encoding="utf-8")
+
+
+def find(base_path):
+    """Find a data file whatever its compression is.
+
+    Parameters
+    ----------
+    base_path : str
+        Path to the uncompressed file.
+
+    Returns
+    -------
+    str, None
+        Path to the existing file, or None if there is none.
+    """
+    for ext in COMPRESSIONS.values():
+        if os.path.isfile(base_path + ext):
+            return base_path + ext
+
+    return None
+
+
+def write(base_path, records, compression="none"):
+    """Write a data file.
+
+    The file is replaced atomically and files with the same name and a different compression
+    are removed, so there is always a single version of the data.
+
+    Parameters
+    ----------
+    base_path : str
+        Path to the uncompressed file.
+    records : iterable
+        The records to write.
+    compression : str, optional
+        One of the :any:`COMPRESSIONS`.
+
+    Returns
+    -------
+    int
+        The amount of written records.
+
+    Raises
+    ------
+    ValueError
+        If the compression isn't supported.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError("Unsupported compression: %s" % compression)
+
+    path = base_path + COMPRESSIONS[compression]
+    # The extension is kept so the temporary file is opened with the same compression.
+    tmp_path = base_path + ".tmp" + COMPRESSIONS[compression]
+    count = 0
+
+    with _open(tmp_path, "w") as out:
+        for record in records:
+            out.write(json.dumps(record))
+            out.write("\n")
+            count += 1
+
+    os.replace(tmp_path, path)
+
+    for ext in COMPRESSIONS.values():
+        if base_path + ext != path and os.path.isfile(base_path + ext):
+            os.remove(base_path + ext)
+
+    return count
+
+
+def read(base_path):
+    """Read a data file.
+
+    Parameters
+    ----------
+    base_path : str
+        Path to the uncompressed file. The file is found whatever its compression is.
+
+    Yields
+    ------
+    object
+        A stored record. Nothing is yielded if the file doesn't exist.
+    """
+    path = find(base_path)
+
+    if path is None:
+        return
+
+    with _open(path, "r") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+if __name__ == "__main__":
+    pass
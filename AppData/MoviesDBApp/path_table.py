@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""Prefix-compressed storage of file paths.
+
+Movie libraries are made of many files stored in few directories, usually deep inside the same
+few root folders. Paths are split into their directory (including the trailing separator) and
+their base name, so every directory is stored once and referred to by an integer ID.
+
+In the data files, the directories are front-coded: the first record of every directory
+defines it as a ``[id, shared, suffix]`` list, where ``shared`` is the length of the prefix it
+shares with the previously defined directory and ``suffix`` is the rest of it. The following
+records of the same directory only store its ID. Movie files are named after the movie file
+name, so base names made of the ``file_name`` of the record and an extension are stored as an
+``extension`` field. For example::
+
+    {"directory": [0, 0, "/mnt/nas/movies/A/"], "extension": ".mkv", "file_name": "Alien", ...}
+    {"directory": 0, "extension": ".mkv", "file_name": "Aliens", ...}
+    {"directory": [1, 16, "B/"], "basename": "brazil.1985.mkv", "file_name": "Brazil", ...}
+
+Files are written and read in a single pass, so paths are encoded and decoded as the records
+are streamed.
+"""
+import os
+
+
+def split(path):
+    """Split a path into its directory and its base name.
+
+    Parameters
+    ----------
+    path : str
+        A file path.
+
+    Returns
+    -------
+    tuple
+        The directory, including the trailing separator, and the base name. The path is the
+        concatenation of both.
+    """
+    pos = path.rfind(os.sep) + 1
+
+    return path[:pos], path[pos:]
+
+
+def components(directory):
+    """Split a directory into the names of the directories leading to it.
+
+    Parameters
+    ----------
+    directory : str
+        A directory, including the trailing separator.
+
+    Returns
+    -------
+    list
+        The directory names, including their trailing separator (the root directory is the
+        separator alone). The directory is the concatenation of all of them.
+    """
+    return [name + os.sep for name in directory.split(os.sep)[:-1]]
+
+
+def extension(basename, file_name):
+    """Get the extension of a base name made of a file name and an extension.
+
+    Parameters
+    ----------
+    basename : str
+        The base name.
+    file_name : str, None
+        The file name without extension.
+
+    Returns
+    -------
+    str, None
+        The extension, or None if the base name isn't made of the file name and an extension.
+    """
+    if file_name and basename.startswith(file_name):
+        ext = basename[len(file_name):]
+
+        if ext == os.path.splitext(basename)[1]:
+            return ext
+
+    return None
+
+
+def movie_folder_parent(directory, file_name):
+    """Get the parent of a directory named after a movie file name.
+
+    Libraries are often organized with a folder per movie, named like the movie file.
+
+    Parameters
+    ----------
+    directory : str
+        A directory, including the trailing separator.
+    file_name : str, None
+        The movie file name without extension.
+
+    Returns
+    -------
+    str, None
+        The parent directory, including the trailing separator, or None if the directory
+        isn't named after the file name.
+    """
+    if file_name and directory.endswith(os.sep + file_name + os.sep):
+        return directory[:-len(file_name) - 1]
+
+    return None
+
+
+class FrontCoder():
+    """Encode the paths of a data file.
+    """
+
+    def __init__(self):
+        """Initialization.
+        """
+        self._ids = {}
+        self._previous = ""
+
+    def encode(self, path):
+        """Encode a path.
+
+        Parameters
+        ----------
+        path : str
+            A file path.
+
+        Returns
+        -------
+        tuple
+            The directory reference (its ID, or its definition if it wasn't defined yet) and
+            the base name.
+        """
+        directory, basename = split(path)
+        directory_id = self._ids.get(directory)
+
+        if directory_id is not None:
+            return directory_id, basename
+
+        directory_id = self._ids[directory] = len(self._ids)
+        shared = len(os.path.commonprefix([self._previous, directory]))
+        self._previous = directory
+
+        return [directory_id, shared, directory[shared:]], basename
+
+    def encode_record(self, record, key):
+        """Encode the path of a record.
+
+        Parameters
+        ----------
+        record : dict
+            The record.
+        key : str
+            The record field with the path. It's replaced by a ``directory`` field and a
+            ``basename`` or ``extension`` field.
+
+        Returns
+        -------
+        dict
+            A copy of the record with its path encoded. Records without path are only copied.
+        """
+        record = dict(record)
+
+        if record.get(key):
+            record["directory"], basename = self.encode(record.pop(key))
+            ext = extension(basename, record.get("file_name"))
+
+            if ext is None:
+                record["basename"] = basename
+            else:
+                record["extension"] = ext
+
+        return record
+
+
+class FrontDecoder():
+    """Decode the paths of a data file written by a :any:`FrontCoder`.
+    """
+
+    def __init__(self):
+        """Initialization.
+        """
+        self._directories = []
+
+    def decode(self, directory, basename):
+        """Decode a path.
+
+        Parameters
+        ----------
+        directory : int, list
+            The directory reference.
+        basename : str
+            The base name.
+
+        Returns
+        -------
+        str
+            The file path.
+        """
+        if isinstance(directory, list):
+            directory_id, shared, suffix = directory
+            previous = self._directories[-1] if self._directories else ""
+            self._directories.append(previous[:shared] + suffix)
+
+            return self._directories[directory_id] + basename
+
+        return self._directories[directory] + basename
+
+    def decode_record(self, record, key):
+        """Decode the path of a record.
+
+        Parameters
+        ----------
+        record : dict
+            The record. It's modified in place.
+        key : str
+            The record field where the path is restored.
+
+        Returns
+        -------
+        dict
+            The record. Records without ``directory`` field are returned as they are.
+        """
+        if "directory" in record:
+            basename = record.pop("basename") if "basename" in record else \
+                record["file_name"] + record.pop("extension")
+            record[key] = self.decode(record.pop("directory"), basename)
+
+        return record
+
+
+if __name__ == "__main__":
+    pass
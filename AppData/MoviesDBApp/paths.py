@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""Location of the application folders.
+
+This module only depends on the standard library, so the web application can import it as a
+top-level module.
+
+Attributes
+----------
+ROOT_FOLDER : str
+    The main folder of the application, containing the ``AppData`` and ``UserData`` folders.
+    It's resolved from the location of this module, so it doesn't depend on the working
+    directory (e.g. the web server runs from the ``www`` folder).
+"""
+import os
+
+ROOT_FOLDER = os.path.realpath(os.path.abspath(os.path.join(
+    os.path.normpath(os.path.dirname(__file__)), os.pardir, os.pardir)))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""Local cache of movie posters.
+
+Posters are stored content-addressed (named after the SHA-256 hash of their content), so the
+same image referenced by several movies is only stored once.
+
+Attributes
+----------
+MAX_WORKERS : int
+    Maximum amount of concurrent downloads. The actual amount is adjusted on the fly by an
+    :any:`concurrency.AIMDController`.
+REVALIDATE_AFTER : int
+    Time in seconds after which a cached poster is revalidated against the server.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+
+from . import concurrency
+from .python_utils import exceptions
+from .python_utils.tqdm import tqdm
+
+try:
+    import requests
+except (SystemError, ImportError):
+    raise exceptions.MissingDependencyModule("Module not installed: <requests>")
+
+MAX_WORKERS = 8
+REVALIDATE_AFTER = 60 * 60 * 24 * 30
+
+_content_types = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+
+
+class PosterCache():
+    """Download movie posters into a local folder.
+
+    An ``index.json`` file stored in the posters folder maps every IMDb ID to its poster
+    (``file`` key, relative to the posters folder) and the data used to revalidate it.
+
+    Attributes
+    ----------
+    dest_dir : str
+        Path to the folder where posters are stored.
+    index_path : str
+        Path to the index file.
+    """
+
+    def __init__(self, dest_dir, max_workers=MAX_WORKERS):
+        """Initialization.
+
+        Parameters
+        ----------
+        dest_dir : str
+            Path to the folder where posters are stored.
+        max_workers : int, optional
+            See :any:`MAX_WORKERS`.
+        """
+        self.dest_dir = dest_dir
+        self.index_path = os.path.join(dest_dir, "index.json")
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._controller = concurrency.AIMDController(initial=2, max_limit=max_workers)
+        self._session = requests.Session()
+        # One pooled connection per worker so connections are reused.
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers,
+                                                pool_maxsize=max_workers)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._index = {}
+
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, "r") as file:
+                self._index = json.loads(file.read())
+
+    def get(self, imdb_id):
+        """Get the file name of a cached poster.
+
+        Parameters
+        ----------
+        imdb_id : str
+            A movie IMDb ID.
+
+        Returns
+        -------
+        str, None
+            The poster file name (relative to the posters folder).
+        """
+        entry = self._index.get(imdb_id)
+
+        return entry["file"] if entry else None
+
+    def _needs_download(self, imdb_id, url):
+        """Check whether a poster has to be downloaded or revalidated.
+
+        Parameters
+        ----------
+        imdb_id : str
+            A movie IMDb ID.
+        url : str
+            The poster URL.
+
+        Returns
+        -------
+        bool
+            Whether the poster isn't cached, its URL changed or it's time to revalidate it.
+        """
+        entry = self._index.get(imdb_id)
+
+        return entry is None or entry["url"] != url or \
+            not os.path.isfile(os.path.join(self.dest_dir, entry["file"])) or \
+            time.time() - entry["checked_at"] > REVALIDATE_AFTER
+
+    def _download(self, imdb_id, url):
+        """Download (or revalidate) a poster.
+
+        Parameters
+        ----------
+        imdb_id : str
+            A movie IMDb ID.
+        url : str
+            The poster URL.
+
+        Returns
+        -------
+        bool
+            Whether the poster content was downloaded (False if it was still valid).
+        """
+        entry = self._index.get(imdb_id)
+        headers = {}
+
+        if entry is not None and entry["url"] == url and \
+                os.path.isfile(os.path.join(self.dest_dir, entry["file"])):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        with self._controller.slot() as slot:
+            response = self._session.get(url, headers=headers, timeout=30)
+
+            if response.status_code == 429 or response.status_code >= 500:
+                slot.fail()
+
+        if response.status_code == 304:
+            with self._lock:
+                entry["checked_at"] = time.time()
+
+            return False
+
+        response.raise_for_status()
+        content = response.content
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        ext = _content_types.get(content_type) or os.path.splitext(url)[1] or ".jpg"
+        file_name = hashlib.sha256(content).hexdigest() + ext
+        file_path = os.path.join(self.dest_dir, file_name)
+
+        if not os.path.isfile(file_path):
+            tmp_path = file_path + ".%d.tmp" % threading.get_ident()
+
+            with open(tmp_path, "wb") as out:
+                out.write(content)
+
+            os.replace(tmp_path, file_path)
+
+        with self._lock:
+            self._index[imdb_id] = {
+                "url": url,
+                "file": file_name,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "checked_at": time.time(),
+            }
+
+        return True
+
+    def update(self, posters, logger):
+        """Download the posters that aren't cached and revalidate the stale ones.
+
+        Parameters
+        ----------
+        posters : dict
+            Maps IMDb IDs to poster URLs.
+        logger : LogSystem
+            The logger.
+        """
+        os.makedirs(self.dest_dir, exist_ok=True)
+        pending = {imdb_id: url for imdb_id, url in posters.items()
+                   if self._needs_download(imdb_id, url)}
+        downloaded = 0
+        errors = []
+
+        logger.info("Posters already cached: %d" % (len(posters) - len(pending)))
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = {executor.submit(self._download, imdb_id, url): imdb_id
+                       for imdb_id, url in pending.items()}
+
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                try:
+                    downloaded += future.result()
+                except Exception as err:
+                    errors.append("%s: %s" % (futures[future], err))
+
+        self.save()
+        logger.info("Posters downloaded: %d, revalidated: %d" %
+                    (downloaded, len(pending) - downloaded - len(errors)))
+        logger.info("Posters %s" % self._controller.summary())
+
+        if errors:
+            logger.error("Errors found while downloading posters.")
+            logger.error("\n".join(errors), term=False, date=True)
+
+    def save(self):
+        """Store the index.
+        """
+        tmp_path = self.index_path + ".tmp"
+
+        with self._lock:
+            with open(tmp_path, "w") as out:
+                json.dump(self._index, out)
+
+        os.replace(tmp_path, self.index_path)
+
+
+if __name__ == "__main__":
+    pass
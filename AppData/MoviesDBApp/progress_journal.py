@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Write-ahead journal used to resume interrupted long running tasks.
+
+Attributes
+----------
+SYNC_EVERY : int
+    Amount of appended records after which the journal is synced to disk.
+"""
+import json
+import os
+import threading
+
+SYNC_EVERY = 100
+
+
+class ProgressJournal():
+    """Append-only journal of completed work.
+
+    Every record is stored as a line of JSON as soon as it's appended, so the work done
+    survives interruptions. A record whose line was truncated (e.g. due to a crash while it was
+    being written) is ignored when the journal is loaded.
+
+    Attributes
+    ----------
+    path : str
+        Path to the journal file.
+    """
+
+    def __init__(self, path):
+        """Initialization.
+
+        Parameters
+        ----------
+        path : str
+            Path to the journal file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0
+
+    def load(self, key):
+        """Load the keys of the records stored by a previous run.
+
+        Parameters
+        ----------
+        key : str
+            The name of the record field that identifies a record.
+
+        Returns
+        -------
+        set
+            The identifiers of the stored records.
+        """
+        return {record[key] for record in self}
+
+    def __iter__(self):
+        """Iterate over the stored records.
+
+        Yields
+        ------
+        dict
+            A stored record.
+        """
+        if not os.path.isfile(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def append(self, record):
+        """Store a record.
+
+        Parameters
+        ----------
+        record : dict
+            The record to store.
+        """
+        line = json.dumps(record) + "\n"
+
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                truncated = False
+
+                # Don't glue the new records to a line truncated by a previous crash.
+                if os.path.isfile(self.path) and os.path.getsize(self.path):
+                    with open(self.path, "rb") as file:
+                        file.seek(-1, os.SEEK_END)
+                        truncated = file.read(1) != b"\n"
+
+                self._file = open(self.path, "a", encoding="utf-8")
+
+                if truncated:
+                    self._file.write("\n")
+
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+
+            if self._pending >= SYNC_EVERY:
+                os.fsync(self._file.fileno())
+                self._pending = 0
+
+    def close(self):
+        """Sync and close the journal file.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+                self._pending = 0
+
+
+if __name__ == "__main__":
+    pass
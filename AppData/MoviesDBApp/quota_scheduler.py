@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""Quota-aware scheduling of metadata API requests.
+
+Attributes
+----------
+DEFAULT_DAILY_LIMIT : int
+    Amount of requests allowed per day by a free OMDb API key.
+THROTTLE_STATUS_CODES : tuple
+    HTTP status codes that trigger a backoff instead of a failure.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+from datetime import datetime
+from datetime import timezone
+
+from . import file_lock
+
+DEFAULT_DAILY_LIMIT = 1000
+THROTTLE_STATUS_CODES = (401, 429, 503)
+
+
+class QuotaExhausted(Exception):
+    """Raised when the daily requests budget has been spent.
+    """
+    pass
+
+
+def _today():
+    """Get the current UTC date.
+
+    Returns
+    -------
+    str
+        The current UTC date in ISO format.
+    """
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+class QuotaTracker():
+    """Track the daily requests budget across runs.
+
+    The state is stored in a JSON file and it is reset on every new (UTC) day. Several
+    processes (e.g. a detailed data generation and the web application) can share the same
+    state file: the requests spent by each one are added to the stored state when it's saved.
+
+    Items looked up without being resolved are remembered (see :any:`prioritize`). Items are
+    forgotten once they are resolved, so only the unresolved ones are stored.
+
+    Attributes
+    ----------
+    attempted : set
+        Identifiers of the items looked up without being resolved.
+    daily_limit : int
+        Amount of requests allowed per day.
+    reserve : int
+        Amount of requests that are never spent by unattended runs.
+    state_path : str
+        Path to the JSON file storing the state.
+    """
+
+    def __init__(self, state_path, daily_limit=DEFAULT_DAILY_LIMIT, reserve=0):
+        """Initialization.
+
+        Parameters
+        ----------
+        state_path : str
+            Path to the JSON file storing the state.
+        daily_limit : int, optional
+            Amount of requests allowed per day.
+        reserve : int, optional
+            Amount of requests that are never spent by unattended runs.
+        """
+        self.state_path = state_path
+        self.daily_limit = daily_limit
+        self.reserve = reserve
+        self._lock = threading.Lock()
+        # Changes since the state was last saved: spent requests, attempted and resolved items.
+        self._spent = 0
+        self._attempted = set()
+        self._resolved = set()
+        self._state = self._read()
+        self.attempted = set(self._state["attempted"])
+        self._roll_over()
+
+    def _read(self):
+        """Read the stored state.
+
+        Returns
+        -------
+        dict
+            The state.
+        """
+        state = {
+            "date": _today(),
+            "used": 0,
+            "exhausted": False,
+            "attempted": []
+        }
+
+        if os.path.isfile(self.state_path):
+            with open(self.state_path, "r") as file:
+                state.update(json.loads(file.read()))
+
+        return state
+
+    def _roll_over(self):
+        """Reset the spent budget if the day changed.
+        """
+        today = _today()
+
+        if self._state["date"] != today:
+            self._state.update(date=today, used=0, exhausted=False)
+            self._spent = 0
+
+    @property
+    def used(self):
+        """Requests spent today.
+
+        Returns
+        -------
+        int
+            Amount of requests spent today.
+        """
+        return self._state["used"]
+
+    @property
+    def remaining(self):
+        """Requests left for today.
+
+        Returns
+        -------
+        int
+            Amount of requests left for today.
+        """
+        with self._lock:
+            self._roll_over()
+
+            if self._state["exhausted"]:
+                return 0
+
+            return max(0, self.daily_limit - self.reserve - self._state["used"])
+
+    def acquire(self):
+        """Spend one request from the budget.
+
+        Raises
+        ------
+        QuotaExhausted
+            If there is no budget left for today.
+        """
+        with self._lock:
+            self._roll_over()
+
+            if self._state["exhausted"] or \
+                    self._state["used"] >= self.daily_limit - self.reserve:
+                raise QuotaExhausted("Daily requests quota exhausted.")
+
+            self._state["used"] += 1
+            self._spent += 1
+
+    def mark_exhausted(self):
+        """Flag the budget as spent.
+
+        Used when the API reports that the quota was reached even if the local count says
+        otherwise (e.g. the API key was also used by another application).
+        """
+        with self._lock:
+            self._state["exhausted"] = True
+
+    def mark_attempted(self, item_id):
+        """Remember that an item was looked up without being resolved.
+
+        Parameters
+        ----------
+        item_id : str
+            An item identifier.
+        """
+        with self._lock:
+            self.attempted.add(item_id)
+            self._attempted.add(item_id)
+            self._resolved.discard(item_id)
+
+    def mark_resolved(self, item_id):
+        """Forget an item once it's resolved.
+
+        Parameters
+        ----------
+        item_id : str
+            An item identifier.
+        """
+        with self._lock:
+            self.attempted.discard(item_id)
+            self._attempted.discard(item_id)
+            self._resolved.add(item_id)
+
+    def save(self):
+        """Store the state.
+
+        The state is merged with the state stored by other processes since it was read.
+        """
+        with self._lock, file_lock.locked(self.state_path):
+            self._roll_over()
+            stored = self._read()
+
+            if stored["date"] == self._state["date"]:
+                self._state.update(used=stored["used"] + self._spent,
+                                   exhausted=stored["exhausted"] or self._state["exhausted"])
+
+            self.attempted = (set(stored["attempted"]) | self._attempted) - self._resolved
+            self._state["attempted"] = sorted(self.attempted)
+            self._spent = 0
+            self._attempted, self._resolved = set(), set()
+            tmp_path = self.state_path + ".tmp"
+
+            with open(tmp_path, "w") as out:
+                json.dump(self._state, out)
+
+            os.replace(tmp_path, self.state_path)
+
+
+def prioritize(movies, attempted):
+    """Sort movies so the most valuable lookups are performed first.
+
+    Movies that were never looked up come first, then movies with a known year. The original
+    order is kept otherwise.
+
+    Parameters
+    ----------
+    movies : list
+        Movies base data as generated by
+        :any:`app_utils.generate_movies_base_data_from_file_names`.
+    attempted : set
+        File names of the movies that previous runs looked up without resolving them.
+
+    Returns
+    -------
+    list
+        The sorted movies.
+    """
+    return sorted(movies, key=lambda m: (m["file_name"] in attempted, not m.get("year")))
+
+
+class AdaptiveBackoff():
+    """Adaptive backoff shared by concurrent workers.
+
+    Every throttled response doubles the delay (or uses the server provided one if longer)
+    and pauses all workers sharing the instance. Every successful response halves it.
+
+    Attributes
+    ----------
+    base_delay : float
+        Initial delay in seconds.
+    delay : float
+        Current delay in seconds.
+    max_attempts : int
+        Maximum amount of consecutive attempts for a single request.
+    max_delay : float
+        Maximum delay in seconds.
+    """
+
+    def __init__(self, base_delay=1.0, max_delay=300.0, max_attempts=8):
+        """Initialization.
+
+        Parameters
+        ----------
+        base_delay : float, optional
+            Initial delay in seconds.
+        max_delay : float, optional
+            Maximum delay in seconds.
+        max_attempts : int, optional
+            Maximum amount of consecutive attempts for a single request.
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.delay = 0.0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Sleep until the current pause (if any) is over.
+        """
+        with self._lock:
+            pause = self._resume_at - time.monotonic()
+
+        if pause > 0:
+            time.sleep(pause)
+
+    def failure(self, retry_after=None):
+        """Register a throttled response.
+
+        Parameters
+        ----------
+        retry_after : float, optional
+            Delay in seconds requested by the server.
+        """
+        with self._lock:
+            self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+
+            if retry_after:
+                self.delay = min(self.max_delay, max(self.delay, retry_after))
+
+            # Jitter avoids all workers hitting the server at once when resuming.
+            self._resume_at = max(self._resume_at,
+                                  time.monotonic() + self.delay * random.uniform(1.0, 1.25))
+
+    def success(self):
+        """Register a successful response.
+        """
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > self.base_delay else 0.0
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""Compact in-memory representation of the movies base data.
+
+Libraries with hundreds of thousands of movies are held in memory by several pipeline stages
+and by the web application, so a dictionary per movie is avoided. A :any:`MovieRecord` stores
+its fields in slots, and the fields with few distinct values (see :any:`CATEGORICAL_FIELDS`) are
+stored as small integer codes of a shared :any:`Vocabulary`. Paths are stored as the code of
+their directory in the :any:`directories` vocabulary and their base name (see
+:any:`path_table`). Base names made of the movie file name and an extension are stored as the
+code of the extension in the :any:`extensions` vocabulary, and directories named after the movie
+file name are stored as their parent directory.
+
+Records are read-only mappings, so they are used like the dictionaries they replace (e.g.
+``movie["file_name"]``, ``movie.get("year")`` or ``dict(movie, details=details)``). Missing
+values are None.
+
+Attributes
+----------
+CATEGORICAL_FIELDS : tuple
+    Fields stored as codes of a :any:`Vocabulary`.
+directories : Vocabulary
+    Directories of the movie files, including the trailing separator.
+extensions : Vocabulary
+    Extensions of the movie files.
+FIELDS : tuple
+    Fields of the movies base data, in the order they are serialized.
+vocabularies : dict
+    Maps each of the :any:`CATEGORICAL_FIELDS` to its :any:`Vocabulary`.
+"""
+import os
+import threading
+
+from collections.abc import Mapping
+
+from . import path_table
+
+CATEGORICAL_FIELDS = ("format", "screen_size", "video_codec", "release_group", "type")
+FIELDS = ("path_to_movie", "file_name", "title", "year", "cd", "format", "screen_size",
+          "video_codec", "release_group", "type", "imdb_id")
+
+
+class Vocabulary():
+    """Assign small integer codes to repeated values.
+
+    The code 0 is reserved for None.
+
+    Attributes
+    ----------
+    values : list
+        The known values, indexed by their code.
+    """
+
+    def __init__(self):
+        """Initialization.
+        """
+        self.values = [None]
+        self._codes = {None: 0}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Amount of known values.
+
+        Returns
+        -------
+        int
+            Amount of known values, including None.
+        """
+        return len(self.values)
+
+    def encode(self, value):
+        """Get the code of a value, assigning a new one to unknown values.
+
+        Parameters
+        ----------
+        value : object
+            The value. Lists (some values guessed from file names are lists) are stored as
+            tuples.
+
+        Returns
+        -------
+        int
+            The value code.
+        """
+        if isinstance(value, list):
+            value = tuple(value)
+
+        code = self._codes.get(value)
+
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+
+                if code is None:
+                    code = self._codes[value] = len(self.values)
+                    self.values.append(value)
+
+        return code
+
+    def decode(self, code):
+        """Get the value of a code.
+
+        Parameters
+        ----------
+        code : int
+            The value code.
+
+        Returns
+        -------
+        object
+            The value.
+        """
+        return self.values[code]
+
+
+vocabularies = {field: Vocabulary() for field in CATEGORICAL_FIELDS}
+directories = Vocabulary()
+extensions = Vocabulary()
+
+_fields = frozenset(FIELDS)
+
+
+class MovieRecord(Mapping):
+    """Movie base data.
+
+    The values of the :any:`CATEGORICAL_FIELDS` are stored as codes, so they are decoded when
+    read as mapping items. Use the attributes to read the codes. The ``path_to_movie`` item is
+    stored in the ``directory`` (a code of :any:`directories`) and ``basename`` attributes, or
+    in the ``directory`` and ``extension`` (a code of :any:`extensions`) attributes if the base
+    name is the file name plus the extension. If the movie is in a folder named like the file,
+    ``directory`` is the parent of that folder and ``in_folder`` is True.
+    """
+    __slots__ = FIELDS[1:] + ("directory", "in_folder", "basename", "extension")
+
+    def __init__(self, **fields):
+        """Initialization.
+
+        Parameters
+        ----------
+        **fields
+            The movie base data. Unknown fields are ignored. Missing fields and fields set to
+            0 or an empty string (the missing value of the data generated by previous versions
+            of the application) are stored as None.
+        """
+        path = fields.get("path_to_movie") or None
+        directory, basename = path_table.split(path) if path else (None, None)
+        ext = path_table.extension(basename, fields.get("file_name")) if path else None
+        parent = path_table.movie_folder_parent(directory, fields.get("file_name")) \
+            if ext is not None else None
+        stored_directory = directory if parent is None else parent
+        object.__setattr__(self, "directory", directories.encode(stored_directory))
+        object.__setattr__(self, "in_folder", parent is not None)
+        object.__setattr__(self, "basename", basename if ext is None else None)
+        object.__setattr__(self, "extension", extensions.encode(ext))
+
+        for field in FIELDS[1:]:
+            value = fields.get(field)
+
+            if value == 0 or value == "":
+                value = None
+
+            if field in vocabularies:
+                value = vocabularies[field].encode(value)
+
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        """Records are read-only.
+
+        Parameters
+        ----------
+        name : str
+            Attribute name.
+        value : object
+            Attribute value.
+
+        Raises
+        ------
+        AttributeError
+            Always.
+        """
+        raise AttributeError("MovieRecord is read-only.")
+
+    def __getitem__(self, key):
+        """Get a field value.
+
+        Parameters
+        ----------
+        key : str
+            The field name.
+
+        Returns
+        -------
+        object
+            The field value.
+
+        Raises
+        ------
+        KeyError
+            If the key isn't one of the :any:`FIELDS`.
+        """
+        if key not in _fields:
+            raise KeyError(key)
+
+        if key == "path_to_movie":
+            if self.basename:
+                return directories.decode(self.directory) + self.basename
+
+            if not self.extension:
+                return None
+
+            folder = self.file_name + os.sep if self.in_folder else ""
+
+            return directories.decode(self.directory) + folder + self.file_name + \
+                extensions.decode(self.extension)
+
+        value = object.__getattribute__(self, key)
+
+        return vocabularies[key].decode(value) if key in vocabularies else value
+
+    def __iter__(self):
+        """Iterate over the field names.
+
+        Returns
+        -------
+        iterator
+            The :any:`FIELDS`.
+        """
+        return iter(FIELDS)
+
+    def __len__(self):
+        """Amount of fields.
+
+        Returns
+        -------
+        int
+            Amount of fields.
+        """
+        return len(FIELDS)
+
+    def __repr__(self):
+        """Representation of the record.
+
+        Returns
+        -------
+        str
+            The record representation.
+        """
+        return "MovieRecord(%r)" % self.to_dict()
+
+    def __reduce__(self):
+        """Support pickling (e.g. to pass records to other processes).
+
+        Returns
+        -------
+        tuple
+            The data needed to recreate the record.
+        """
+        return (_from_dict, (self.to_dict(),))
+
+    def to_dict(self):
+        """Convert the record into a dictionary (e.g. to serialize it).
+
+        Returns
+        -------
+        dict
+            The movie base data.
+        """
+        return {field: self[field] for field in FIELDS}
+
+
+def _from_dict(data):
+    """Create a record from a dictionary.
+
+    Parameters
+    ----------
+    data : dict
+        The movie base data.
+
+    Returns
+    -------
+    MovieRecord
+        The record.
+    """
+    return MovieRecord(**data)
+
+
+if __name__ == "__main__":
+    pass
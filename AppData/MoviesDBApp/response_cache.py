@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""Persistent cache for metadata API responses.
+
+Attributes
+----------
+CACHE_HIT : int
+    Status returned by :any:`ResponseCache.get` when a valid response is stored.
+CACHE_MISS : int
+    Status returned by :any:`ResponseCache.get` when a request has to be performed.
+CACHE_NOT_FOUND : int
+    Status returned by :any:`ResponseCache.get` when the lookup is known to fail and it isn't
+    time yet to retry it.
+DEFAULT_MAX_ENTRIES : int
+    Maximum amount of entries stored in the cache before the least recently used are evicted.
+DEFAULT_TTL : int
+    Time in seconds that a successful response is considered valid.
+NOT_FOUND_RETRY_SCHEDULE : tuple
+    Time in seconds to wait before retrying a lookup that wasn't found. Each consecutive miss
+    moves one step further on the schedule; the last step is used from then on.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from . import title_keys
+
+CACHE_MISS = 0
+CACHE_HIT = 1
+CACHE_NOT_FOUND = 2
+
+_day = 60 * 60 * 24
+
+DEFAULT_TTL = 30 * _day
+DEFAULT_MAX_ENTRIES = 100000
+NOT_FOUND_RETRY_SCHEDULE = (1 * _day, 3 * _day, 7 * _day, 14 * _day, 30 * _day)
+
+_schema = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    found INTEGER NOT NULL,
+    data TEXT,
+    misses INTEGER NOT NULL DEFAULT 0,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def make_key(title, year, params={}):
+    """Make a cache key.
+
+    Parameters
+    ----------
+    title : str
+        A movie title.
+    year : int, str, None
+        A movie release year.
+    params : dict, optional
+        Extra request parameters that alter the response. The ``apikey`` parameter is ignored
+        since it doesn't alter the response.
+
+    Returns
+    -------
+    str
+        A cache key. Titles with the same key (see :any:`title_keys.title_key`, leading
+        articles are kept) share the same cache key.
+    """
+    norm_title = title_keys.title_key(title, strip_articles=False)
+    norm_params = sorted((str(k), str(v)) for k, v in params.items()
+                         if k not in ("apikey", "t", "y"))
+
+    return json.dumps([norm_title, str(year) if year else "", norm_params],
+                      separators=(",", ":"))
+
+
+class ResponseCache():
+    """Disk-backed response cache.
+
+    Successful responses are stored with a time to live. *Not found* responses are stored
+    too (negative caching) and are retried following :any:`NOT_FOUND_RETRY_SCHEDULE`.
+
+    Attributes
+    ----------
+    db_path : str
+        Path to the SQLite database file storing the cache.
+    max_entries : int
+        See :any:`DEFAULT_MAX_ENTRIES`.
+    ttl : int
+        See :any:`DEFAULT_TTL`.
+    """
+
+    def __init__(self, db_path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        """Initialization.
+
+        Parameters
+        ----------
+        db_path : str
+            Path to the SQLite database file storing the cache.
+        ttl : int, optional
+            See :any:`DEFAULT_TTL`.
+        max_entries : int, optional
+            See :any:`DEFAULT_MAX_ENTRIES`.
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_schema)
+
+    def get(self, key):
+        """Get a cached response.
+
+        Parameters
+        ----------
+        key : str
+            See :any:`make_key`.
+
+        Returns
+        -------
+        tuple
+            A ``(status, data)`` tuple. ``status`` is one of :any:`CACHE_HIT`, :any:`CACHE_MISS`
+            or :any:`CACHE_NOT_FOUND`. ``data`` is the cached response on a hit or None.
+        """
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT found, data, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or row[2] <= now:
+                return CACHE_MISS, None
+
+            with self._conn:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                                   (now, key))
+
+        if row[0]:
+            return CACHE_HIT, json.loads(row[1])
+
+        return CACHE_NOT_FOUND, None
+
+    def set(self, key, data):
+        """Store a successful response.
+
+        Parameters
+        ----------
+        key : str
+            See :any:`make_key`.
+        data : dict
+            The response to store.
+        """
+        now = time.time()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, found, data, misses, stored_at, expires_at, accessed_at) "
+                "VALUES (?, 1, ?, 0, ?, ?, ?)",
+                (key, json.dumps(data), now, now + self.ttl, now)
+            )
+
+    def set_not_found(self, key):
+        """Store a *not found* response.
+
+        The time to wait until the next retry grows with each consecutive miss.
+
+        Parameters
+        ----------
+        key : str
+            See :any:`make_key`.
+        """
+        now = time.time()
+
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT misses FROM responses WHERE key = ? AND found = 0", (key,)
+            ).fetchone()
+            misses = row[0] if row else 0
+            retry_in = NOT_FOUND_RETRY_SCHEDULE[min(misses, len(NOT_FOUND_RETRY_SCHEDULE) - 1)]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, found, data, misses, stored_at, expires_at, accessed_at) "
+                "VALUES (?, 0, NULL, ?, ?, ?, ?)",
+                (key, misses + 1, now, now + retry_in, now)
+            )
+
+    def iter_found(self):
+        """Iterate over the stored successful responses.
+
+        Yields
+        ------
+        tuple
+            A ``(key, data)`` tuple for every stored response.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, data FROM responses WHERE found = 1").fetchall()
+
+        for key, data in rows:
+            yield key, json.loads(data)
+
+    def evict(self):
+        """Evict entries.
+
+        Expired successful responses are removed. Then, if the cache holds more than
+        ``max_entries``, the least recently accessed entries are removed. Expired *not found*
+        responses are kept so the retry schedule can continue where it was left.
+
+        Returns
+        -------
+        int
+            The amount of evicted entries.
+        """
+        with self._lock, self._conn:
+            evicted = self._conn.execute(
+                "DELETE FROM responses WHERE found = 1 AND expires_at <= ?", (time.time(),)
+            ).rowcount
+            evicted += self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+            ).rowcount
+
+        return evicted
+
+    def close(self):
+        """Close the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+
+class _Call():
+    """An in-flight call handled by :any:`SingleFlight`.
+
+    Attributes
+    ----------
+    done : threading.Event
+        Set when the call finished.
+    error : Exception
+        The exception raised by the call, if any.
+    result : object
+        The value returned by the call.
+    """
+
+    def __init__(self):
+        """Initialization.
+        """
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    """Coalesce identical concurrent calls into a single one.
+
+    While a call identified by a key is in flight, other threads calling with the same key
+    wait for it and receive its result instead of performing their own call.
+    """
+
+    def __init__(self):
+        """Initialization.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """Call ``func`` unless a call with the same key is already in flight.
+
+        Parameters
+        ----------
+        key : str
+            Identifies identical calls.
+        func : callable
+            The function to call.
+        *args
+            Arguments passed to ``func``.
+        **kwargs
+            Keyword arguments passed to ``func``.
+
+        Returns
+        -------
+        object
+            The value returned by ``func``.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
+
+        return call.result
+
+
+if __name__ == "__main__":
+    pass
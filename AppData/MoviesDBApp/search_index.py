@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""Full-text search of the resolved movies.
+
+Searches are served by an SQLite FTS5 table stored in the catalog (see :any:`catalog`). On
+SQLite builds without FTS5, an :any:`InvertedIndex` with the same semantics is used instead:
+all the query words must match (the last one as a prefix) and results are ranked with BM25,
+with matches in titles weighting more than matches in plots.
+
+Attributes
+----------
+BM25_B : float
+    BM25 document length normalization.
+BM25_K1 : float
+    BM25 term frequency saturation.
+FIELDS : tuple
+    Names of the indexed fields.
+SNAPSHOT_VERSION : int
+    Version of the snapshot format. Snapshots with a different version are ignored.
+WEIGHTS : tuple
+    Relevance weight of each of the :any:`FIELDS`.
+"""
+import bisect
+import heapq
+import math
+import os
+import pickle
+import re
+
+from array import array
+
+from . import title_keys
+
+BM25_B = 0.75
+BM25_K1 = 1.2
+FIELDS = ("title", "alt_titles", "plot", "actors", "directors")
+SNAPSHOT_VERSION = 2
+WEIGHTS = (10.0, 5.0, 1.0, 2.0, 2.0)
+
+_word = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Split a text into words.
+
+    Parameters
+    ----------
+    text : str
+        The text to split.
+
+    Returns
+    -------
+    list
+        The words folded (see :any:`title_keys.fold`).
+    """
+    return _word.findall(title_keys.fold(text))
+
+
+def document(movie):
+    """Get the indexed fields of a resolved movie.
+
+    Parameters
+    ----------
+    movie : dict
+        The movie base data plus a ``details`` key.
+
+    Returns
+    -------
+    tuple
+        The text of each of the :any:`FIELDS`, folded (see :any:`title_keys.fold`) so the FTS5
+        tokenizer finds the same words as :any:`tokenize`. The alternative titles are the
+        original title and the title guessed from the file name.
+    """
+    details = movie.get("details") or {}
+
+    def value(key):
+        text = details.get(key) or ""
+
+        return "" if text == "N/A" else text
+
+    title = value("Title")
+    alt_titles = [t for t in (value("OriginalTitle"), str(movie.get("title") or ""))
+                  if t and t != title]
+
+    return tuple(map(title_keys.fold, (title, " ".join(alt_titles), value("Plot"),
+                                       value("Actors"), value("Director"))))
+
+
+def fts_query(query):
+    """Convert a user query into an FTS5 query.
+
+    Parameters
+    ----------
+    query : str
+        The user query.
+
+    Returns
+    -------
+    str, None
+        An FTS5 query matching all the query words (the last one as a prefix), or None if the
+        query has no words.
+    """
+    words = ['"%s"' % word for word in tokenize(query)]
+
+    if not words:
+        return None
+
+    words[-1] += "*"
+
+    return " ".join(words)
+
+
+class InvertedIndex():
+    """Pure Python full-text index.
+
+    Attributes
+    ----------
+    ids : list
+        The identifier of every indexed document.
+    """
+
+    def __init__(self):
+        """Initialization.
+        """
+        self.ids = []
+        self._lengths = [array("I") for f in FIELDS]
+        self._postings = {}
+        self._frequencies = {}
+        self._terms = None
+
+    def __len__(self):
+        """Amount of indexed documents.
+
+        Returns
+        -------
+        int
+            Amount of indexed documents.
+        """
+        return len(self.ids)
+
+    def add(self, doc_id, fields):
+        """Add a document to the index.
+
+        Parameters
+        ----------
+        doc_id : object
+            The document identifier returned by :any:`InvertedIndex.search`.
+        fields : tuple
+            The text of each of the :any:`FIELDS`.
+        """
+        pos = len(self.ids)
+        self.ids.append(doc_id)
+        self._terms = None
+
+        for field, text in enumerate(fields):
+            words = tokenize(text)
+            self._lengths[field].append(len(words))
+            counts = {}
+
+            for word in words:
+                counts[word] = counts.get(word, 0) + 1
+
+            for word, count in counts.items():
+                posting = self._postings.get(word)
+
+                if posting is None:
+                    posting = self._postings[word] = array("I")
+                    self._frequencies[word] = array("H")
+
+                # Document position and field packed in a single integer.
+                posting.append(pos << 3 | field)
+                self._frequencies[word].append(min(count, 65535))
+
+    def _expand(self, prefix):
+        """Find the indexed words starting with a prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            The prefix.
+
+        Returns
+        -------
+        list
+            The words.
+        """
+        if self._terms is None:
+            self._terms = sorted(self._postings)
+
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + "\U0010ffff")
+
+        return self._terms[start:end]
+
+    def _score(self, words, avg_lengths, candidates=None):
+        """Score the documents matching any of several words.
+
+        Parameters
+        ----------
+        words : list
+            The words.
+        avg_lengths : list
+            The average length of each field.
+        candidates : dict, None, optional
+            If passed, only the documents in its keys are scored.
+
+        Returns
+        -------
+        dict
+            Maps document positions to their BM25 score for the words.
+        """
+        weighted = {}
+        matched = set()
+
+        for word in words:
+            for packed, count in zip(self._postings[word], self._frequencies[word]):
+                pos, field = packed >> 3, packed & 7
+                matched.add(pos)
+
+                if candidates is not None and pos not in candidates:
+                    continue
+
+                norm = 1 - BM25_B + BM25_B * self._lengths[field][pos] / avg_lengths[field]
+                weighted[pos] = weighted.get(pos, 0) + WEIGHTS[field] * count / norm
+
+        total = len(self.ids)
+        idf = math.log(1 + (total - len(matched) + 0.5) / (len(matched) + 0.5))
+
+        return {pos: idf * w / (BM25_K1 + w) for pos, w in weighted.items()}
+
+    def search(self, query, limit=20):
+        """Find the documents matching a query.
+
+        Parameters
+        ----------
+        query : str
+            The query. All its words must match, the last one as a prefix.
+        limit : int, optional
+            Maximum amount of results.
+
+        Returns
+        -------
+        list
+            A list of ``(score, doc_id)`` tuples sorted by relevance.
+        """
+        words = tokenize(query)
+
+        if not words or not self.ids:
+            return []
+
+        groups = [[w] if w in self._postings else [] for w in words[:-1]]
+        groups.append(self._expand(words[-1]))
+
+        if not all(groups):
+            return []
+
+        avg_lengths = [max(1, sum(lengths) / len(lengths)) for lengths in self._lengths]
+        # Rarest words first, so the following ones only score the remaining candidates.
+        groups.sort(key=lambda g: sum(len(self._postings[w]) for w in g))
+        scores = None
+
+        for group in groups:
+            group_scores = self._score(group, avg_lengths, scores)
+
+            if scores is None:
+                scores = group_scores
+            else:
+                scores = {pos: scores[pos] + s for pos, s in group_scores.items()}
+
+            if not scores:
+                return []
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+        return [(score, self.ids[pos]) for pos, score in best]
+
+    def save(self, path, signature=None):
+        """Store a snapshot of the index.
+
+        Parameters
+        ----------
+        path : str
+            Path to the snapshot file.
+        signature : object, optional
+            Any picklable value describing the sources of the index. See
+            :any:`InvertedIndex.load`.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+
+        with open(tmp_path, "wb") as out:
+            pickle.dump((SNAPSHOT_VERSION, signature, self.ids, self._lengths, self._postings,
+                         self._frequencies),
+                        out, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, signature=None):
+        """Load a snapshot of the index.
+
+        Parameters
+        ----------
+        path : str
+            Path to the snapshot file.
+        signature : object, optional
+            The signature of the current sources of the index. See :any:`InvertedIndex.save`.
+
+        Returns
+        -------
+        InvertedIndex, None
+            The index, or None if the snapshot doesn't exist or has a different version or
+            signature.
+        """
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, "rb") as file:
+            data = pickle.load(file)
+
+        if data[0] != SNAPSHOT_VERSION or data[1] != signature:
+            return None
+
+        index = cls()
+        index.ids, index._lengths, index._postings, index._frequencies = data[2:]
+
+        return index
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""Statistics of the movies catalog.
+
+The fields of the movies are loaded into typed columns (see :any:`Columns`), one array per
+field, so reports are computed with array operations instead of looping over a dictionary per
+movie. If NumPy is installed, the columns are viewed as NumPy arrays without copying them and
+aggregates are vectorized. Otherwise, the :py:mod:`array` module columns are aggregated with
+the standard library.
+
+Attributes
+----------
+RATING_BINS : int
+    Amount of bins of the ratings histogram. Ratings range from 0 to 10.
+TOP : int
+    Default amount of largest movie files reported per resolution.
+"""
+import heapq
+
+from array import array
+from collections import Counter
+
+from . import records
+
+try:
+    import numpy
+except (SystemError, ImportError):
+    numpy = None
+
+RATING_BINS = 10
+TOP = 5
+
+
+def _label(value):
+    """Convert a categorical value into a label.
+
+    Parameters
+    ----------
+    value : object
+        The value. Values guessed from file names can be tuples.
+
+    Returns
+    -------
+    str, None
+        The label.
+    """
+    return "/".join(map(str, value)) if isinstance(value, tuple) else value
+
+
+class Columns():
+    """Typed columns of the movies fields.
+
+    Unknown numbers are stored as 0. Resolutions and codecs are stored as codes of a
+    :any:`records.Vocabulary` (0 is unknown).
+
+    Attributes
+    ----------
+    codec : array.array
+        Video codec codes.
+    codecs : records.Vocabulary
+        Video codecs.
+    file_names : list
+        Movie file names.
+    rating : array.array
+        IMDb ratings times 10.
+    resolution : array.array
+        Resolution (screen size) codes.
+    resolutions : records.Vocabulary
+        Resolutions.
+    runtime : array.array
+        Runtimes in minutes.
+    size : array.array
+        File sizes in bytes.
+    titles : list
+        Movie titles.
+    year : array.array
+        Release years.
+    """
+
+    def __init__(self, rows=()):
+        """Initialization.
+
+        Parameters
+        ----------
+        rows : iterable, optional
+            ``(file_name, title, year, size, runtime, rating, resolution, codec)`` tuples (see
+            :any:`catalog.Catalog.stats_rows`).
+        """
+        self.file_names = []
+        self.titles = []
+        self.year = array("H")
+        self.size = array("Q")
+        self.runtime = array("H")
+        self.rating = array("H")
+        self.resolution = array("H")
+        self.codec = array("H")
+        self.resolutions = records.Vocabulary()
+        self.codecs = records.Vocabulary()
+
+        for file_name, title, year, size, runtime, rating, resolution, codec in rows:
+            self.file_names.append(file_name)
+            self.titles.append(title or file_name)
+            self.year.append(min(max(int(year or 0), 0), 65535))
+            self.size.append(max(int(size or 0), 0))
+            self.runtime.append(min(max(int(runtime or 0), 0), 65535))
+            self.rating.append(min(max(round((rating or 0) * 10), 0), 100))
+            self.resolution.append(self.resolutions.encode(resolution or None))
+            self.codec.append(self.codecs.encode(codec or None))
+
+    def __len__(self):
+        """Amount of movies.
+
+        Returns
+        -------
+        int
+            Amount of movies.
+        """
+        return len(self.file_names)
+
+    def numpy_columns(self):
+        """View the numeric columns as NumPy arrays.
+
+        The arrays share the memory of the :py:mod:`array` columns.
+
+        Returns
+        -------
+        dict
+            Maps column names to NumPy arrays.
+        """
+        return {name: numpy.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode)
+                if len(self) else numpy.zeros(0, dtype=getattr(self, name).typecode)
+                for name in ("year", "size", "runtime", "rating", "resolution", "codec")}
+
+
+def _by_decade(columns, cols):
+    """Count movies and bytes by release decade.
+
+    Parameters
+    ----------
+    columns : Columns
+        The movies columns.
+    cols : dict, None
+        The columns as NumPy arrays, or None to use the standard library.
+
+    Returns
+    -------
+    list
+        ``{"decade", "count", "bytes"}`` dictionaries sorted by decade. Movies with unknown
+        year are counted in a last item with None as decade.
+    """
+    if cols is not None:
+        # Years are 16 bits integers, so there are few thousand possible decades at most.
+        decades = cols["year"] // 10
+        counts = numpy.bincount(decades)
+        sizes = numpy.bincount(decades, weights=cols["size"])
+        totals = {int(d) * 10: (int(counts[d]), int(round(sizes[d])))
+                  for d in numpy.flatnonzero(counts)}
+    else:
+        totals = {}
+
+        for year, size in zip(columns.year, columns.size):
+            count, total = totals.get(year // 10 * 10, (0, 0))
+            totals[year // 10 * 10] = (count + 1, total + size)
+
+    return [{"decade": decade or None, "count": totals[decade][0], "bytes": totals[decade][1]}
+            for decade in sorted(totals, key=lambda d: (d == 0, d))]
+
+
+def _by_code(columns, cols, name, vocabulary):
+    """Count movies and bytes by the code of a categorical column.
+
+    Parameters
+    ----------
+    columns : Columns
+        The movies columns.
+    cols : dict, None
+        The columns as NumPy arrays, or None to use the standard library.
+    name : str
+        The column name.
+    vocabulary : records.Vocabulary
+        The vocabulary of the column.
+
+    Returns
+    -------
+    list
+        ``(code, count, bytes)`` tuples of the codes of at least a movie, sorted by count in
+        descending order.
+    """
+    if cols is not None:
+        counts = numpy.bincount(cols[name], minlength=len(vocabulary)).tolist()
+        sizes = numpy.bincount(cols[name], weights=cols["size"],
+                               minlength=len(vocabulary)).tolist()
+    else:
+        counts = [0] * len(vocabulary)
+        sizes = [0] * len(vocabulary)
+
+        for code, size in zip(getattr(columns, name), columns.size):
+            counts[code] += 1
+            sizes[code] += size
+
+    return sorted(((code, counts[code], int(round(sizes[code])))
+                   for code in range(len(vocabulary)) if counts[code]),
+                  key=lambda item: -item[1])
+
+
+def _ratings(columns, cols):
+    """Compute the ratings histogram.
+
+    Parameters
+    ----------
+    columns : Columns
+        The movies columns.
+    cols : dict, None
+        The columns as NumPy arrays, or None to use the standard library.
+
+    Returns
+    -------
+    tuple
+        The amount of movies per rating bin (see :any:`RATING_BINS`) and the amount of unrated
+        movies.
+    """
+    if cols is not None:
+        rated = cols["rating"][cols["rating"] > 0]
+        bins = numpy.minimum(rated * RATING_BINS // 100, RATING_BINS - 1)
+
+        return numpy.bincount(bins, minlength=RATING_BINS).tolist(), len(columns) - len(rated)
+
+    histogram = [0] * RATING_BINS
+
+    # Ratings have 101 possible values, so they are counted before being binned.
+    for rating, count in Counter(columns.rating).items():
+        if rating:
+            histogram[min(rating * RATING_BINS // 100, RATING_BINS - 1)] += count
+
+    return histogram, len(columns) - sum(histogram)
+
+
+def _largest(columns, cols, top):
+    """Find the largest movie files of each resolution.
+
+    Parameters
+    ----------
+    columns : Columns
+        The movies columns.
+    cols : dict, None
+        The columns as NumPy arrays, or None to use the standard library.
+    top : int
+        Amount of movies per resolution.
+
+    Returns
+    -------
+    dict
+        Maps resolution codes to the indexes of their largest movies, largest first.
+    """
+    if cols is not None:
+        largest = {}
+
+        # There are few resolutions, so each one is selected separately and only its largest
+        # files are sorted. Like heapq.nlargest, ties keep the lowest indexes first, so both
+        # engines report the same movies.
+        for code in numpy.flatnonzero(numpy.bincount(cols["resolution"])):
+            indexes = numpy.flatnonzero(cols["resolution"] == code)
+            sizes = cols["size"][indexes]
+
+            if len(indexes) > top:
+                # Files tied with the smallest selected one are kept, so the sort picks them.
+                selected = sizes >= numpy.partition(sizes, -top)[-top]
+                indexes, sizes = indexes[selected], sizes[selected]
+
+            # Sizes are unsigned, so the indexes are negated instead and the order reversed.
+            order = numpy.lexsort((-indexes, sizes))[::-1][:top]
+            largest[int(code)] = indexes[order].tolist()
+
+        return largest
+
+    groups = {}
+
+    for index, code in enumerate(columns.resolution):
+        groups.setdefault(code, []).append(index)
+
+    return {code: heapq.nlargest(top, indexes, key=columns.size.__getitem__)
+            for code, indexes in groups.items()}
+
+
+def report(columns, top=TOP):
+    """Compute the statistics report of a catalog.
+
+    Parameters
+    ----------
+    columns : Columns
+        The movies columns.
+    top : int, optional
+        Amount of largest movies reported per resolution.
+
+    Returns
+    -------
+    dict
+        The report. It can be serialized as JSON. Sizes are in bytes and unknown categorical
+        values are None.
+    """
+    cols = columns.numpy_columns() if numpy is not None else None
+    histogram, unrated = _ratings(columns, cols)
+    largest = _largest(columns, cols, top) if top else {}
+
+    return {
+        "engine": "numpy" if cols is not None else "array",
+        "count": len(columns),
+        "bytes": int(cols["size"].sum()) if cols is not None else sum(columns.size),
+        "minutes": int(cols["runtime"].sum()) if cols is not None else sum(columns.runtime),
+        "decades": _by_decade(columns, cols),
+        "codecs": [{"codec": _label(columns.codecs.decode(code)), "count": count, "bytes": size}
+                   for code, count, size in _by_code(columns, cols, "codec", columns.codecs)],
+        "ratings": [{"from": b * 10 / RATING_BINS, "to": (b + 1) * 10 / RATING_BINS,
+                     "count": count} for b, count in enumerate(histogram)],
+        "unrated": unrated,
+        "resolutions": [{"resolution": _label(columns.resolutions.decode(code)), "count": count,
+                         "bytes": size,
+                         "largest": [{"file_name": columns.file_names[i],
+                                      "title": columns.titles[i],
+                                      "bytes": columns.size[i]} for i in largest.get(code, [])]}
+                        for code, count, size in _by_code(columns, cols, "resolution",
+                                                          columns.resolutions)],
+    }
+
+
+if __name__ == "__main__":
+    pass
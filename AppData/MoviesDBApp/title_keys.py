@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Normalized keys of movie titles.
+
+Every component that compares titles (the catalog, the fuzzy matcher, the IMDb index, the
+responses cache, the lookup planner, the disambiguation queue, the search index and the catalog
+snapshot) uses the keys of this module, so a title gets the same key everywhere regardless of
+its accents, letter case or punctuation.
+
+Keys are built with the steps of :any:`string_utils.slugify` (decomposition, removal of
+diacritics and punctuation and lowercasing), but letters without an ASCII equivalent are folded
+instead of removed (e.g. ``Æ`` is ``ae`` and Japanese titles are kept), ``&`` is spelled
+``and`` and leading articles are removed.
+
+This module only depends on the standard library, so the web application can use it without
+the dependencies needed to generate movies data.
+
+Attributes
+----------
+ARTICLES : tuple
+    Leading articles removed from the keys.
+CACHE_SIZE : int
+    Amount of keys remembered, so the titles used by several pipeline stages are only
+    normalized once.
+"""
+import functools
+import re
+import unicodedata
+
+ARTICLES = ("the", "a", "an")
+CACHE_SIZE = 100000
+
+_digits = re.compile(r"\d+")
+_leading_article = re.compile(r"^(?:%s) " % "|".join(ARTICLES))
+# Letters that aren't decomposed into a base letter and diacritics.
+_letters = str.maketrans({"æ": "ae", "œ": "oe", "ø": "o", "đ": "d", "ł": "l", "þ": "th"})
+_punctuation = re.compile(r"[^\w\s-]")
+_separators = re.compile(r"[\s_-]+")
+
+
+def fold(text):
+    """Remove the letter case and the diacritics of a text.
+
+    Parameters
+    ----------
+    text : str
+        The text.
+
+    Returns
+    -------
+    str
+        The text casefolded and without diacritics.
+    """
+    text = text.casefold()
+
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text)
+                       if not unicodedata.combining(c)).translate(_letters)
+
+    return text
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def title_key(title, strip_articles=True):
+    """Get the key of a title.
+
+    Parameters
+    ----------
+    title : str
+        A movie title.
+    strip_articles : bool, optional
+        Remove a leading article (see :any:`ARTICLES`).
+
+    Returns
+    -------
+    str
+        The title folded (see :any:`fold`), without punctuation nor leading article, with
+        "&" spelled "and" and with words separated by single spaces (e.g. ``The Lord of the
+        Rings: The Return of the King`` is ``lord of the rings the return of the king``).
+    """
+    title = fold(str(title).replace("&", " and "))
+    title = _separators.sub(" ", _punctuation.sub("", title)).strip()
+
+    return _leading_article.sub("", title) if strip_articles else title
+
+
+def sort_key(title):
+    """Get the key titles are sorted by.
+
+    Parameters
+    ----------
+    title : str
+        A movie title.
+
+    Returns
+    -------
+    str
+        The key of the title (see :any:`title_key`) with numbers padded with zeros, so they are
+        sorted by value (e.g. ``Rocky 2`` before ``Rocky 10``).
+    """
+    return _digits.sub(lambda match: match.group().zfill(10), title_key(title))
+
+
+if __name__ == "__main__":
+    pass
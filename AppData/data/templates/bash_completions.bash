@@ -26,7 +26,7 @@ __movies_db_cli_{current_date}(){
 
     case $cmd in
     "movies")
-        COMPREPLY=( $(compgen -W "scan base_data detailed_data --debug" -- "${cur}") )
+        COMPREPLY=( $(compgen -W "scan base_data detailed_data resolve import-imdb import-library kodi jellyfin nfo posters search query stats export --debug --compress --limit --format --filter --path-map --overwrite" -- "${cur}") )
         ;;
     "server")
         COMPREPLY=( $(compgen -W "start stop restart --host= --port=" -- "${cur}") )
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Check the media center importers against the fixture libraries.
+
+Every fixture (see ``fixtures/media_center``) is imported with
+:any:`media_center_import.import_entries` into a new catalog of a temporary library with
+:any:`LIBRARY` files, and the matched entries and stored details are compared with
+:any:`EXPECTED`.
+
+Usage::
+
+    python3 tests/check_media_center_import.py
+
+Attributes
+----------
+EXPECTED : dict
+    Maps the fixtures to the expected import summary and to some of the expected details of
+    the matched movies.
+FIXTURES_PATH : str
+    Path to the fixture libraries.
+LIBRARY : dict
+    Maps the paths of the files of the temporary library to their size.
+PATH_MAP : dict
+    Maps the fixtures to the path prefix of their library. It's mapped to the temporary one.
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AppData.MoviesDBApp import catalog  # noqa: E402
+from AppData.MoviesDBApp import media_center_import  # noqa: E402
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures",
+                             "media_center")
+LIBRARY = {
+    "Heat (1995)/Heat (1995).mkv": 0,
+    "Alien (1979)/Alien.1979.cd1.avi": 0,
+    "Alien (1979)/Alien.1979.cd2.avi": 0,
+    "Amelie (2001)/Amelie.2001.mkv": 0,
+    "Other/Brazil.1985.mkv": 1234,
+    "Shorts/A.mkv": 0,
+    "Shorts/B.mkv": 0,
+}
+PATH_MAP = {
+    "kodi.sql": "smb://nas/movies/",
+    "jellyfin_legacy.sql": "/media/movies/",
+    "jellyfin_10_11.sql": "/media/movies/",
+}
+EXPECTED = {
+    "kodi.sql": (
+        {"path": 2, "fingerprint": 0, "unmatched": 1, "resolved": 0},
+        {
+            "Heat (1995)": {"Title": "Heat", "Year": "1995", "imdbID": "tt0113277",
+                            "Runtime": "170 min", "imdbRating": "8.3",
+                            "Genre": "Action, Crime, Drama", "Director": "Michael Mann",
+                            "Actors": "Al Pacino, Robert De Niro"},
+            "Alien.1979.cd1": {"Title": "Alien", "Year": "1979", "imdbID": "tt0078748",
+                               "Runtime": "117 min", "Actors": "Sigourney Weaver"},
+        },
+    ),
+    "jellyfin_legacy.sql": (
+        {"path": 1, "fingerprint": 1, "unmatched": 1, "resolved": 0},
+        {
+            "Amelie.2001": {"Title": "Amélie", "Year": "2001", "imdbID": "tt0211915",
+                            "Runtime": "122 min", "Genre": "Comedy, Romance",
+                            "Director": "Jean-Pierre Jeunet",
+                            "Actors": "Audrey Tautou, Mathieu Kassovitz",
+                            "OriginalTitle": "Le Fabuleux Destin d'Amélie Poulain"},
+            "Brazil.1985": {"Title": "Brazil", "imdbID": "tt0088846", "Runtime": "142 min",
+                            "Director": "Terry Gilliam"},
+        },
+    ),
+    "jellyfin_10_11.sql": (
+        {"path": 1, "fingerprint": 1, "unmatched": 1, "resolved": 0},
+        {
+            "Heat (1995)": {"Title": "Heat", "Year": "1995", "imdbID": "tt0113277",
+                            "Runtime": "170 min", "imdbRating": "8.3"},
+            "Brazil.1985": {"Title": "Brazil", "imdbID": "tt0088846"},
+        },
+    ),
+    "nfo": (
+        # The movie.nfo file of the Shorts folder doesn't describe any of its two movies.
+        {"path": 3, "fingerprint": 0, "unmatched": 0, "resolved": 0},
+        {
+            "Heat (1995)": {"Title": "Heat", "Year": "1995", "imdbID": "tt0113277",
+                            "imdbRating": "8.3", "Director": "Michael Mann"},
+            "Alien.1979.cd1": {"Title": "Alien", "Year": "1979", "imdbID": "tt0078748"},
+            "Alien.1979.cd2": {"Title": "Alien", "Year": "1979", "imdbID": "tt0078748"},
+        },
+    ),
+}
+
+
+def create_library(root):
+    """Create the files of the temporary library and a catalog of them.
+
+    Parameters
+    ----------
+    root : str
+        Path to the library folder.
+
+    Returns
+    -------
+    catalog.Catalog
+        The catalog.
+    """
+    movies_catalog = catalog.Catalog(os.path.join(root, "catalog.sqlite"))
+
+    for path, size in LIBRARY.items():
+        path = os.path.join(root, *path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "wb") as file:
+            file.write(b"\0" * size)
+
+        movies_catalog.upsert_file(os.path.splitext(os.path.basename(path))[0], path,
+                                   scan_id=1)
+
+    movies_catalog.commit()
+
+    return movies_catalog
+
+
+def read_fixture(fixture, root):
+    """Read the entries of a fixture library.
+
+    Parameters
+    ----------
+    fixture : str
+        One of the :any:`EXPECTED` fixtures.
+    root : str
+        Path to the temporary library folder.
+
+    Returns
+    -------
+    tuple
+        The source kind, the entries and the path map.
+    """
+    if fixture == "nfo":
+        # The NFO files are stored next to the movie files.
+        shutil.copytree(os.path.join(FIXTURES_PATH, "nfo"), root, dirs_exist_ok=True)
+
+        return "nfo", list(media_center_import.read_nfo_tree(root, (".avi", ".mkv"))), ()
+
+    db_path = os.path.join(root, os.path.splitext(fixture)[0] + ".db")
+    conn = sqlite3.connect(db_path)
+
+    with open(os.path.join(FIXTURES_PATH, fixture), encoding="utf-8") as file:
+        conn.executescript(file.read())
+
+    conn.close()
+
+    if fixture.startswith("kodi"):
+        source, entries = "kodi", media_center_import.read_kodi(db_path)
+    else:
+        source, entries = "jellyfin", media_center_import.read_jellyfin(db_path)
+
+    return source, list(entries), [(PATH_MAP[fixture], os.path.join(root, ""))]
+
+
+def check(fixture):
+    """Import a fixture library and compare the result with the expected one.
+
+    Parameters
+    ----------
+    fixture : str
+        One of the :any:`EXPECTED` fixtures.
+
+    Returns
+    -------
+    list
+        The differences found.
+    """
+    expected_summary, expected_details = EXPECTED[fixture]
+    errors = []
+
+    with tempfile.TemporaryDirectory() as root:
+        movies_catalog = create_library(root)
+
+        try:
+            source, entries, path_map = read_fixture(fixture, root)
+            summary = media_center_import.import_entries(movies_catalog, entries, source,
+                                                         path_map)
+            details = movies_catalog.details()
+
+            for file_name in expected_details:
+                if movies_catalog.imported_details(file_name) is None:
+                    errors.append("%s: no imported details" % file_name)
+        finally:
+            movies_catalog.close()
+
+    if summary != expected_summary:
+        errors.append("summary: %s != %s" % (summary, expected_summary))
+
+    if set(details) != set(expected_details):
+        errors.append("resolved movies: %s != %s" % (sorted(details), sorted(expected_details)))
+
+    for file_name, expected in expected_details.items():
+        movie = details.get(file_name) or {"details": {}}
+
+        for key, value in expected.items():
+            if movie["details"].get(key) != value:
+                errors.append("%s %s: %r != %r" % (file_name, key, movie["details"].get(key),
+                                                   value))
+
+    return errors
+
+
+def main():
+    """Check every fixture.
+
+    Returns
+    -------
+    int
+        The exit status: 1 if any check failed.
+    """
+    failed = False
+
+    for fixture in EXPECTED:
+        errors = check(fixture)
+        failed = failed or bool(errors)
+        print("%s: %s" % (fixture, "FAILED" if errors else "OK"))
+
+        for error in errors:
+            print("    %s" % error)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
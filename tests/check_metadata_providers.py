@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Check the HTTP metadata providers against a local stand-in server.
+
+The ordered and race modes and the time budget of :any:`metadata_providers.ProviderChain`
+are checked with :any:`metadata_providers.JSONHTTPProvider` instances querying
+:any:`stand_in_server.StandInServer` instances. :any:`app_utils.OMDbProvider` is checked too
+(lookups by title and by IMDb ID, the responses cache, the year check and the daily quota)
+if the dependencies of :any:`app_utils` are installed.
+
+Usage::
+
+    python3 tests/check_metadata_providers.py
+
+Attributes
+----------
+FIELDS : dict
+    Fields of the JSON HTTP providers (see :any:`metadata_providers.JSONHTTPProvider`).
+DUNE : dict
+    A movie served by the OMDb stand-in server whose title is shared by a later movie.
+HEAT : dict
+    The movie served by the stand-in servers.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AppData.MoviesDBApp import metadata_providers  # noqa: E402
+from stand_in_server import StandInServer  # noqa: E402
+
+FIELDS = {"Title": "movie.title", "Year": "movie.year", "imdbID": "movie.imdbid",
+          "Plot": "movie.plot"}
+HEAT = {"Response": "True", "Title": "Heat", "Year": "1995", "imdbID": "tt0113277",
+        "Plot": "A group of professional bank robbers...", "Type": "movie"}
+DUNE = {"Response": "True", "Title": "Dune", "Year": "1984", "imdbID": "tt0087182",
+        "Type": "movie"}
+_movie = {"title": "Heat", "year": 1995}
+
+
+def _provider(name, server):
+    """Create a JSON HTTP provider querying a stand-in server.
+
+    Parameters
+    ----------
+    name : str
+        The provider name.
+    server : StandInServer
+        The server.
+
+    Returns
+    -------
+    metadata_providers.JSONHTTPProvider
+        The provider.
+    """
+    return metadata_providers.JSONHTTPProvider(
+        name, server.url + "/json?title={title}&year={year}&imdb_id={imdb_id}", FIELDS)
+
+
+def check_ordered():
+    """Check that providers are queried one after the other.
+
+    Returns
+    -------
+    list
+        The differences found.
+    """
+    errors = []
+
+    with StandInServer([]) as empty, StandInServer([HEAT]) as full:
+        chain = metadata_providers.ProviderChain(
+            [_provider("empty", empty), _provider("full", full)], mode="ordered")
+
+        try:
+            if chain.lookup(_movie).get("Title") != "Heat":
+                errors.append("the second provider didn't resolve the movie")
+
+            requests = (empty.count("/json"), full.count("/json"))
+
+            if requests != (1, 1):
+                errors.append("requests: %d, %d != 1, 1" % requests)
+
+            if chain.lookup({"title": "Unknown", "year": 2000}) != metadata_providers.NOT_FOUND:
+                errors.append("an unknown movie was resolved")
+        finally:
+            chain.close()
+
+        chain = metadata_providers.ProviderChain(
+            [_provider("full", full), _provider("empty", empty)], mode="ordered")
+
+        try:
+            chain.lookup(_movie)
+
+            if empty.count("/json") != 2:
+                errors.append("a provider was queried after the movie was resolved")
+        finally:
+            chain.close()
+
+    return errors
+
+
+def check_race():
+    """Check that the first confident result of concurrent providers wins.
+
+    Returns
+    -------
+    list
+        The differences found.
+    """
+    errors = []
+    slow_heat = dict(HEAT, Plot="Slow")
+
+    with StandInServer([slow_heat], delay=1.0) as slow, StandInServer([HEAT]) as fast:
+        chain = metadata_providers.ProviderChain(
+            [_provider("slow", slow), _provider("fast", fast)], mode="race")
+        start = time.monotonic()
+
+        try:
+            result = chain.lookup(_movie)
+            elapsed = time.monotonic() - start
+
+            if result.get("Plot") != HEAT["Plot"]:
+                errors.append("the slowest provider won: %s" % result.get("Plot"))
+
+            if elapsed >= slow.delay:
+                errors.append("the slowest provider was waited for: %.2fs" % elapsed)
+
+            if slow.count("/json") != 1:
+                errors.append("the slowest provider wasn't queried")
+        finally:
+            chain.close()
+
+    return errors
+
+
+def check_budget():
+    """Check that lookups exceeding the time budget are abandoned.
+
+    Returns
+    -------
+    list
+        The differences found.
+    """
+    errors = []
+
+    with StandInServer([HEAT], delay=1.0) as slow:
+        chain = metadata_providers.ProviderChain([_provider("slow", slow)], budget=0.2)
+        start = time.monotonic()
+
+        try:
+            chain.lookup(_movie)
+            errors.append("the budget wasn't enforced")
+        except metadata_providers.LookupTimeout:
+            elapsed = time.monotonic() - start
+
+            if elapsed >= slow.delay:
+                errors.append("the lookup took %.2fs" % elapsed)
+        finally:
+            chain.close()
+
+    return errors
+
+
+def check_omdb():
+    """Check the OMDb provider.
+
+    The responses cache and the quota tracker of :any:`app_utils` are replaced by temporary
+    ones.
+
+    Returns
+    -------
+    list, None
+        The differences found, or None if the dependencies of :any:`app_utils` aren't
+        installed.
+    """
+    try:
+        from AppData.MoviesDBApp import app_utils
+    # exceptions.MissingDependencyModule exits when it's created.
+    except (ImportError, SystemExit) as err:
+        print("omdb: SKIPPED (%s)" % str(err).strip())
+
+        return None
+
+    from AppData.MoviesDBApp import quota_scheduler
+    from AppData.MoviesDBApp import response_cache
+
+    errors = []
+
+    with tempfile.TemporaryDirectory() as root, StandInServer([HEAT, DUNE]) as server:
+        app_utils._response_cache = response_cache.ResponseCache(
+            os.path.join(root, "omdb_responses.sqlite"))
+        app_utils._quota_tracker = quota_scheduler.QuotaTracker(
+            os.path.join(root, "omdb_quota.json"))
+        provider = app_utils.OMDbProvider("key", url=server.url + "/omdb/?")
+
+        try:
+            for movie in (_movie, _movie, {"imdb_id": "tt0113277"}):
+                if (provider.lookup(movie) or {}).get("imdbID") != HEAT["imdbID"]:
+                    errors.append("not resolved: %s" % movie)
+
+            # The second lookup is served from the cache.
+            if server.count("/omdb/") != 2:
+                errors.append("requests: %d != 2" % server.count("/omdb/"))
+
+            # The response cached for a lookup without year doesn't match a later movie.
+            provider.lookup({"title": "Dune"})
+
+            if provider.lookup({"title": "Dune", "year": 2021}) is not None:
+                errors.append("a cached response of another year was returned")
+
+            server.omdb_quota = server.count("/omdb/")
+
+            try:
+                provider.lookup({"title": "Other", "year": 2000})
+                errors.append("the spent quota wasn't reported")
+            except quota_scheduler.QuotaExhausted:
+                pass
+        finally:
+            provider.close()
+            app_utils._response_cache.close()
+            app_utils._response_cache = None
+            app_utils._quota_tracker = None
+
+    return errors
+
+
+def main():
+    """Run every check.
+
+    Returns
+    -------
+    int
+        The exit status: 1 if any check failed.
+    """
+    failed = False
+
+    for name, check in (("ordered", check_ordered), ("race", check_race),
+                        ("budget", check_budget), ("omdb", check_omdb)):
+        errors = check()
+
+        if errors is None:
+            continue
+
+        failed = failed or bool(errors)
+        print("%s: %s" % (name, "FAILED" if errors else "OK"))
+
+        for error in errors:
+            print("    %s" % error)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
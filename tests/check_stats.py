@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Check that both engines of :any:`stats.report` compute the same report.
+
+The report of :any:`ROWS` is computed with NumPy and with the standard library (by hiding
+NumPy from :any:`stats`), and both reports are compared. The rows have files of the same size,
+so the order of the largest files of each resolution depends on how ties are broken.
+
+Usage::
+
+    python3 tests/check_stats.py
+
+Attributes
+----------
+ROWS : list
+    Movie rows in the format of :any:`catalog.Catalog.stats_rows`.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AppData.MoviesDBApp import stats  # noqa: E402
+
+ROWS = [("movie%02d" % i, "Movie %d" % i, 1950 + i * 3, (i % 4) * 1000, 90 + i, 5 + i % 5 / 2,
+         "1080p" if i % 3 else "720p", "h264" if i % 2 else "hevc")
+        for i in range(24)]
+
+
+def check(top):
+    """Compare the reports of both engines.
+
+    Parameters
+    ----------
+    top : int
+        Amount of largest movies reported per resolution.
+
+    Returns
+    -------
+    list, None
+        The differences found, or None if NumPy isn't installed.
+    """
+    if stats.numpy is None:
+        print("top %d: SKIPPED (NumPy isn't installed)" % top)
+
+        return None
+
+    columns = stats.Columns(ROWS)
+    expected = stats.report(columns, top)
+    numpy, stats.numpy = stats.numpy, None
+
+    try:
+        found = stats.report(columns, top)
+    finally:
+        stats.numpy = numpy
+
+    return ["%s: %r != %r" % (key, expected[key], found[key])
+            for key in expected if key != "engine" and expected[key] != found[key]]
+
+
+def main():
+    """Run every check.
+
+    Returns
+    -------
+    int
+        The exit status: 1 if any check failed.
+    """
+    failed = False
+
+    # Fewer, as many and more movies per resolution than the reported ones.
+    for top in (3, 8, 20):
+        errors = check(top)
+
+        if errors is None:
+            continue
+
+        failed = failed or bool(errors)
+        print("top %d: %s" % (top, "FAILED" if errors else "OK"))
+
+        for error in errors:
+            print("    %s" % error)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
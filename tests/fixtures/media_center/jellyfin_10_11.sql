@@ -0,0 +1,32 @@
+-- Minimal Jellyfin database (jellyfin.db, Jellyfin 10.11 and later). Only the columns read
+-- by media_center_import.read_jellyfin are created. Runtimes are stored in ticks of 100 ns.
+CREATE TABLE BaseItems (
+    Id TEXT PRIMARY KEY, Type TEXT NOT NULL, Path TEXT, Name TEXT, OriginalTitle TEXT,
+    ProductionYear INTEGER, Overview TEXT, RunTimeTicks INTEGER, Genres TEXT,
+    CommunityRating REAL, Size INTEGER
+);
+CREATE TABLE BaseItemProviders (
+    ItemId TEXT NOT NULL, ProviderId TEXT NOT NULL, ProviderValue TEXT NOT NULL,
+    PRIMARY KEY (ItemId, ProviderId)
+);
+
+INSERT INTO BaseItems VALUES (
+    '9f0c3a6e-0000-0000-0000-000000000001', 'MediaBrowser.Controller.Entities.Movies.Movie',
+    '/media/movies/Heat (1995)/Heat (1995).mkv', 'Heat', NULL, 1995,
+    'A group of professional bank robbers...', 102000000000, 'Action|Crime|Drama', 8.3, NULL
+);
+INSERT INTO BaseItems VALUES (
+    '9f0c3a6e-0000-0000-0000-000000000002', 'MediaBrowser.Controller.Entities.Movies.Movie',
+    '/media/archive/Brazil.1985.mkv', 'Brazil', NULL, 1985, NULL, 85200000000,
+    'Drama|Sci-Fi', 7.8, 1234
+);
+INSERT INTO BaseItems VALUES (
+    '9f0c3a6e-0000-0000-0000-000000000003', 'MediaBrowser.Controller.Entities.Movies.Movie',
+    '/media/movies/Missing (2000)/Missing.mkv', 'Missing', NULL, 2000, NULL, NULL, NULL, NULL,
+    NULL
+);
+INSERT INTO BaseItemProviders VALUES ('9f0c3a6e-0000-0000-0000-000000000001', 'Imdb',
+                                      'tt0113277');
+INSERT INTO BaseItemProviders VALUES ('9f0c3a6e-0000-0000-0000-000000000002', 'Imdb',
+                                      'tt0088846');
+INSERT INTO BaseItemProviders VALUES ('9f0c3a6e-0000-0000-0000-000000000002', 'Tmdb', '68');
@@ -0,0 +1,32 @@
+-- Minimal Jellyfin database (library.db, before Jellyfin 10.11). Only the columns read by
+-- media_center_import.read_jellyfin are created. Runtimes are stored in ticks of 100 ns.
+CREATE TABLE TypedBaseItems (
+    guid GUID PRIMARY KEY, type TEXT, Path TEXT, Name TEXT, OriginalTitle TEXT,
+    ProductionYear INT, Overview TEXT, RunTimeTicks BIGINT, Genres TEXT, ProviderIds TEXT,
+    CommunityRating FLOAT, Size BIGINT
+);
+CREATE TABLE People (ItemId GUID, Name TEXT, Role TEXT, PersonType TEXT, ListOrder INT);
+
+INSERT INTO TypedBaseItems VALUES (
+    x'01', 'MediaBrowser.Controller.Entities.Movies.Movie',
+    '/media/movies/Amelie (2001)/Amelie.2001.mkv', 'Amélie',
+    'Le Fabuleux Destin d''Amélie Poulain', 2001, 'Amélie is an innocent and naive girl...',
+    73200000000, 'Comedy|Romance', 'Imdb=tt0211915|Tmdb=194', 8.3, NULL
+);
+INSERT INTO TypedBaseItems VALUES (
+    x'02', 'MediaBrowser.Controller.Entities.Movies.Movie', '/media/archive/Brazil.1985.mkv',
+    'Brazil', NULL, 1985, NULL, 85200000000, 'Drama|Sci-Fi', 'Imdb=tt0088846', 7.8, 1234
+);
+INSERT INTO TypedBaseItems VALUES (
+    x'03', 'MediaBrowser.Controller.Entities.Movies.Movie',
+    '/media/movies/Missing (2000)/Missing.mkv', 'Missing', NULL, 2000, NULL, NULL, NULL, NULL,
+    NULL, NULL
+);
+INSERT INTO TypedBaseItems VALUES (
+    x'04', 'MediaBrowser.Controller.Entities.TV.Series', '/media/shows/Show', 'Show', NULL,
+    2010, NULL, NULL, NULL, NULL, NULL, NULL
+);
+INSERT INTO People VALUES (x'01', 'Jean-Pierre Jeunet', NULL, 'Director', 0);
+INSERT INTO People VALUES (x'01', 'Mathieu Kassovitz', 'Nino Quincampoix', 'Actor', 1);
+INSERT INTO People VALUES (x'01', 'Audrey Tautou', 'Amélie Poulain', 'Actor', 0);
+INSERT INTO People VALUES (x'02', 'Terry Gilliam', NULL, 'Director', 0);
@@ -0,0 +1,48 @@
+-- Minimal Kodi video database (MyVideos*.db, Kodi 19 and later). Only the columns read by
+-- media_center_import.read_kodi are created. Runtimes are stored in seconds.
+CREATE TABLE path (idPath INTEGER PRIMARY KEY, strPath TEXT);
+CREATE TABLE files (idFile INTEGER PRIMARY KEY, idPath INTEGER, strFilename TEXT);
+CREATE TABLE movie (
+    idMovie INTEGER PRIMARY KEY, idFile INTEGER, c00 TEXT, c01 TEXT, c05 TEXT, c09 TEXT,
+    c11 TEXT, c14 TEXT, c15 TEXT, c16 TEXT, premiered TEXT
+);
+CREATE TABLE rating (rating_id INTEGER PRIMARY KEY, media_id INTEGER, media_type TEXT,
+                     rating_type TEXT, rating FLOAT, votes INTEGER);
+CREATE TABLE uniqueid (uniqueid_id INTEGER PRIMARY KEY, media_id INTEGER, media_type TEXT,
+                       value TEXT, type TEXT);
+CREATE TABLE actor (actor_id INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE actor_link (actor_id INTEGER, media_id INTEGER, media_type TEXT, role TEXT,
+                         cast_order INTEGER);
+CREATE VIEW movie_view AS
+SELECT movie.*, files.strFileName AS strFileName, path.strPath AS strPath,
+       rating.rating AS rating, uniqueid.value AS uniqueid_value
+FROM movie
+JOIN files ON files.idFile = movie.idFile
+JOIN path ON path.idPath = files.idPath
+LEFT JOIN rating ON rating.rating_id = movie.c05
+LEFT JOIN uniqueid ON uniqueid.uniqueid_id = movie.c09;
+
+INSERT INTO path VALUES (1, 'smb://nas/movies/Heat (1995)/');
+INSERT INTO path VALUES (2, 'smb://nas/movies/Alien (1979)/');
+INSERT INTO path VALUES (3, 'smb://nas/movies/Missing (2000)/');
+INSERT INTO files VALUES (1, 1, 'Heat (1995).mkv');
+INSERT INTO files VALUES (2, 2, 'stack://smb://nas/movies/Alien (1979)/Alien.1979.cd1.avi , ' ||
+                                'smb://nas/movies/Alien (1979)/Alien.1979.cd2.avi');
+INSERT INTO files VALUES (3, 3, 'Missing (2000).mkv');
+INSERT INTO movie VALUES (1, 1, 'Heat', 'A group of professional bank robbers...', '1', '1',
+                          '10200', 'Action / Crime / Drama', 'Michael Mann', 'Heat',
+                          '1995-12-15');
+INSERT INTO movie VALUES (2, 2, 'Alien', 'The crew of a commercial spacecraft...', '2', '2',
+                          '7020', 'Horror / Sci-Fi', 'Ridley Scott', 'Alien', '1979-05-25');
+INSERT INTO movie VALUES (3, 3, 'Missing', NULL, NULL, NULL, NULL, NULL, NULL, NULL,
+                          '2000-01-01');
+INSERT INTO rating VALUES (1, 1, 'movie', 'imdb', 8.3, 700000);
+INSERT INTO rating VALUES (2, 2, 'movie', 'imdb', 8.5, 900000);
+INSERT INTO uniqueid VALUES (1, 1, 'movie', 'tt0113277', 'imdb');
+INSERT INTO uniqueid VALUES (2, 2, 'movie', 'tt0078748', 'imdb');
+INSERT INTO actor VALUES (1, 'Al Pacino');
+INSERT INTO actor VALUES (2, 'Robert De Niro');
+INSERT INTO actor VALUES (3, 'Sigourney Weaver');
+INSERT INTO actor_link VALUES (2, 1, 'movie', 'Neil McCauley', 1);
+INSERT INTO actor_link VALUES (1, 1, 'movie', 'Vincent Hanna', 0);
+INSERT INTO actor_link VALUES (3, 2, 'movie', 'Ripley', 0);
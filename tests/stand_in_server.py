@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""Local HTTP server standing in for the metadata APIs.
+
+The server answers the requests of :any:`metadata_providers.JSONHTTPProvider` (at ``/json``)
+and of :any:`app_utils.OMDbProvider` (at ``/omdb/``) from a list of movies, so the providers
+and their chains can be checked without network access. Responses can be delayed (to check
+the race mode and the time budget of :any:`metadata_providers.ProviderChain`) and the OMDb
+daily quota can be limited.
+
+Only the standard library is used.
+
+Attributes
+----------
+OMDB_LIMIT_RESPONSE : dict
+    Response of the OMDb API when the daily quota is spent. It's sent with the HTTP 401 status.
+OMDB_NOT_FOUND_RESPONSE : dict
+    Response of the OMDb API when a movie isn't found.
+"""
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+OMDB_LIMIT_RESPONSE = {"Response": "False", "Error": "Request limit reached!"}
+OMDB_NOT_FOUND_RESPONSE = {"Response": "False", "Error": "Movie not found!"}
+
+
+class StandInServer():
+    """Local HTTP server standing in for the metadata APIs.
+
+    Movies are found by IMDb ID or by title (case-insensitively) and year (if passed). The
+    ``/json`` endpoint takes ``title``, ``year`` and ``imdb_id`` query parameters and answers
+    ``{"movie": {...}}`` with the lower case keys of the OMDb response (e.g. ``title``), or
+    HTTP 404 if the movie isn't found. The ``/omdb/`` endpoint takes the query parameters of
+    the OMDb API and answers with the OMDb response.
+
+    Attributes
+    ----------
+    delay : float
+        Time in seconds every response is delayed.
+    movies : list
+        The movies in the format of OMDb API responses.
+    omdb_quota : int, None
+        Amount of OMDb requests answered before the quota is reported as spent. Unlimited if
+        None.
+    requests : list
+        Paths (with query) of the received requests, in order of arrival.
+    url : str
+        Base URL of the server (e.g. ``http://127.0.0.1:8080``).
+    """
+
+    def __init__(self, movies, delay=0.0, omdb_quota=None):
+        """Initialization.
+
+        The server is started on a free local port.
+
+        Parameters
+        ----------
+        movies : list
+            The movies in the format of OMDb API responses.
+        delay : float, optional
+            Time in seconds every response is delayed.
+        omdb_quota : int, None, optional
+            Amount of OMDb requests answered before the quota is reported as spent.
+        """
+        self.movies = movies
+        self.delay = delay
+        self.omdb_quota = omdb_quota
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.url = "http://127.0.0.1:%d" % self._server.server_address[1]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def find(self, title=None, year=None, imdb_id=None):
+        """Find a movie.
+
+        Parameters
+        ----------
+        title : str, None, optional
+            The movie title.
+        year : str, None, optional
+            The release year.
+        imdb_id : str, None, optional
+            The IMDb ID. If passed, the title and year are ignored.
+
+        Returns
+        -------
+        dict, None
+            The movie, or None if it isn't found.
+        """
+        for movie in self.movies:
+            if imdb_id:
+                if movie.get("imdbID") == imdb_id:
+                    return movie
+            elif title and movie["Title"].casefold() == title.casefold() and \
+                    (not year or movie.get("Year") == year):
+                return movie
+
+        return None
+
+    def respond(self, path):
+        """Answer a request.
+
+        Parameters
+        ----------
+        path : str
+            The request path with its query.
+
+        Returns
+        -------
+        tuple
+            The HTTP status and the JSON response.
+        """
+        with self._lock:
+            self.requests.append(path)
+            omdb_requests = sum(1 for p in self.requests if p.startswith("/omdb/"))
+
+        time.sleep(self.delay)
+        url = urlsplit(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/json":
+            movie = self.find(query.get("title"), query.get("year"), query.get("imdb_id"))
+
+            if movie is None:
+                return 404, {"error": "Not found"}
+
+            return 200, {"movie": {key.lower(): value for key, value in movie.items()}}
+
+        if url.path == "/omdb/":
+            if self.omdb_quota is not None and omdb_requests > self.omdb_quota:
+                return 401, OMDB_LIMIT_RESPONSE
+
+            movie = self.find(query.get("t"), query.get("y"), query.get("i"))
+
+            return 200, movie or OMDB_NOT_FOUND_RESPONSE
+
+        return 404, {"error": "Unknown endpoint"}
+
+    def count(self, prefix):
+        """Count the received requests.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the counted request paths (e.g. ``/json``).
+
+        Returns
+        -------
+        int
+            The amount of requests.
+        """
+        with self._lock:
+            return sum(1 for path in self.requests if path.startswith(prefix))
+
+    def close(self):
+        """Stop the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _handler(server):
+    """Create the request handler class of a server.
+
+    Parameters
+    ----------
+    server : StandInServer
+        The server.
+
+    Returns
+    -------
+    type
+        The request handler class.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, data = server.respond(self.path)
+            body = json.dumps(data).encode("utf-8")
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    pass